@@ -0,0 +1,101 @@
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import BASE_CONFIG, LLM_CONFIG
+from ..utils.logger import setup_logger
+from ..utils.tokens import MESSAGE_OVERHEAD, count_tokens, message_tokens
+
+
+class ContextBuilder:
+    """
+    按token预算构建LLM上下文
+
+    系统提示、固定消息(如对话摘要)和当前输入必须发送，剩余预算(扣除max_tokens)从最近的消息开始向前填充
+    """
+
+    def __init__(self, context_window: int = None, max_tokens: int = None):
+        self.context_window = context_window or LLM_CONFIG["context_window"]
+        self.max_tokens = max_tokens or LLM_CONFIG["max_tokens"]
+        self.logger = setup_logger("context_builder", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.truncated_requests = 0
+        self.tokens_sent = 0
+        self.tokens_dropped = 0
+
+    def build(
+            self,
+            system_prompt: str,
+            context: Optional[List[Dict[str, Any]]],
+            user_input: str,
+            start_with_user: bool = False
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        选取可发送的历史消息
+
+        Args:
+            system_prompt: 系统提示
+            context: 按时间顺序排列的对话历史，标记pinned的消息始终保留在开头
+            user_input: 当前用户输入
+            start_with_user: 是否要求历史以用户消息开头(Anthropic要求)
+
+        Returns:
+            (历史消息列表, 本次请求的上下文统计)
+        """
+        pinned = [msg for msg in (context or []) if msg.get("pinned")]
+        context = [msg for msg in (context or []) if not msg.get("pinned")]
+        pinned_tokens = sum(message_tokens(msg) for msg in pinned)
+        fixed_tokens = (count_tokens(system_prompt) + MESSAGE_OVERHEAD + pinned_tokens
+                        + count_tokens(user_input) + MESSAGE_OVERHEAD)
+        budget = max(self.context_window - self.max_tokens - fixed_tokens, 0)
+
+        # 从最近的消息向前填充，遇到放不下的消息即停止，保证历史连续
+        used = 0
+        start = len(context)
+        while start > 0:
+            tokens = message_tokens(context[start - 1])
+            if used + tokens > budget:
+                break
+            used += tokens
+            start -= 1
+
+        if start_with_user:
+            while start < len(context) and context[start]["role"] != "user":
+                used -= message_tokens(context[start])
+                start += 1
+
+        history = [{"role": msg["role"], "content": msg["content"]} for msg in pinned + context[start:]]
+        dropped_tokens = sum(message_tokens(msg) for msg in context[:start])
+        stats = {
+            "budget": budget,
+            "prompt_tokens": fixed_tokens + used,
+            "history_tokens": used,
+            "pinned_tokens": pinned_tokens,
+            "sent_turns": len(history),
+            "dropped_turns": start,
+            "dropped_tokens": dropped_tokens,
+        }
+
+        with self._lock:
+            self.requests += 1
+            self.tokens_sent += stats["prompt_tokens"]
+            self.tokens_dropped += dropped_tokens
+            if start:
+                self.truncated_requests += 1
+
+        if start:
+            self.logger.debug(f"上下文超出预算，丢弃{start}条历史消息({dropped_tokens} tokens)")
+        return history, stats
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "context_window": self.context_window,
+                "max_tokens": self.max_tokens,
+                "requests": self.requests,
+                "truncated_requests": self.truncated_requests,
+                "avg_prompt_tokens": self.tokens_sent / self.requests if self.requests else 0.0,
+                "tokens_sent": self.tokens_sent,
+                "tokens_dropped": self.tokens_dropped,
+            }
\ No newline at end of file
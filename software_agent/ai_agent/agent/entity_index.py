@@ -0,0 +1,299 @@
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from ..config import BASE_CONFIG, ENTITY_INDEX_CONFIG
+from ..utils.logger import setup_logger
+from .intent_cache import normalize_message
+
+# 参数名到实体类型的映射
+SLOT_KINDS = {"project_id": "project", "file_id": "file"}
+
+# 列表类响应中实体数组可能使用的字段
+_LIST_KEYS = {"project": ("projects", "items", "data", "results"), "file": ("files", "items", "data", "results")}
+_NAME_KEYS = ("name", "file_name", "filename", "title")
+
+
+def name_grams(text: str) -> Set[str]:
+    """名称的相邻二字组(单字名称保留单字)"""
+    text = normalize_message(text).replace(" ", "")
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _records(result: Any, kind: str) -> List[Dict[str, Any]]:
+    """从list_projects/list_files的响应中取出实体数组"""
+    if isinstance(result, list):
+        return [item for item in result if isinstance(item, dict)]
+    if isinstance(result, dict):
+        for key in _LIST_KEYS[kind]:
+            if isinstance(result.get(key), list):
+                return [item for item in result[key] if isinstance(item, dict)]
+    return []
+
+
+def _record(result: Any) -> Optional[Dict[str, Any]]:
+    """从单个实体的响应中取出实体(顶层或data字段)"""
+    if isinstance(result, dict) and isinstance(result.get("data"), dict):
+        return result["data"]
+    return result if isinstance(result, dict) else None
+
+
+def _name_of(record: Dict[str, Any]) -> Optional[str]:
+    for key in _NAME_KEYS:
+        if isinstance(record.get(key), str) and record[key].strip():
+            return record[key]
+    return None
+
+
+class _Entity:
+    __slots__ = ("name", "grams", "scope", "expires_at")
+
+    def __init__(self, name: str, scope: Optional[str], expires_at: float):
+        self.name = name
+        self.grams = name_grams(name)
+        self.scope = scope
+        self.expires_at = expires_at
+
+
+class _TenantIndex:
+    """单个租户的实体表(按最近使用排序)和二字组倒排索引"""
+
+    def __init__(self):
+        self.entities: "OrderedDict[Tuple[str, str], _Entity]" = OrderedDict()  # (类型, ID) -> 实体
+        self.postings: Dict[Tuple[str, str], Set[str]] = defaultdict(set)  # (类型, 二字组) -> ID集合
+        self.next_sweep = 0.0
+
+    def add(self, kind: str, entity_id: str, entity: _Entity):
+        self.remove(kind, entity_id)
+        self.entities[(kind, entity_id)] = entity
+        for gram in entity.grams:
+            self.postings[(kind, gram)].add(entity_id)
+
+    def remove(self, kind: str, entity_id: str) -> bool:
+        entity = self.entities.pop((kind, entity_id), None)
+        if entity is None:
+            return False
+        for gram in entity.grams:
+            ids = self.postings.get((kind, gram))
+            if ids is not None:
+                ids.discard(entity_id)
+                if not ids:
+                    del self.postings[(kind, gram)]
+        return True
+
+    def remove_scope(self, kind: str, scope: str) -> int:
+        """移除某个父实体下的全部实体(如已删除项目中的文件)"""
+        ids = [entity_id for (entity_kind, entity_id), entity in self.entities.items()
+               if entity_kind == kind and entity.scope == scope]
+        for entity_id in ids:
+            self.remove(kind, entity_id)
+        return len(ids)
+
+    def touch(self, kind: str, entity_id: str):
+        self.entities.move_to_end((kind, entity_id))
+
+    def sweep(self, now: float) -> int:
+        """移除全部已过期的实体"""
+        expired = [key for key, entity in self.entities.items() if entity.expires_at < now]
+        for kind, entity_id in expired:
+            self.remove(kind, entity_id)
+        return len(expired)
+
+    def evict(self, max_entities: int) -> int:
+        """超过上限时淘汰最久未使用的实体"""
+        evicted = 0
+        while len(self.entities) > max_entities:
+            kind, entity_id = next(iter(self.entities))
+            self.remove(kind, entity_id)
+            evicted += 1
+        return evicted
+
+
+class EntityIndex:
+    """
+    按租户划分的实体名称 -> ID索引
+
+    从list_projects/list_files/get_project等工具的结果中学习名称，按TTL过期，
+    创建/更新/删除类工具成功后立即更新或失效对应条目；每个租户最多保留max_entities个实体，
+    写入时定期清理过期条目，超过上限时淘汰最久未使用的实体。
+    查询时按二字组覆盖率做模糊匹配，消息中提到"营销分析项目"即可解析出project_id。
+
+    名称解析在ToolManager补全参数时进行(需要租户信息)，而不是在IntentParser中:
+    意图解析只需识别操作，缺少的ID参数由SlotFiller按消息中的名称查询本索引
+    """
+
+    def __init__(self, ttl: int = 300, max_tenants: int = 1000, min_score: float = 0.8, max_entities: int = 5000):
+        self.ttl = ttl
+        self.max_tenants = max_tenants
+        self.min_score = min_score
+        self.max_entities = max_entities
+        self.logger = setup_logger("entity_index", log_level=BASE_CONFIG["log_level"])
+
+        self._tenants: "OrderedDict[str, _TenantIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.ambiguous = 0
+        self.invalidations = 0
+        self.expired = 0
+        self.evicted = 0
+        self.lookup_seconds = 0.0
+
+    def _tenant(self, tenant: str, create: bool = False) -> Optional[_TenantIndex]:
+        """获取租户索引(需持有锁)，超过租户上限时淘汰最久未使用的租户"""
+        index = self._tenants.get(tenant)
+        if index is not None:
+            self._tenants.move_to_end(tenant)
+        elif create:
+            index = self._tenants[tenant] = _TenantIndex()
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        return index
+
+    def add(self, tenant: str, kind: str, entity_id: Any, name: str, scope: Optional[Any] = None):
+        """登记实体名称"""
+        now = time.monotonic()
+        entity = _Entity(name, str(scope) if scope is not None else None, now + self.ttl)
+        if not entity.grams:
+            return
+        with self._lock:
+            index = self._tenant(tenant, create=True)
+            index.add(kind, str(entity_id), entity)
+            # 查询只会清理匹配到的过期条目，写入时每个TTL周期整体清理一次，避免不再被查询的名称长期占用内存
+            if now >= index.next_sweep:
+                self.expired += index.sweep(now)
+                index.next_sweep = now + self.ttl
+            self.evicted += index.evict(self.max_entities)
+
+    def invalidate(self, tenant: str, kind: str, entity_id: Any):
+        """移除实体；删除项目时一并移除其下的文件"""
+        with self._lock:
+            index = self._tenant(tenant)
+            if index is None:
+                return
+            removed = int(index.remove(kind, str(entity_id)))
+            if kind == "project":
+                removed += index.remove_scope("file", str(entity_id))
+            self.invalidations += removed
+
+    def observe(self, tenant: str, action: str, params: Dict[str, Any], result: Any):
+        """根据成功的工具调用更新索引"""
+        if action == "list_projects":
+            for record in _records(result, "project"):
+                if record.get("id") is not None and _name_of(record):
+                    self.add(tenant, "project", record["id"], _name_of(record))
+        elif action == "list_files":
+            for record in _records(result, "file"):
+                if record.get("id") is not None and _name_of(record):
+                    self.add(tenant, "file", record["id"], _name_of(record), scope=params.get("project_id"))
+        elif action in ("get_project", "create_project", "update_project"):
+            record = _record(result) or {}
+            project_id = params.get("project_id", record.get("id"))
+            if project_id is None:
+                return
+            # 更新操作可能改名，先失效旧条目
+            if action == "update_project":
+                self.invalidate(tenant, "project", project_id)
+            name = _name_of(record) or params.get("name")
+            if name:
+                self.add(tenant, "project", project_id, name)
+        elif action == "upload_file":
+            record = _record(result) or {}
+            name = _name_of(record) or params.get("file_name")
+            if record.get("id") is not None and name:
+                self.add(tenant, "file", record["id"], name, scope=params.get("project_id"))
+        elif action == "delete_project" and params.get("project_id") is not None:
+            self.invalidate(tenant, "project", params["project_id"])
+        elif action == "delete_file" and params.get("file_id") is not None:
+            self.invalidate(tenant, "file", params["file_id"])
+
+    def find(self, tenant: str, kind: str, text: str, scope: Optional[Any] = None) -> Optional[Tuple[str, str, float]]:
+        """
+        查找文本中提到的实体
+
+        得分为实体名称的二字组出现在文本中的比例，名称完整出现时为1.0；
+        得分最高且不低于min_score的实体唯一时返回，多个实体并列(有歧义)时返回None
+
+        Returns:
+            (实体ID, 名称, 得分)或None
+        """
+        start = time.perf_counter()
+        text_grams = name_grams(text)
+        scope = str(scope) if scope is not None else None
+        now = time.monotonic()
+
+        with self._lock:
+            index = self._tenant(tenant)
+            best: List[Tuple[float, int, str, str]] = []
+            if index is not None:
+                # 统计每个实体命中的二字组数，只对可能达到阈值的实体读取详情
+                matched = Counter()
+                for gram in text_grams:
+                    matched.update(index.postings.get((kind, gram), ()))
+                expired = []
+                for entity_id, count in matched.items():
+                    entity = index.entities[(kind, entity_id)]
+                    score = count / len(entity.grams)
+                    if score < self.min_score:
+                        continue
+                    if entity.expires_at < now:
+                        expired.append(entity_id)
+                        continue
+                    if scope is not None and entity.scope not in (None, scope):
+                        continue
+                    best.append((score, len(entity.grams), entity_id, entity.name))
+                for entity_id in expired:
+                    index.remove(kind, entity_id)
+                self.expired += len(expired)
+
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - start
+            if not best:
+                return None
+            best.sort(reverse=True)
+            if len(best) > 1 and best[0][:2] == best[1][:2]:
+                self.ambiguous += 1
+                return None
+            self.hits += 1
+            index.touch(kind, best[0][2])
+
+        score, _, entity_id, name = best[0]
+        return entity_id, name, score
+
+    def resolve_slot(self, tenant: str, slot: str, text: str, params: Dict[str, Any]) -> Optional[str]:
+        """按名称解析ID参数(project_id/file_id)，文件按已知的project_id限定范围"""
+        kind = SLOT_KINDS.get(slot)
+        if kind is None:
+            return None
+        found = self.find(tenant, kind, text, scope=params.get("project_id") if kind == "file" else None)
+        if found is None:
+            return None
+        self.logger.debug(f"名称解析: {found[1]} -> {slot}={found[0]}")
+        return found[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "entities": sum(len(index.entities) for index in self._tenants.values()),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "ambiguous": self.ambiguous,
+                "invalidations": self.invalidations,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "avg_lookup_us": self.lookup_seconds / self.lookups * 1e6 if self.lookups else 0.0,
+            }
+
+
+def create_entity_index(config: Dict[str, Any] = None) -> Optional[EntityIndex]:
+    """根据配置创建实体名称索引，未启用时返回None"""
+    config = config or ENTITY_INDEX_CONFIG
+    if not config.get("enabled", False):
+        return None
+    return EntityIndex(ttl=config["ttl"], max_tenants=config["max_tenants"], min_score=config["min_score"],
+                       max_entities=config["max_entities"])
\ No newline at end of file
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from ..config import BASE_CONFIG, INTENT_CACHE_CONFIG
+from ..utils.logger import setup_logger
+
+
+def normalize_message(text: str) -> str:
+    """规范化用户输入: 全半角统一、去除首尾空白、合并空白、小写"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_cache_key(
+        user_input: str,
+        context: Optional[List[Dict[str, str]]],
+        signature: str,
+        context_turns: int = 2
+) -> str:
+    """
+    生成意图缓存键
+
+    Args:
+        user_input: 用户输入
+        context: 对话上下文，仅最近context_turns条参与计算
+        signature: 模型配置签名(提供商/模型/温度/提示版本)
+        context_turns: 参与计算的上下文条数
+
+    Returns:
+        缓存键(SHA-256)
+    """
+    recent = (context or [])[-context_turns:] if context_turns > 0 else []
+    payload = json.dumps({
+        "message": normalize_message(user_input),
+        "context": [[msg.get("role"), normalize_message(msg.get("content", ""))] for msg in recent],
+        "signature": signature,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BaseIntentCache(ABC):
+    """意图缓存接口，可替换为Redis等实现"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的意图结果，未命中或已过期时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]):
+        """缓存意图结果"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def save(self):
+        """持久化缓存(如支持)"""
+
+
+class InMemoryIntentCache(BaseIntentCache):
+    """基于TTL和LRU淘汰的内存意图缓存，可选持久化到磁盘"""
+
+    def __init__(self, max_entries: int = 1024, ttl: int = 3600, persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.logger = setup_logger("intent_cache", log_level=BASE_CONFIG["log_level"])
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (过期时间, 值)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.persist_path:
+            self.load()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def load(self):
+        """从磁盘加载未过期的缓存项"""
+        if not os.path.exists(self.persist_path):
+            return
+
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"加载意图缓存失败: {str(e)}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in entries[-self.max_entries:]:
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+        self.logger.info(f"已加载{len(self._entries)}条意图缓存")
+
+    def save(self):
+        """将缓存写入磁盘(先写临时文件再替换，避免写入中断导致文件损坏)"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            entries = [[key, expires_at, value] for key, (expires_at, value) in self._entries.items()]
+
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            self.logger.warning(f"保存意图缓存失败: {str(e)}")
+
+
+def create_intent_cache(config: Dict[str, Any] = None) -> Optional[BaseIntentCache]:
+    """根据配置创建意图缓存，未启用时返回None"""
+    config = config or INTENT_CACHE_CONFIG
+    if not config.get("enabled", False):
+        return None
+
+    return InMemoryIntentCache(
+        max_entries=config["max_entries"],
+        ttl=config["ttl"],
+        persist_path=config.get("persist_path") or None
+    )
\ No newline at end of file
@@ -0,0 +1,459 @@
+import argparse
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，未安装时不启用本地分类器
+    np = None
+
+from ..config import BASE_CONFIG, INTENT_CLASSIFIER_CONFIG
+from ..utils.logger import setup_logger
+from .intent_cache import normalize_message
+
+# 模型产物文件名，每个版本一个目录: <model_dir>/<version>/
+WEIGHTS_FILE = "weights.npy"
+BIAS_FILE = "bias.npy"
+META_FILE = "meta.json"
+
+# 每条消息都带的常量特征，保证空消息也有特征行
+_BOUNDARY = "\x02"
+_DIGITS = re.compile(r"\d+")
+
+
+def message_ngrams(text: str, ngram_range: Tuple[int, int] = (1, 3)) -> List[str]:
+    """
+    字符n-gram特征
+
+    消息先规范化，数字统一替换为0，使"项目42"与"项目7"共享特征
+    """
+    text = _DIGITS.sub("0", normalize_message(text))
+    padded = f"{_BOUNDARY}{text}{_BOUNDARY}"
+    grams = [_BOUNDARY]
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def hash_features(texts: Iterable[str], dim: int, ngram_range: Tuple[int, int] = (1, 3)):
+    """
+    将一批消息转换为哈希后的稀疏特征(L2归一化的词频)
+
+    Returns:
+        (indices, values, offsets): 第i条消息的特征为indices/values[offsets[i]:offsets[i+1]]
+    """
+    indices, values, offsets = [], [], [0]
+    for text in texts:
+        counts = Counter(zlib.crc32(gram.encode("utf-8")) % dim for gram in message_ngrams(text, ngram_range))
+        norm = sum(count * count for count in counts.values()) ** 0.5
+        indices.extend(counts.keys())
+        values.extend(count / norm for count in counts.values())
+        offsets.append(len(indices))
+    return (np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float32),
+            np.asarray(offsets, dtype=np.int64))
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _logits(weights, bias, indices, values, offsets):
+    """稀疏特征与权重矩阵相乘: 按消息分段累加被选中的权重行"""
+    contributions = np.asarray(weights[indices], dtype=np.float32) * values[:, None]
+    return np.add.reduceat(contributions, offsets[:-1], axis=0) + bias
+
+
+class IntentClassifier:
+    """
+    本地意图分类器(字符n-gram哈希 + 多项逻辑回归)
+
+    从LLM已做出的解析决策中训练，作为IntentParser的第一级: 置信度达到校准阈值时直接采用，
+    否则交给后续的缓存和LLM。权重以内存映射方式加载，多个进程共享同一份页缓存
+    """
+
+    def __init__(
+            self,
+            weights,
+            bias,
+            labels: List[str],
+            dim: int,
+            ngram_range: Tuple[int, int] = (1, 3),
+            cutoff: float = 0.9,
+            version: str = ""
+    ):
+        self.weights = weights
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = list(labels)
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.cutoff = cutoff
+        self.version = version
+
+        self._lock = threading.Lock()
+        self.outcomes: Counter = Counter()
+        self.inference_seconds = 0.0
+
+    @classmethod
+    def load(cls, path: str, cutoff: float = 0.0) -> "IntentClassifier":
+        """从版本目录加载模型，权重文件内存映射；cutoff为0时使用训练时校准的阈值"""
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(path, WEIGHTS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, BIAS_FILE)),
+            meta["labels"],
+            meta["dim"],
+            ngram_range=meta["ngram_range"],
+            cutoff=cutoff or meta["cutoff"],
+            version=meta["version"]
+        )
+
+    def predict_proba(self, texts: List[str]):
+        """批量推理，返回 (消息数, 类别数) 的概率矩阵"""
+        if not texts:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        indices, values, offsets = hash_features(texts, self.dim, self.ngram_range)
+        return _softmax(_logits(self.weights, self.bias, indices, values, offsets))
+
+    def predict(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """批量推理，返回每条消息的(操作名, 置信度)"""
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        return [(self.labels[index], float(probs[row, index])) for row, index in enumerate(best)]
+
+    def classify(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        单条消息分类
+
+        Returns:
+            置信度不低于阈值时返回(操作名, 置信度)，否则返回None
+        """
+        start = time.perf_counter()
+        action, confidence = self.predict([text])[0]
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.inference_seconds += elapsed
+        if confidence < self.cutoff:
+            self.record("below_cutoff")
+            return None
+        return action, confidence
+
+    def record(self, outcome: str):
+        """记录一次分类结果的去向: accepted / below_cutoff / missing_slots / unknown_action"""
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(self.outcomes.values())
+            accepted = self.outcomes["accepted"]
+            return {
+                "version": self.version,
+                "labels": len(self.labels),
+                "cutoff": self.cutoff,
+                "lookups": lookups,
+                "accepted": accepted,
+                "hit_rate": accepted / lookups if lookups else 0.0,
+                "outcomes": dict(self.outcomes),
+                "avg_inference_ms": self.inference_seconds / lookups * 1000 if lookups else 0.0,
+            }
+
+
+class IntentOutcomeLog:
+    """
+    将LLM的解析决策追加写入JSONL文件，作为分类器的训练数据
+
+    记录先放入队列，由后台线程按flush_interval批量写入，请求路径不等待文件IO
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.logger = setup_logger("intent_outcome_log", log_level=BASE_CONFIG["log_level"])
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = False
+        self.records = 0
+        self.batches = 0
+        self.write_errors = 0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="intent-outcome-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, text: str, action: str, confidence: float, tier: str = ""):
+        if self._closed:
+            return
+        line = json.dumps({"text": text, "action": action, "confidence": confidence, "tier": tier,
+                           "ts": int(time.time())}, ensure_ascii=False)
+        self._queue.put(("record", line))
+
+    def flush(self, timeout: float = 5.0):
+        """等待此前的所有记录写入文件"""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout=timeout)
+
+    def close(self):
+        """写入剩余记录并停止后台线程"""
+        self._closed = True
+        if self._writer.is_alive():
+            self._queue.put(("stop",))
+            self._writer.join(timeout=5.0)
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # 在flush_interval内尽量收集更多记录，合并为一次写入
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] == "record":
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+            if batch[-1][0] == "stop":
+                self._file.close()
+                return
+
+    def _write_batch(self, batch: List[tuple]):
+        lines = [op[1] for op in batch if op[0] == "record"]
+        if lines:
+            try:
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+                self.records += len(lines)
+                self.batches += 1
+            except OSError as e:
+                self.write_errors += 1
+                self.logger.error(f"写入决策日志失败，丢弃{len(lines)}条记录: {e}")
+        for op in batch:
+            if op[0] == "flush":
+                op[1].set()
+
+
+def read_outcome_log(path: str, min_confidence: float = 0.0) -> Tuple[List[str], List[str]]:
+    """读取决策日志，返回(消息列表, 操作名列表)，跳过损坏的行和低置信度的决策"""
+    texts, actions = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("text") and record.get("action") and record.get("confidence", 1.0) >= min_confidence:
+                texts.append(record["text"])
+                actions.append(record["action"])
+    return texts, actions
+
+
+def calibrate_cutoff(confidences, correct, target_precision: float, min_cutoff: float = 0.5) -> float:
+    """
+    选择置信度阈值: 高于阈值的验证样本准确率不低于target_precision时，覆盖的样本尽量多
+
+    阈值不低于min_cutoff，避免留出集全部正确时阈值落到分布外输入也能达到的低置信度；
+    无法达到目标准确率时返回1.0(相当于关闭分类器)
+    """
+    order = np.argsort(-confidences, kind="stable")
+    hits = np.cumsum(correct[order])
+    precision = hits / np.arange(1, len(order) + 1)
+    passing = np.nonzero(precision >= target_precision)[0]
+    if not len(passing):
+        return 1.0
+    return max(float(confidences[order][passing[-1]]), min_cutoff)
+
+
+def train_classifier(
+        texts: List[str],
+        actions: List[str],
+        dim: int = 1 << 18,
+        ngram_range: Tuple[int, int] = (1, 3),
+        epochs: int = 10,
+        learning_rate: float = 5.0,
+        l2: float = 1e-6,
+        batch_size: int = 256,
+        holdout: float = 0.1,
+        target_precision: float = 0.98,
+        min_cutoff: float = 0.5,
+        seed: int = 0
+) -> Tuple[Any, Any, Dict[str, Any]]:
+    """
+    小批量梯度下降训练多项逻辑回归，并在留出集上校准置信度阈值
+
+    Returns:
+        (weights, bias, meta)
+    """
+    labels = sorted(set(actions))
+    label_index = {label: index for index, label in enumerate(labels)}
+    targets = np.asarray([label_index[action] for action in actions], dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(texts))
+    holdout_size = int(len(texts) * holdout) if len(texts) >= 20 else 0
+    valid_rows, train_rows = order[:holdout_size], order[holdout_size:]
+
+    indices, values, offsets = hash_features(texts, dim, ngram_range)
+    weights = np.zeros((dim, len(labels)), dtype=np.float32)
+    bias = np.zeros(len(labels), dtype=np.float32)
+
+    def batch_features(rows):
+        spans = [(offsets[row], offsets[row + 1]) for row in rows]
+        batch_indices = np.concatenate([indices[start:end] for start, end in spans])
+        batch_values = np.concatenate([values[start:end] for start, end in spans])
+        lengths = np.asarray([end - start for start, end in spans])
+        return batch_indices, batch_values, np.concatenate([[0], np.cumsum(lengths)])
+
+    for epoch in range(epochs):
+        rng.shuffle(train_rows)
+        for start in range(0, len(train_rows), batch_size):
+            rows = train_rows[start:start + batch_size]
+            batch_indices, batch_values, batch_offsets = batch_features(rows)
+            probs = _softmax(_logits(weights, bias, batch_indices, batch_values, batch_offsets))
+            probs[np.arange(len(rows)), targets[rows]] -= 1.0
+            delta = probs / len(rows)
+
+            # 只更新本批次出现过的特征行
+            row_of_feature = np.repeat(np.arange(len(rows)), np.diff(batch_offsets))
+            gradient = batch_values[:, None] * delta[row_of_feature]
+            if l2:
+                gradient += l2 * weights[batch_indices]
+            np.add.at(weights, batch_indices, -learning_rate * gradient)
+            bias -= learning_rate * delta.sum(axis=0)
+
+    meta = {
+        "labels": labels,
+        "dim": dim,
+        "ngram_range": list(ngram_range),
+        "samples": len(texts),
+        "target_precision": target_precision,
+        "cutoff": 1.0,
+    }
+    if holdout_size:
+        batch_indices, batch_values, batch_offsets = batch_features(valid_rows)
+        probs = _softmax(_logits(weights, bias, batch_indices, batch_values, batch_offsets))
+        confidences = probs.max(axis=1)
+        correct = (probs.argmax(axis=1) == targets[valid_rows]).astype(np.float32)
+        cutoff = calibrate_cutoff(confidences, correct, target_precision, min_cutoff)
+        covered = confidences >= cutoff
+        meta.update({
+            "cutoff": cutoff,
+            "holdout": holdout_size,
+            "accuracy": float(correct.mean()),
+            "coverage": float(covered.mean()),
+            "precision": float(correct[covered].mean()) if covered.any() else 0.0,
+        })
+    return weights, bias, meta
+
+
+def save_model(model_dir: str, weights, bias, meta: Dict[str, Any], version: str = "") -> str:
+    """写入新版本目录(先写临时目录再改名，加载方不会读到写了一半的模型)，返回版本目录路径"""
+    version = version or time.strftime("%Y%m%d%H%M%S")
+    meta = dict(meta, version=version, trained_at=int(time.time()))
+    path = os.path.join(model_dir, version)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, WEIGHTS_FILE), weights)
+    np.save(os.path.join(tmp_path, BIAS_FILE), bias)
+    with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def latest_version(model_dir: str) -> Optional[str]:
+    """返回目录中最新的完整模型版本(版本号按字典序递增)"""
+    if not os.path.isdir(model_dir):
+        return None
+    versions = [name for name in os.listdir(model_dir)
+                if not name.endswith(".tmp") and os.path.exists(os.path.join(model_dir, name, META_FILE))]
+    return max(versions) if versions else None
+
+
+def create_intent_classifier(config: Dict[str, Any] = None) -> Optional[IntentClassifier]:
+    """根据配置加载本地意图分类器，未启用、缺少numpy或没有可用模型时返回None"""
+    config = config or INTENT_CLASSIFIER_CONFIG
+    if not config.get("enabled", False):
+        return None
+
+    logger = setup_logger("intent_classifier", log_level=BASE_CONFIG["log_level"])
+    if np is None:
+        logger.warning("未安装numpy，本地意图分类器不可用")
+        return None
+
+    version = config.get("version") or latest_version(config["model_dir"])
+    if not version:
+        logger.warning(f"未找到意图分类模型: {config['model_dir']}")
+        return None
+
+    try:
+        classifier = IntentClassifier.load(os.path.join(config["model_dir"], version), cutoff=config.get("cutoff", 0.0))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"加载意图分类模型失败: {str(e)}")
+        return None
+
+    logger.info(f"已加载意图分类模型 {version}: {len(classifier.labels)} 个操作，阈值 {classifier.cutoff:.3f}")
+    return classifier
+
+
+def create_outcome_log(config: Dict[str, Any] = None) -> Optional[IntentOutcomeLog]:
+    """根据配置创建决策日志，未配置路径时返回None"""
+    config = config or INTENT_CLASSIFIER_CONFIG
+    return IntentOutcomeLog(config["log_path"]) if config.get("log_path") else None
+
+
+def main():
+    """从决策日志训练新版本模型"""
+    parser = argparse.ArgumentParser(description="训练本地意图分类器")
+    parser.add_argument("--log", default=INTENT_CLASSIFIER_CONFIG["log_path"], help="决策日志(JSONL)路径")
+    parser.add_argument("--model-dir", default=INTENT_CLASSIFIER_CONFIG["model_dir"], help="模型输出目录")
+    parser.add_argument("--dim", type=int, default=1 << 18, help="特征哈希空间大小")
+    parser.add_argument("--epochs", type=int, default=10, help="训练轮数")
+    parser.add_argument("--learning-rate", type=float, default=5.0, help="学习率")
+    parser.add_argument("--precision", type=float, default=0.98, help="校准阈值的目标准确率")
+    parser.add_argument("--min-confidence", type=float, default=0.0, help="跳过LLM置信度低于该值的决策")
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("训练意图分类器需要numpy")
+    if not args.log:
+        raise SystemExit("请通过--log或INTENT_OUTCOME_LOG_PATH指定决策日志")
+
+    texts, actions = read_outcome_log(args.log, args.min_confidence)
+    if not texts:
+        raise SystemExit(f"决策日志为空: {args.log}")
+
+    start = time.perf_counter()
+    weights, bias, meta = train_classifier(texts, actions, dim=args.dim, epochs=args.epochs,
+                                           learning_rate=args.learning_rate, target_precision=args.precision)
+    path = save_model(args.model_dir, weights, bias, meta)
+    print(f"已训练 {meta['samples']} 条样本，{len(meta['labels'])} 个操作，耗时 {time.perf_counter() - start:.1f}s")
+    print(f"模型: {path}  阈值: {meta['cutoff']:.3f}  留出集准确率: {meta.get('accuracy', 0.0):.1%}  "
+          f"覆盖率: {meta.get('coverage', 0.0):.1%}  覆盖部分准确率: {meta.get('precision', 0.0):.1%}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,198 @@
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+# 反向匹配(模型输出是某个标签的一部分)要求的最短长度，避免单字误匹配
+MIN_REVERSE_LENGTH = 2
+
+
+class IntentMap(dict):
+    """
+    意图标签(含别名)到API操作的映射
+
+    每次修改递增version，匹配器据此判断是否需要重建；别名可附带优先级，长度相同的匹配按优先级取舍
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self.priorities: Dict[str, int] = {}
+
+    def _changed(self):
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.priorities.pop(key, None)
+        self._changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        self.priorities.pop(key, None)
+        self._changed()
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.priorities.pop(key, None)
+        self._changed()
+        return key, value
+
+    def clear(self):
+        super().clear()
+        self.priorities.clear()
+        self._changed()
+
+    def add_alias(self, alias: str, action: str, priority: int = 0):
+        """添加别名，priority越大越优先"""
+        self.priorities[alias] = priority
+        self[alias] = action
+
+    def add_aliases(self, aliases: Dict[str, str], priority: int = 0):
+        """批量添加别名，只触发一次重建"""
+        for alias in aliases:
+            self.priorities[alias] = priority
+        self.update(aliases)
+
+    def load_aliases(self, path: str) -> int:
+        """
+        从JSON文件加载别名
+
+        文件格式: {"别名": "操作名"} 或 [{"alias": ..., "action": ..., "priority": 0}]
+
+        Returns:
+            加载的别名数
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            self.add_aliases(data)
+            return len(data)
+
+        aliases = {}
+        for entry in data:
+            aliases[entry["alias"]] = entry["action"]
+            self.priorities[entry["alias"]] = entry.get("priority", 0)
+        self.update(aliases)
+        return len(aliases)
+
+
+class IntentMatcher:
+    """
+    编译后的意图匹配器
+
+    - 正向: Aho-Corasick自动机一次扫描模型输出，找出其中包含的标签，取最长、其次优先级最高者
+    - 反向: 模型输出是某个标签的一部分时，通过标签子串索引直接查找
+    同等条件下先加入的标签优先，与原先按顺序匹配的结果一致
+    """
+
+    def __init__(self, intent_map: Dict[str, str], priorities: Optional[Dict[str, int]] = None):
+        priorities = priorities or {}
+        self.labels: List[str] = [label for label in intent_map if label]
+        self.actions: List[str] = [intent_map[label] for label in self.labels]
+        self.action_set = set(self.actions)
+        self._ranks: List[Tuple[int, int, int]] = [
+            (len(label), priorities.get(label, 0), -index) for index, label in enumerate(self.labels)
+        ]
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]  # 以该状态结尾的最佳标签(含失败链上的标签)
+        self._build_automaton()
+
+        self._reverse: Dict[str, int] = {}
+        self._build_reverse_index(priorities)
+
+    def _better(self, current: Optional[int], candidate: Optional[int]) -> Optional[int]:
+        if candidate is None:
+            return current
+        if current is None or self._ranks[candidate] > self._ranks[current]:
+            return candidate
+        return current
+
+    def _build_automaton(self):
+        goto, fail, best = self._goto, self._fail, self._best
+        for index, label in enumerate(self.labels):
+            state = 0
+            for char in label:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    goto.append({})
+                    fail.append(0)
+                    best.append(None)
+                    next_state = len(goto) - 1
+                    goto[state][char] = next_state
+                state = next_state
+            best[state] = self._better(best[state], index)
+
+        # 按层次遍历计算失败指针，并沿失败链合并最佳标签
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                if state:
+                    fail[child] = goto[fallback].get(char, 0)
+                best[child] = self._better(best[child], best[fail[child]])
+                queue.append(child)
+
+    def _build_reverse_index(self, priorities: Dict[str, int]):
+        """子串 -> 包含它的最佳标签(优先级高、标签短、先加入者优先)"""
+        for index, label in enumerate(self.labels):
+            rank = (priorities.get(label, 0), -len(label), -index)
+            for start in range(len(label)):
+                for end in range(start + MIN_REVERSE_LENGTH, len(label) + 1):
+                    substring = label[start:end]
+                    current = self._reverse.get(substring)
+                    if current is None or rank > (priorities.get(self.labels[current], 0),
+                                                  -len(self.labels[current]), -current):
+                        self._reverse[substring] = index
+
+    def _search(self, text: str) -> Optional[int]:
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        result = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] is not None:
+                result = self._better(result, best[state])
+        return result
+
+    def search(self, text: str) -> Optional[str]:
+        """返回text中包含的最长、优先级最高的标签"""
+        index = self._search(text)
+        return self.labels[index] if index is not None else None
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        模糊匹配意图: 先找text中包含的标签，再找包含text的标签
+
+        Returns:
+            对应的API操作名，无匹配时返回None
+        """
+        index = self._search(text)
+        if index is None:
+            index = self._reverse.get(text)
+        return self.actions[index] if index is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "labels": len(self.labels),
+            "states": len(self._goto),
+            "substrings": len(self._reverse),
+        }
\ No newline at end of file
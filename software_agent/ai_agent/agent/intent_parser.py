@@ -1,49 +1,94 @@
-from typing import Dict, Any, List, Optional, Tuple
+import copy
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 
-from ..config import BASE_CONFIG
+from ..config import BASE_CONFIG, INTENT_CACHE_CONFIG, INTENT_RULES_CONFIG, CASCADE_CONFIG, PLAN_CONFIG
 from ..utils.logger import setup_logger
 from .llm_processor import LLMProcessor
+from .stream_parser import IncrementalJSONParser
+from .intent_cache import BaseIntentCache, create_intent_cache, make_cache_key
+from .rule_engine import RuleEngine, create_rule_engine
+from .model_cascade import FAST_TIER, STRONG_TIER, TierStats, escalation_reason, create_fast_processor
+from .intent_matcher import IntentMap, IntentMatcher
+from .intent_classifier import IntentClassifier, IntentOutcomeLog, create_intent_classifier, create_outcome_log
+from .slot_extractors import extract_slot
+from .task_plan import build_plan, looks_compound
+
+
+# 意图(中文标签)到API操作的映射
+INTENT_MAP = {
+    # 用户管理意图
+    "登录": "login",
+    "退出": "logout",
+    "获取用户信息": "get_user",
+    "创建用户": "create_user",
+    "更新用户": "update_user",
+    "删除用户": "delete_user",
+
+    # 项目管理意图
+    "查看所有项目": "list_projects",
+    "获取项目信息": "get_project",
+    "创建项目": "create_project",
+    "更新项目": "update_project",
+    "删除项目": "delete_project",
+
+    # 文件管理意图
+    "查看文件列表": "list_files",
+    "上传文件": "upload_file",
+    "下载文件": "download_file",
+    "删除文件": "delete_file",
+
+    # 数据处理意图
+    "运行分析": "run_analysis",
+    "获取分析结果": "get_analysis_result",
+    "导出报告": "export_report",
+
+    # 系统操作意图
+    "查看系统状态": "get_system_status",
+    "获取使用统计": "get_usage_statistics",
+}
 
 
 class IntentParser:
     """解析用户意图并转换为API操作"""
 
-    def __init__(self, llm_processor: LLMProcessor = None):
+    def __init__(
+            self,
+            llm_processor: LLMProcessor = None,
+            intent_cache: Optional[BaseIntentCache] = None,
+            rule_engine: Optional[RuleEngine] = None,
+            fast_processor: Optional[LLMProcessor] = None,
+            intent_classifier: Optional[IntentClassifier] = None,
+            outcome_log: Optional[IntentOutcomeLog] = None
+    ):
         self.llm_processor = llm_processor or LLMProcessor()
         self.logger = setup_logger("intent_parser", log_level=BASE_CONFIG["log_level"])
+        self.intent_cache = intent_cache if intent_cache is not None else create_intent_cache()
+        self.rule_engine = rule_engine if rule_engine is not None else create_rule_engine()
+        self.llm_latency = 0.0  # LLM调用耗时的指数移动平均(秒)
+        self.confidence_threshold = CASCADE_CONFIG["confidence_threshold"]
 
-        # 定义意图到API操作的映射
-        self.intent_map = {
-            # 用户管理意图
-            "登录": "login",
-            "退出": "logout",
-            "获取用户信息": "get_user",
-            "创建用户": "create_user",
-            "更新用户": "update_user",
-            "删除用户": "delete_user",
-
-            # 项目管理意图
-            "查看所有项目": "list_projects",
-            "获取项目信息": "get_project",
-            "创建项目": "create_project",
-            "更新项目": "update_project",
-            "删除项目": "delete_project",
-
-            # 文件管理意图
-            "查看文件列表": "list_files",
-            "上传文件": "upload_file",
-            "下载文件": "download_file",
-            "删除文件": "delete_file",
-
-            # 数据处理意图
-            "运行分析": "run_analysis",
-            "获取分析结果": "get_analysis_result",
-            "导出报告": "export_report",
-
-            # 系统操作意图
-            "查看系统状态": "get_system_status",
-            "获取使用统计": "get_usage_statistics",
-        }
+        # 模型级联: 先用快速模型解析，结果不可用时升级到主模型
+        self.fast_processor = (fast_processor if fast_processor is not None
+                               else create_fast_processor(self.llm_processor.tools,
+                                                          tool_retriever=self.llm_processor.tool_retriever))
+        self.tier_stats = {FAST_TIER: TierStats(), STRONG_TIER: TierStats()}
+
+        # 本地意图分类器: 缓存未命中时先于LLM尝试；决策日志记录LLM的解析结果，用于训练分类器
+        self.intent_classifier = (intent_classifier if intent_classifier is not None
+                                  else create_intent_classifier())
+        self.outcome_log = outcome_log if outcome_log is not None else create_outcome_log()
+
+        # 意图(含别名)到API操作的映射，模糊匹配使用编译后的匹配器，映射变化时重建
+        self.intent_map = IntentMap(INTENT_MAP)
+        aliases_path = INTENT_RULES_CONFIG.get("aliases_path")
+        if aliases_path:
+            self.intent_map.load_aliases(aliases_path)
+        self._matcher: Optional[IntentMatcher] = None
+        self._matcher_version = -1
+
+        # 多步骤计划: 一条消息包含多个操作时由LLM给出带依赖的步骤列表
+        self.max_plan_steps = PLAN_CONFIG["max_steps"] if PLAN_CONFIG["enabled"] else 0
 
     def parse_intent(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """
@@ -56,9 +101,290 @@ class IntentParser:
         Returns:
             含有解析结果的字典
         """
+        rule_result = self._match_rules(user_input)
+        if rule_result is not None:
+            return rule_result
+
+        cache_keys, cached = self._lookup_cache(user_input, context)
+        if cached is not None:
+            return cached
+
+        classified = self._classify(user_input)
+        if classified is not None:
+            return classified
+
         # 使用LLM处理输入
+        start = time.perf_counter()
+        if self.fast_processor is not None:
+            fast_result = self._accept_fast_tier(cache_keys, user_input,
+                                                 self.fast_processor.process_input(user_input, context),
+                                                 time.perf_counter() - start)
+            if fast_result is not None:
+                self._record_llm_latency(time.perf_counter() - start)
+                return fast_result
+
+        strong_start = time.perf_counter()
         llm_response = self.llm_processor.process_input(user_input, context)
+        self._record_llm_latency(time.perf_counter() - start)
+        return self._store_result(cache_keys, user_input, llm_response, time.perf_counter() - strong_start)
+
+    async def parse_intent_async(self, user_input: str,
+                                 context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        异步解析用户意图并提取参数
+
+        Args:
+            user_input: 用户的自然语言输入
+            context: 可选的对话上下文
+
+        Returns:
+            含有解析结果的字典
+        """
+        rule_result = self._match_rules(user_input)
+        if rule_result is not None:
+            return rule_result
+
+        cache_keys, cached = self._lookup_cache(user_input, context)
+        if cached is not None:
+            return cached
+
+        classified = self._classify(user_input)
+        if classified is not None:
+            return classified
+
+        start = time.perf_counter()
+        if self.fast_processor is not None:
+            fast_result = self._accept_fast_tier(cache_keys, user_input,
+                                                 await self.fast_processor.process_input_async(user_input, context),
+                                                 time.perf_counter() - start)
+            if fast_result is not None:
+                self._record_llm_latency(time.perf_counter() - start)
+                return fast_result
+
+        strong_start = time.perf_counter()
+        llm_response = await self.llm_processor.process_input_async(user_input, context)
+        self._record_llm_latency(time.perf_counter() - start)
+        return self._store_result(cache_keys, user_input, llm_response, time.perf_counter() - strong_start)
+
+    async def parse_intent_stream(self, user_input: str,
+                                  context: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式解析用户意图，先转发LLM的增量输出，最后产出解析结果
+
+        Args:
+            user_input: 用户的自然语言输入
+            context: 可选的对话上下文
+
+        Yields:
+            {"type": "token", "text": ...}，
+            action和parameters生成完毕(原生工具调用模式下为第一个工具调用的参数生成完毕)时产出一次
+            {"type": "partial_intent", "action": ..., "parameters": ...}(JSON模式的多步骤计划没有顶层action，不产出)，
+            最后产出 {"type": "intent", "result": ...}
+        """
+        rule_result = self._match_rules(user_input)
+        if rule_result is None:
+            cache_keys, rule_result = self._lookup_cache(user_input, context)
+        if rule_result is None:
+            rule_result = self._classify(user_input)
+        if rule_result is not None:
+            yield {"type": "intent", "result": rule_result}
+            return
+
+        start = time.perf_counter()
+        if self.fast_processor is not None:
+            # 快速模型不流式输出，避免升级时已转发的片段作废
+            fast_result = self._accept_fast_tier(cache_keys, user_input,
+                                                 await self.fast_processor.process_input_async(user_input, context),
+                                                 time.perf_counter() - start)
+            if fast_result is not None:
+                self._record_llm_latency(time.perf_counter() - start)
+                yield {"type": "intent", "result": fast_result}
+                return
+
+        json_parser = IncrementalJSONParser()
+        partial_emitted = False
+        strong_start = time.perf_counter()
+
+        async for event in self.llm_processor.stream_input_async(user_input, context):
+            if event["type"] == "token":
+                yield event
+
+                # 增量解析，action和parameters完整后立即通知调用方，无需等待剩余输出
+                json_parser.feed(event["text"])
+                fields = json_parser.fields
+                if not partial_emitted and "action" in fields and isinstance(fields.get("parameters"), dict):
+                    partial_emitted = True
+                    api_action = self._map_to_api_action(str(fields["action"]))
+                    if api_action:
+                        yield {"type": "partial_intent", "action": api_action, "parameters": fields["parameters"]}
+            elif event["type"] == "tool_call":
+                # 原生工具调用：第一个调用的参数完整即可提前执行，后续调用组成计划时由调用方丢弃
+                if not partial_emitted:
+                    partial_emitted = True
+                    api_action = self._map_to_api_action(event["name"])
+                    if api_action:
+                        yield {"type": "partial_intent", "action": api_action, "parameters": event["arguments"]}
+            else:
+                self._record_llm_latency(time.perf_counter() - start)
+                yield {"type": "intent",
+                       "result": self._store_result(cache_keys, user_input, event["result"],
+                                                     time.perf_counter() - strong_start)}
+
+    def _may_have_plan(self, user_input: str) -> bool:
+        """消息可能包含多个操作时跳过只能给出单个操作的本地快速路径，交给LLM生成计划"""
+        return self.max_plan_steps > 1 and looks_compound(user_input)
+
+    def _match_rules(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """尝试规则快速路径，命中时无需调用LLM"""
+        if self.rule_engine is None or self._may_have_plan(user_input):
+            return None
+
+        match = self.rule_engine.match(user_input, llm_latency=self.llm_latency)
+        if match is None:
+            return None
+
+        return {
+            "success": True,
+            "action": match["action"],
+            "parameters": match["parameters"],
+            "confidence": 1.0,
+            "source": "rule",
+            "raw_response": match
+        }
+
+    def _classify(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        尝试本地分类器快速路径
 
+        置信度达到阈值且该操作的必需参数都能从消息中提取时直接采用，否则返回None
+        """
+        if self.intent_classifier is None or self._may_have_plan(user_input):
+            return None
+
+        prediction = self.intent_classifier.classify(user_input)
+        if prediction is None:
+            return None
+
+        action, confidence = prediction
+        tool = (self.llm_processor.tools or {}).get(action)
+        if tool is None:
+            self.intent_classifier.record("unknown_action")
+            return None
+
+        parameters = {}
+        for slot in tool.required_params + tool.optional_params:
+            value = extract_slot(slot, user_input)
+            if value is not None:
+                parameters[slot] = value
+        if any(slot not in parameters for slot in tool.required_params):
+            self.intent_classifier.record("missing_slots")
+            return None
+
+        self.intent_classifier.record("accepted")
+        self.logger.debug(f"本地分类器命中: {action}({confidence:.3f}) {parameters}")
+        return {
+            "success": True,
+            "action": action,
+            "parameters": parameters,
+            "confidence": confidence,
+            "source": "classifier",
+            "raw_response": {"classifier_version": self.intent_classifier.version, "confidence": confidence}
+        }
+
+    def _record_outcome(self, user_input: str, result: Dict[str, Any], tier: str):
+        """将LLM成功解析的单操作决策写入决策日志(多步骤计划不用于训练单标签分类器)"""
+        if self.outcome_log is not None and result["success"] and "plan" not in result:
+            self.outcome_log.record(user_input, result["action"], result.get("confidence", 0.0), tier)
+
+    def _record_llm_latency(self, elapsed: float):
+        """更新LLM调用耗时的指数移动平均"""
+        self.llm_latency = elapsed if self.llm_latency == 0.0 else 0.9 * self.llm_latency + 0.1 * elapsed
+
+    def _lookup_cache(self, user_input: str, context: Optional[List[Dict[str, str]]]):
+        """
+        查询意图缓存，返回(各模型层级的缓存键, 命中的解析结果)
+
+        每个层级的结果以该层模型自身的配置签名为键，更换快速模型或主模型时只失效对应层级的缓存；
+        查询时优先使用主模型的结果
+        """
+        if self.intent_cache is None:
+            return None, None
+
+        processors = {STRONG_TIER: self.llm_processor}
+        if self.fast_processor is not None:
+            processors[FAST_TIER] = self.fast_processor
+        cache_keys = {tier: make_cache_key(user_input, context, processor.cache_signature(),
+                                           INTENT_CACHE_CONFIG["context_turns"])
+                      for tier, processor in processors.items()}
+
+        for cache_key in cache_keys.values():
+            llm_response = self.intent_cache.get(cache_key)
+            if llm_response is not None:
+                break
+        else:
+            return cache_keys, None
+
+        self.logger.debug("意图缓存命中")
+        # 复制缓存值，避免调用方修改参数影响缓存
+        result = self._interpret_llm_response(copy.deepcopy(llm_response))
+        result["cached"] = True
+        return cache_keys, result
+
+    def _store_result(self, cache_keys: Optional[Dict[str, str]], user_input: str, llm_response: Dict[str, Any],
+                      elapsed: float = 0.0) -> Dict[str, Any]:
+        """解析主模型的响应，仅缓存解析成功的结果"""
+        result = self._interpret_llm_response(llm_response)
+        if cache_keys and result["success"]:
+            self.intent_cache.set(cache_keys[STRONG_TIER], copy.deepcopy(llm_response))
+        self._record_outcome(user_input, result, STRONG_TIER)
+        if self.fast_processor is not None:
+            self.tier_stats[STRONG_TIER].record(elapsed, escalation_reason(result))
+            result["model_tier"] = STRONG_TIER
+        return result
+
+    def _accept_fast_tier(self, cache_keys: Optional[Dict[str, str]], user_input: str,
+                          llm_response: Dict[str, Any], elapsed: float) -> Optional[Dict[str, Any]]:
+        """
+        校验快速模型的响应
+
+        Returns:
+            可直接采用时返回解析结果(并以快速模型的签名写入缓存)；置信度不足、JSON无效或操作无法映射时返回None，由主模型重新解析
+        """
+        result = self._interpret_llm_response(llm_response)
+        reason = escalation_reason(result)
+        self.tier_stats[FAST_TIER].record(elapsed, reason)
+        if reason is not None:
+            self.logger.debug(f"快速模型结果不可用({reason})，升级到主模型")
+            return None
+
+        if cache_keys:
+            self.intent_cache.set(cache_keys[FAST_TIER], copy.deepcopy(llm_response))
+        self._record_outcome(user_input, result, FAST_TIER)
+        result["model_tier"] = FAST_TIER
+        return result
+
+    def cascade_stats(self) -> Optional[Dict[str, Any]]:
+        """各模型层级的命中率和耗时，未启用级联时返回None"""
+        if self.fast_processor is None:
+            return None
+        fast_calls = self.tier_stats[FAST_TIER].calls
+        return {
+            "fast_model": self.fast_processor.model,
+            FAST_TIER: self.tier_stats[FAST_TIER].stats(),
+            STRONG_TIER: self.tier_stats[STRONG_TIER].stats(),
+            "escalation_rate": self.tier_stats[STRONG_TIER].calls / fast_calls if fast_calls else 0.0,
+        }
+
+    def _interpret_llm_response(self, llm_response: Dict[str, Any]) -> Dict[str, Any]:
+        """解析LLM响应，上下文统计单独返回，不进入缓存"""
+        context_stats = llm_response.pop("context_stats", None)
+        result = self._validate_llm_response(llm_response)
+        if context_stats is not None:
+            result["context_stats"] = context_stats
+        return result
+
+    def _validate_llm_response(self, llm_response: Dict[str, Any]) -> Dict[str, Any]:
+        """校验LLM响应并映射到API操作"""
         if "error" in llm_response:
             self.logger.error(f"LLM处理错误: {llm_response.get('error')}")
             return {
@@ -67,8 +393,9 @@ class IntentParser:
                 "raw_response": llm_response
             }
 
-        # 验证LLM响应格式
-        required_fields = ["action", "parameters"]
+        # 验证LLM响应格式(多步骤计划以steps代替action和parameters)
+        steps = llm_response.get("steps") if self.max_plan_steps > 1 else None
+        required_fields = [] if steps else ["action", "parameters"]
         missing_fields = [field for field in required_fields if field not in llm_response]
 
         if missing_fields:
@@ -79,12 +406,12 @@ class IntentParser:
                 "raw_response": llm_response
             }
 
-        action = llm_response["action"]
-        parameters = llm_response["parameters"]
+        action = llm_response.get("action")
+        parameters = llm_response.get("parameters")
         confidence = llm_response.get("confidence", 0.0)
 
         # 检查置信度
-        if confidence < 0.7:  # 可调整阈值
+        if confidence < self.confidence_threshold:
             clarification = llm_response.get("clarification_questions", [])
             self.logger.info(f"低置信度({confidence}), 需要澄清: {clarification}")
             return {
@@ -96,8 +423,14 @@ class IntentParser:
                 "raw_response": llm_response
             }
 
-        # 查找匹配的API操作
-        api_action = self._map_to_api_action(action)
+        if steps:
+            return self._validate_plan(steps, llm_response, confidence)
+
+        # 查找匹配的API操作(原生工具调用直接给出工具名，无需模糊映射)
+        if llm_response.get("native_tool_call"):
+            api_action = action
+        else:
+            api_action = self._map_to_api_action(action)
         if not api_action:
             self.logger.warning(f"未能映射意图 '{action}' 到API操作")
             return {
@@ -114,6 +447,42 @@ class IntentParser:
             "raw_response": llm_response
         }
 
+    def _validate_plan(self, steps: Any, llm_response: Dict[str, Any], confidence: float) -> Dict[str, Any]:
+        """校验多步骤计划并将各步骤的意图映射到API操作，只有一个步骤时按单个操作返回"""
+        if not isinstance(steps, list) or not all(isinstance(step, dict) for step in steps):
+            return {"success": False, "error": "计划格式无效", "raw_response": llm_response}
+
+        mapped = []
+        for step in steps:
+            action = str(step.get("action", ""))
+            api_action = action if llm_response.get("native_tool_call") else self._map_to_api_action(action)
+            if not api_action:
+                self.logger.warning(f"未能映射计划步骤的意图 '{action}' 到API操作")
+                return {"success": False, "error": f"未支持的操作: {action}", "raw_response": llm_response}
+            mapped.append(dict(step, action=api_action))
+
+        plan, error = build_plan(mapped, self.max_plan_steps)
+        if error:
+            self.logger.warning(f"计划无效: {error}")
+            return {"success": False, "error": error, "raw_response": llm_response}
+
+        if len(plan) == 1:
+            return {
+                "success": True,
+                "action": plan[0]["action"],
+                "parameters": plan[0]["parameters"],
+                "confidence": confidence,
+                "raw_response": llm_response
+            }
+
+        self.logger.info(f"解析为{len(plan)}步计划: {[step['action'] for step in plan]}")
+        return {
+            "success": True,
+            "plan": plan,
+            "confidence": confidence,
+            "raw_response": llm_response
+        }
+
     def _map_to_api_action(self, intent: str) -> Optional[str]:
         """
         将意图映射到API操作
@@ -128,10 +497,24 @@ class IntentParser:
         if intent in self.intent_map:
             return self.intent_map[intent]
 
-        # 关键词匹配(简易模糊匹配)
-        for key, value in self.intent_map.items():
-            if key in intent or intent in key:
-                self.logger.debug(f"模糊匹配意图 '{intent}' 到 '{key}'")
-                return value
+        matcher = self._get_matcher()
+
+        # 提示中的工具目录使用API操作名，模型可能直接给出操作名
+        tools = self.llm_processor.tools
+        if intent in matcher.action_set or (tools and intent in tools):
+            return intent
+
+        # 模糊匹配: 一次扫描找出最长、优先级最高的标签
+        action = matcher.match(intent)
+        if action is not None:
+            self.logger.debug(f"模糊匹配意图 '{intent}' 到 '{action}'")
+        return action
 
-        return None
\ No newline at end of file
+    def _get_matcher(self) -> IntentMatcher:
+        """返回与当前意图映射一致的匹配器，映射修改后首次调用时重建"""
+        version = self.intent_map.version
+        if self._matcher is None or self._matcher_version != version:
+            self._matcher = IntentMatcher(self.intent_map, self.intent_map.priorities)
+            self._matcher_version = version
+            self.logger.debug(f"重建意图匹配器: {len(self._matcher.labels)} 个标签")
+        return self._matcher
\ No newline at end of file
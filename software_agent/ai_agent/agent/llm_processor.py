@@ -1,15 +1,60 @@
 import json
 import os
-from typing import Dict, Any, List, Optional, Union
-import requests
-from ..config import LLM_CONFIG, BASE_CONFIG
+from typing import Dict, Any, List, Optional, Tuple, Union, AsyncIterator
+import httpx
+from ..config import LLM_CONFIG, BASE_CONFIG, PLAN_CONFIG
 from ..utils.logger import setup_logger
+from .tool_schema import compile_tool_schemas
+from .context_builder import ContextBuilder
+from .llm_transport import LLMTransport, get_llm_transport
+from .output_budget import OutputBudget
+from .prompt_builder import PromptBuilder, render_tool_catalog
+from .stream_parser import IncrementalJSONParser
+from .tool_retriever import ToolRetriever
+from ..api.circuit_breaker import CircuitOpenError
+
+# 提示词版本，修改系统提示或消息结构后需递增以使意图缓存失效
+PROMPT_VERSION = "5"
+
+# JSON模式下模型在JSON之后输出的结束标记，作为停止序列截断多余输出
+JSON_STOP_SEQUENCE = "<END>"
+
+# JSON模式下的系统提示
+JSON_SYSTEM_PROMPT = """你是一个AI助手，负责将用户的自然语言指令转换为软件API调用。
+            你需要理解用户的意图，并提取出相应的操作、参数和值。
+            将响应格式化为JSON，包含以下字段:
+            - action: 要执行的操作名称
+            - parameters: 操作所需的参数
+            - confidence: 你对理解正确的置信度(0-1)
+            - clarification_questions: 如果需要更多信息才能正确执行，在这里提出问题
+            只输出JSON，JSON结束后紧接着输出<END>
+            """
+
+# 原生工具调用模式下的系统提示
+NATIVE_TOOL_SYSTEM_PROMPT = """你是一个AI助手，负责将用户的自然语言指令转换为软件API调用。
+请调用最合适的一个工具，并从用户指令中提取其参数。
+如果信息不足以确定工具或必需参数，不要调用工具，直接用文字提出需要澄清的问题。"""
+
+# 启用多步骤计划时追加的说明(JSON模式)
+JSON_PLAN_PROMPT = """如果指令包含多个操作，改为输出steps字段(省略action和parameters)，最多{max_steps}个步骤，每个步骤包含:
+            - id: 步骤编号，如s1、s2
+            - action、parameters: 同上；参数需要使用前面步骤的结果时写作"$步骤编号.字段"，如"$s1.id"
+            - depends_on: 必须先完成的步骤编号列表，相互独立的步骤留空以便并行执行
+            """
+
+# 启用多步骤计划时追加的说明(原生工具调用模式，同一轮的多个调用相互独立)
+NATIVE_PLAN_PROMPT = """如果指令包含多个相互独立的操作，可以同时调用多个工具。"""
 
 
 class LLMProcessor:
     """处理与大型语言模型的交互"""
 
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(
+            self,
+            config: Dict[str, Any] = None,
+            tools: Optional[Dict[str, Any]] = None,
+            tool_retriever: Optional[ToolRetriever] = None
+    ):
         self.config = config or LLM_CONFIG
         self.provider = self.config["provider"]
         self.model = self.config["model"]
@@ -18,6 +63,113 @@ class LLMProcessor:
         self.max_tokens = self.config["max_tokens"]
         self.temperature = self.config["temperature"]
         self.logger = setup_logger("llm_processor", log_level=BASE_CONFIG["log_level"])
+        self.transport: LLMTransport = get_llm_transport(self.provider, self.api_base, self.config)
+
+        # 工具调用模式: json(自由格式JSON) / native(原生function calling / tool_use)
+        self.tools = tools
+        self.tool_mode = self.config.get("tool_mode", "json")
+        if self.tool_mode == "native" and not self.tools:
+            self.logger.warning("原生工具调用模式需要工具注册表，回退到JSON模式")
+            self.tool_mode = "json"
+
+        # 按消息检索相关工具，只发送top-k个工具；未启用时发送完整工具目录
+        self.tool_retriever = tool_retriever if self.tools else None
+
+        # 原生工具定义在构建时编译一次，注册表变化后调用refresh_tool_schemas重新编译
+        self.tool_schemas: Optional[Dict[str, Any]] = None
+        self.refresh_tool_schemas()
+
+        # 系统指令和工具目录组成稳定的静态前缀，供提供商缓存；启用工具检索时目录随消息变化，放在前缀之后
+        self.plan_steps = PLAN_CONFIG["max_steps"] if PLAN_CONFIG["enabled"] else 1
+        self.prompt_builder = PromptBuilder(
+            self._instructions(),
+            self.tools,
+            include_catalog=not self.native_tools and self.tool_retriever is None
+        )
+
+        # 意图提取按工具参数表推导输出上限，max_tokens仅作为截断重试的上限；上下文按重试上限预留输出空间
+        self.output_budget = OutputBudget(
+            self.tools,
+            max_tokens=self.max_tokens,
+            intent_max_tokens=self.config.get("intent_max_tokens", 0),
+            retry_multiplier=self.config.get("intent_retry_multiplier", 4),
+            plan_steps=self.plan_steps
+        )
+        self.context_builder = ContextBuilder(self.config.get("context_window"), self.output_budget.retry_cap)
+
+    def cache_signature(self) -> str:
+        """影响模型输出的配置签名，用作意图缓存键的一部分"""
+        parts = [self.provider, self.model, str(self.temperature), self.tool_mode, PROMPT_VERSION]
+        if self.tools:
+            # 提示中的工具目录(或原生工具定义)随注册表变化
+            parts.append(self.prompt_builder.tools_version)
+        if self.tool_retriever is not None:
+            parts.append(f"top{self.tool_retriever.top_k}")
+        if self.plan_steps > 1:
+            parts.append(f"plan{self.plan_steps}")
+        return "|".join(parts)
+
+    def refresh_tool_schemas(self):
+        """重新编译工具注册表的原生工具定义"""
+        self.tool_schemas = compile_tool_schemas(self.tools) if self.tools else None
+
+    def _instructions(self) -> str:
+        """系统指令，启用多步骤计划时追加计划格式说明"""
+        if self.native_tools:
+            return NATIVE_TOOL_SYSTEM_PROMPT + ("\n" + NATIVE_PLAN_PROMPT if self.plan_steps > 1 else "")
+        if self.plan_steps > 1:
+            return JSON_SYSTEM_PROMPT.rstrip() + "\n            " + JSON_PLAN_PROMPT.format(max_steps=self.plan_steps)
+        return JSON_SYSTEM_PROMPT
+
+    @property
+    def native_tools(self) -> bool:
+        return self.tool_mode == "native"
+
+    @property
+    def system_prompt(self) -> str:
+        return self.prompt_builder.static_prompt
+
+    def _native_result(self, name: str, arguments: Any) -> Dict[str, Any]:
+        """将原生工具调用转换为意图结果"""
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError:
+                self.logger.error(f"工具调用参数不是有效JSON: {arguments}")
+                return {"error": "无法解析工具调用参数", "raw_response": arguments}
+
+        return {
+            "action": name,
+            "parameters": arguments or {},
+            "confidence": 1.0,
+            "clarification_questions": [],
+            "native_tool_call": True,
+            "schema_version": self.tool_schemas["version"]
+        }
+
+    def _native_calls(self, calls: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """将一轮中的多个原生工具调用转换为意图结果，多于一个时附带相互独立的计划步骤"""
+        results = [self._native_result(name, arguments) for name, arguments in calls]
+        result = results[0]
+        if len(results) == 1 or self.plan_steps <= 1:
+            return result
+        failed = next((item for item in results if "error" in item), None)
+        if failed is not None:
+            return failed
+        result["steps"] = [{"id": f"s{index}", "action": item["action"], "parameters": item["parameters"]}
+                           for index, item in enumerate(results, 1)]
+        return result
+
+    @staticmethod
+    def _native_clarification(text: str) -> Dict[str, Any]:
+        """模型未调用工具时，将其文字回复作为澄清问题"""
+        return {
+            "action": "",
+            "parameters": {},
+            "confidence": 0.0,
+            "clarification_questions": [text.strip()] if text and text.strip() else [],
+            "native_tool_call": True
+        }
 
     def _get_default_api_base(self) -> str:
         """获取默认API基础URL"""
@@ -47,152 +199,445 @@ class LLMProcessor:
             self.logger.error(f"不支持的LLM提供商: {self.provider}")
             return {"error": f"不支持的LLM提供商: {self.provider}"}
 
-    def _call_openai_api(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
-        """调用OpenAI API"""
+    def complete_text(self, system_prompt: str, prompt: str, max_tokens: int) -> Dict[str, Any]:
+        """
+        生成纯文本回复(不使用意图提示和工具)，用于对话摘要等辅助任务
+
+        Returns:
+            {"text": 回复文本}，失败时返回 {"error": ...}
+        """
+        if self.provider == "openai":
+            url = f"{self.api_base}/chat/completions"
+            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+            data = {
+                "model": self.model,
+                "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+                "temperature": 0,
+                "max_tokens": max_tokens
+            }
+        elif self.provider == "anthropic":
+            url = f"{self.api_base}/messages"
+            headers = {"x-api-key": self.api_key, "Content-Type": "application/json",
+                       "anthropic-version": "2023-06-01"}
+            data = {
+                "model": self.model,
+                "system": system_prompt,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0,
+                "max_tokens": max_tokens
+            }
+        else:
+            return {"error": f"不支持的LLM提供商: {self.provider}"}
+
+        try:
+            response = self.transport.post(url, headers=headers, json=data)
+            response.raise_for_status()
+            response_data = response.json()
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            self.logger.error(f"API请求失败: {str(e)}")
+            return {"error": f"API请求失败: {str(e)}"}
+
+        if self.provider == "openai":
+            text = response_data["choices"][0]["message"].get("content") or ""
+        else:
+            text = "".join(block.get("text", "") for block in response_data.get("content", [])
+                           if block.get("type") == "text")
+        return {"text": text.strip()}
+
+    async def process_input_async(self, user_input: str,
+                                  context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        异步处理用户输入，等待LLM响应期间不阻塞事件循环
+
+        Args:
+            user_input: 用户的自然语言输入
+            context: 可选的对话上下文
+
+        Returns:
+            包含LLM响应的字典
+        """
+        if self.provider == "openai":
+            url, headers, data, context_stats = self._build_openai_request(user_input, context)
+            parse_response, stop_reason = self._parse_openai_response, self._openai_stop_reason
+            self.logger.debug(f"异步调用OpenAI API: {self.model}")
+        elif self.provider == "anthropic":
+            url, headers, data, context_stats = self._build_anthropic_request(user_input, context)
+            parse_response, stop_reason = self._parse_anthropic_response, self._anthropic_stop_reason
+            self.logger.debug(f"异步调用Anthropic API: {self.model}")
+        else:
+            self.logger.error(f"不支持的LLM提供商: {self.provider}")
+            return {"error": f"不支持的LLM提供商: {self.provider}"}
+
+        try:
+            result = await self._request_intent_async(url, headers, data, parse_response, stop_reason)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            self.logger.error(f"API请求失败: {str(e)}")
+            result = {"error": f"API请求失败: {str(e)}"}
+
+        result["context_stats"] = context_stats
+        return result
+
+    async def stream_input_async(self, user_input: str,
+                                 context: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        以流式方式调用LLM，逐段产出模型输出
+
+        Args:
+            user_input: 用户的自然语言输入
+            context: 可选的对话上下文
+
+        Yields:
+            {"type": "token", "text": ...} 形式的增量文本，
+            原生工具调用的参数生成完毕时产出 {"type": "tool_call", "index", "name", "arguments"}，
+            最后产出 {"type": "result", "result": ...} 形式的解析结果
+        """
+        if self.provider == "openai":
+            url, headers, data, context_stats = self._build_openai_request(user_input, context)
+            extract_delta = self._extract_openai_delta
+            parse_response, get_stop_reason = self._parse_openai_response, self._openai_stop_reason
+        elif self.provider == "anthropic":
+            url, headers, data, context_stats = self._build_anthropic_request(user_input, context)
+            extract_delta = self._extract_anthropic_delta
+            parse_response, get_stop_reason = self._parse_anthropic_response, self._anthropic_stop_reason
+        else:
+            self.logger.error(f"不支持的LLM提供商: {self.provider}")
+            yield {"type": "result", "result": {"error": f"不支持的LLM提供商: {self.provider}"}}
+            return
+
+        data["stream"] = True
+        if self.provider == "openai":
+            # 流式响应默认不含usage，需显式请求
+            data["stream_options"] = {"include_usage": True}
+        chunks = []
+        calls: Dict[int, Dict[str, Any]] = {}  # 工具调用序号 -> 名称和参数片段
+        stop_reason = None
+        usage = None
+
+        try:
+            self.logger.debug(f"流式调用{self.provider} API: {self.model}")
+            async with self.transport.stream_async(url, headers=headers, json=data) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    # SSE格式: 仅处理 "data:" 行
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if not payload or payload == "[DONE]":
+                        continue
+                    try:
+                        delta = extract_delta(json.loads(payload))
+                    except json.JSONDecodeError:
+                        self.logger.warning(f"无法解析流式数据: {payload}")
+                        continue
+
+                    if delta.get("name") or delta.get("arguments"):
+                        call = calls.setdefault(delta.get("index", 0),
+                                                {"name": None, "chunks": [], "parser": IncrementalJSONParser()})
+                        call["name"] = delta.get("name") or call["name"]
+                    stop_reason = delta.get("stop_reason") or stop_reason
+                    usage = delta.get("usage") or usage
+                    if delta.get("arguments"):
+                        call["chunks"].append(delta["arguments"])
+                        yield {"type": "token", "text": delta["arguments"]}
+
+                        # 参数对象闭合后立即通知调用方，无需等待后续工具调用和流结束
+                        completed = call["parser"].completed
+                        call["parser"].feed(delta["arguments"])
+                        if not completed and call["parser"].completed and call["name"]:
+                            yield {"type": "tool_call", "index": delta.get("index", 0), "name": call["name"],
+                                   "arguments": call["parser"].fields}
+                    if delta.get("text"):
+                        chunks.append(delta["text"])
+                        yield {"type": "token", "text": delta["text"]}
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            self.logger.error(f"API请求失败: {str(e)}")
+            yield {"type": "result", "result": {"error": f"API请求失败: {str(e)}", "context_stats": context_stats}}
+            return
+
+        self.prompt_builder.cache_stats.record(self.provider, usage)
+        truncated = self.output_budget.is_truncated(stop_reason)
+        self.output_budget.record(truncated)
+        if truncated and self.output_budget.should_reask(data["max_tokens"]):
+            # 已转发的片段不完整，以较大上限非流式重新请求，直接产出解析结果
+            data.pop("stream")
+            data.pop("stream_options", None)
+            try:
+                result = parse_response(await self._reask_async(url, headers, data, get_stop_reason))
+            except (httpx.HTTPError, CircuitOpenError) as e:
+                self.logger.error(f"API请求失败: {str(e)}")
+                result = {"error": f"API请求失败: {str(e)}"}
+            result["context_stats"] = context_stats
+            yield {"type": "result", "result": result}
+            return
+
+        calls = [calls[index] for index in sorted(calls) if calls[index]["name"]]
+        if calls:
+            result = self._native_calls([(call["name"], "".join(call["chunks"])) for call in calls])
+        elif self.native_tools:
+            result = self._native_clarification("".join(chunks))
+        else:
+            result = self._extract_json("".join(chunks))
+        result["context_stats"] = context_stats
+        yield {"type": "result", "result": result}
+
+    @staticmethod
+    def _extract_openai_delta(event: Dict[str, Any]) -> Dict[str, str]:
+        """提取OpenAI流式响应中的增量文本或工具调用片段"""
+        choices = event.get("choices") or [{}]
+        delta = choices[0].get("delta", {})
+        result = {"text": delta.get("content") or "", "stop_reason": choices[0].get("finish_reason"),
+                  "usage": event.get("usage")}
+
+        tool_calls = delta.get("tool_calls") or []
+        if tool_calls:
+            function = tool_calls[0].get("function", {})
+            result["index"] = tool_calls[0].get("index", 0)
+            result["name"] = function.get("name")
+            result["arguments"] = function.get("arguments") or ""
+        return result
+
+    @staticmethod
+    def _extract_anthropic_delta(event: Dict[str, Any]) -> Dict[str, str]:
+        """提取Anthropic流式响应中的增量文本或工具调用片段"""
+        event_type = event.get("type")
+        if event_type == "message_start":
+            return {"usage": event.get("message", {}).get("usage")}
+        elif event_type == "content_block_start":
+            block = event.get("content_block", {})
+            if block.get("type") == "tool_use":
+                return {"name": block.get("name"), "index": event.get("index", 0)}
+        elif event_type == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "input_json_delta":
+                return {"arguments": delta.get("partial_json") or "", "index": event.get("index", 0)}
+            return {"text": delta.get("text") or ""}
+        elif event_type == "message_delta":
+            return {"stop_reason": event.get("delta", {}).get("stop_reason")}
+        return {}
+
+    @staticmethod
+    def _openai_stop_reason(response_data: Dict[str, Any]) -> Optional[str]:
+        return (response_data.get("choices") or [{}])[0].get("finish_reason")
+
+    @staticmethod
+    def _anthropic_stop_reason(response_data: Dict[str, Any]) -> Optional[str]:
+        return response_data.get("stop_reason")
+
+    def _post(self, url: str, headers: Dict[str, str], data: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.transport.post(url, headers=headers, json=data)
+        response.raise_for_status()
+        response_data = response.json()
+        self.prompt_builder.cache_stats.record(self.provider, response_data.get("usage"))
+        return response_data
+
+    async def _post_async(self, url: str, headers: Dict[str, str], data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.transport.post_async(url, headers=headers, json=data)
+        response.raise_for_status()
+        response_data = response.json()
+        self.prompt_builder.cache_stats.record(self.provider, response_data.get("usage"))
+        return response_data
+
+    def _request_intent(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                        parse_response, stop_reason) -> Dict[str, Any]:
+        """发送意图提取请求，输出因达到上限被截断时以重试上限重新请求一次"""
+        response_data = self._post(url, headers, data)
+        truncated = self.output_budget.is_truncated(stop_reason(response_data))
+        self.output_budget.record(truncated)
+        if truncated and self.output_budget.should_reask(data["max_tokens"]):
+            self.logger.warning(f"输出在{data['max_tokens']}个token处被截断，以{self.output_budget.retry_cap}重新请求")
+            response_data = self._post(url, headers, dict(data, max_tokens=self.output_budget.retry_cap))
+            self.output_budget.record_reask(self.output_budget.is_truncated(stop_reason(response_data)))
+        return parse_response(response_data)
+
+    async def _request_intent_async(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                                    parse_response, stop_reason) -> Dict[str, Any]:
+        """异步发送意图提取请求，截断处理同_request_intent"""
+        response_data = await self._post_async(url, headers, data)
+        truncated = self.output_budget.is_truncated(stop_reason(response_data))
+        self.output_budget.record(truncated)
+        if truncated and self.output_budget.should_reask(data["max_tokens"]):
+            response_data = await self._reask_async(url, headers, data, stop_reason)
+        return parse_response(response_data)
+
+    async def _reask_async(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                           stop_reason) -> Dict[str, Any]:
+        """输出被截断后以重试上限重新请求一次"""
+        self.logger.warning(f"输出在{data['max_tokens']}个token处被截断，以{self.output_budget.retry_cap}重新请求")
+        response_data = await self._post_async(url, headers, dict(data, max_tokens=self.output_budget.retry_cap))
+        self.output_budget.record_reask(self.output_budget.is_truncated(stop_reason(response_data)))
+        return response_data
+
+    def close(self):
+        """关闭同步连接池"""
+        self.transport.close()
+
+    async def close_async(self):
+        """关闭异步连接池"""
+        await self.transport.close_async()
+
+    def _extract_json(self, content: str) -> Dict[str, Any]:
+        """从LLM返回的文本中提取JSON"""
+        try:
+            # 尝试直接解析为JSON
+            return json.loads(content)
+        except json.JSONDecodeError:
+            # 如果失败，尝试从文本中提取JSON部分
+            self.logger.warning("直接JSON解析失败，尝试从文本提取")
+            json_start = content.find("{")
+            json_end = content.rfind("}") + 1
+            if json_start >= 0 and json_end > json_start:
+                json_str = content[json_start:json_end]
+                try:
+                    return json.loads(json_str)
+                except json.JSONDecodeError:
+                    self.logger.error("无法从响应中提取有效JSON")
+                    return {"error": "无法解析语言模型响应", "raw_response": content}
+            else:
+                return {"error": "响应中没有找到JSON格式", "raw_response": content}
+
+    def _retrieve_tools(self, user_input: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        检索与本条消息相关的工具
+
+        Returns:
+            (选中的工具，None表示完整工具集; JSON模式下随消息变化的工具目录，None表示目录已在静态前缀中)
+        """
+        if self.tool_retriever is None:
+            return None, None
+        selected = self.tool_retriever.retrieve(user_input)
+        if self.native_tools:
+            return selected, None
+        return selected, render_tool_catalog(selected or self.tools)
+
+    def _tool_definitions(self, provider: str, selected: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """原生工具定义，检索到的工具从完整编译结果中筛选，避免按子集重复编译"""
+        definitions = self.tool_schemas[provider]
+        if selected is None:
+            return definitions
+        if provider == "openai":
+            return [tool for tool in definitions if tool["function"]["name"] in selected]
+        return [tool for tool in definitions if tool["name"] in selected]
+
+    def _build_openai_request(self, user_input: str, context: Optional[List[Dict[str, str]]] = None):
+        """构建OpenAI API请求，返回(url, headers, data, 上下文统计)"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        # 准备消息
-        messages = []
-        if context:
-            messages.extend(context)
-
-        # 添加系统提示
-        messages.append({
-            "role": "system",
-            "content": """你是一个AI助手，负责将用户的自然语言指令转换为软件API调用。
-            你需要理解用户的意图，并提取出相应的操作、参数和值。
-            将响应格式化为JSON，包含以下字段:
-            - action: 要执行的操作名称
-            - parameters: 操作所需的参数
-            - confidence: 你对理解正确的置信度(0-1)
-            - clarification_questions: 如果需要更多信息才能正确执行，在这里提出问题
-            """
-        })
-
-        messages.append({
-            "role": "user",
-            "content": user_input
-        })
+        # 准备消息: 静态系统提示在前(自动前缀缓存)，随后是预算内的最近历史
+        selected, catalog = self._retrieve_tools(user_input)
+        system_prompt = "\n\n".join(part for part in (self.system_prompt, catalog) if part)
+        history, context_stats = self.context_builder.build(system_prompt, context, user_input)
 
         # 请求体
         data = {
             "model": self.model,
-            "messages": messages,
+            "messages": self.prompt_builder.openai_messages(history, user_input, catalog),
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens
+            "max_tokens": self.output_budget.intent_cap
         }
 
-        try:
-            self.logger.debug(f"调用OpenAI API: {self.model}")
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=data
-            )
-            response.raise_for_status()
-            response_data = response.json()
+        if self.native_tools:
+            data["tools"] = self._tool_definitions("openai", selected)
+            data["tool_choice"] = "auto"
+        else:
+            data["stop"] = [JSON_STOP_SEQUENCE]
 
-            # 提取内容
-            content = response_data["choices"][0]["message"]["content"]
+        return f"{self.api_base}/chat/completions", headers, data, context_stats
 
-            # 提取JSON
-            try:
-                # 尝试直接解析为JSON
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # 如果失败，尝试从文本中提取JSON部分
-                self.logger.warning("直接JSON解析失败，尝试从文本提取")
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    try:
-                        result = json.loads(json_str)
-                    except json.JSONDecodeError:
-                        self.logger.error("无法从响应中提取有效JSON")
-                        result = {"error": "无法解析语言模型响应", "raw_response": content}
-                else:
-                    result = {"error": "响应中没有找到JSON格式", "raw_response": content}
+    def _parse_openai_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从OpenAI API响应中提取意图JSON"""
+        message = response_data["choices"][0]["message"]
+        content = message.get("content") or ""
 
-            return result
+        if self.native_tools:
+            tool_calls = message.get("tool_calls") or []
+            if tool_calls:
+                return self._native_calls([(call["function"]["name"], call["function"].get("arguments", ""))
+                                           for call in tool_calls])
+            return self._native_clarification(content)
 
-        except requests.exceptions.RequestException as e:
+        return self._extract_json(content)
+
+    def _call_openai_api(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """调用OpenAI API"""
+        url, headers, data, context_stats = self._build_openai_request(user_input, context)
+
+        try:
+            self.logger.debug(f"调用OpenAI API: {self.model}")
+            result = self._request_intent(url, headers, data, self._parse_openai_response, self._openai_stop_reason)
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
             self.logger.error(f"API请求失败: {str(e)}")
-            return {"error": f"API请求失败: {str(e)}"}
+            result = {"error": f"API请求失败: {str(e)}"}
 
-    def _call_anthropic_api(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
-        """调用Anthropic API (Claude)"""
+        result["context_stats"] = context_stats
+        return result
+
+    def _build_anthropic_request(self, user_input: str, context: Optional[List[Dict[str, str]]] = None):
+        """构建Anthropic API请求，返回(url, headers, data, 上下文统计)"""
         headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json",
             "anthropic-version": "2023-06-01"
         }
 
-        # 准备消息
-        system_prompt = """你是一个AI助手，负责将用户的自然语言指令转换为软件API调用。
-        你需要理解用户的意图，并提取出相应的操作、参数和值。
-        将响应格式化为JSON，包含以下字段:
-        - action: 要执行的操作名称
-        - parameters: 操作所需的参数
-        - confidence: 你对理解正确的置信度(0-1)
-        - clarification_questions: 如果需要更多信息才能正确执行，在这里提出问题
-        """
-
-        messages = []
-        if context:
-            for msg in context:
-                role = msg["role"]
-                if role == "user":
-                    messages.append({"role": "user", "content": msg["content"]})
-                elif role == "assistant":
-                    messages.append({"role": "assistant", "content": msg["content"]})
+        # 准备消息: Anthropic仅接受user/assistant角色，且历史需以用户消息开头；
+        # 固定消息(对话摘要)作为缓存断点之后的系统块
+        selected, catalog = self._retrieve_tools(user_input)
+        pinned = [msg for msg in (context or []) if msg.get("pinned")]
+        system_prompt = "\n\n".join([self.system_prompt] + [msg["content"] for msg in pinned]
+                                  + ([catalog] if catalog else []))
+        context = [msg for msg in (context or []) if msg["role"] in ("user", "assistant") and not msg.get("pinned")]
+        messages, context_stats = self.context_builder.build(system_prompt, context, user_input,
+                                                             start_with_user=True)
 
         # 请求体
         data = {
             "model": self.model,
-            "system": system_prompt,
+            "system": self.prompt_builder.anthropic_system(pinned, catalog),
             "messages": messages + [{"role": "user", "content": user_input}],
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens
+            "max_tokens": self.output_budget.intent_cap
         }
 
-        try:
-            self.logger.debug(f"调用Anthropic API: {self.model}")
-            response = requests.post(
-                f"{self.api_base}/messages",
-                headers=headers,
-                json=data
-            )
-            response.raise_for_status()
-            response_data = response.json()
+        if self.native_tools:
+            data["tools"] = self._tool_definitions("anthropic", selected)
+        else:
+            data["stop_sequences"] = [JSON_STOP_SEQUENCE]
 
-            # 提取内容
-            content = response_data["content"][0]["text"]
+        return f"{self.api_base}/messages", headers, data, context_stats
 
-            # 提取JSON
-            try:
-                # 尝试直接解析为JSON
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # 如果失败，尝试从文本中提取JSON部分
-                self.logger.warning("直接JSON解析失败，尝试从文本提取")
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    try:
-                        result = json.loads(json_str)
-                    except json.JSONDecodeError:
-                        self.logger.error("无法从响应中提取有效JSON")
-                        result = {"error": "无法解析语言模型响应", "raw_response": content}
-                else:
-                    result = {"error": "响应中没有找到JSON格式", "raw_response": content}
+    def _parse_anthropic_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从Anthropic API响应中提取意图JSON"""
+        if self.native_tools:
+            text_parts = []
+            calls = []
+            for block in response_data.get("content", []):
+                if block.get("type") == "tool_use":
+                    calls.append((block["name"], block.get("input", {})))
+                if block.get("type") == "text":
+                    text_parts.append(block.get("text", ""))
+            if calls:
+                return self._native_calls(calls)
+            return self._native_clarification("".join(text_parts))
 
-            return result
+        content = response_data["content"][0]["text"]
+        return self._extract_json(content)
+
+    def _call_anthropic_api(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """调用Anthropic API (Claude)"""
+        url, headers, data, context_stats = self._build_anthropic_request(user_input, context)
 
-        except requests.exceptions.RequestException as e:
+        try:
+            self.logger.debug(f"调用Anthropic API: {self.model}")
+            result = self._request_intent(url, headers, data, self._parse_anthropic_response,
+                                          self._anthropic_stop_reason)
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
             self.logger.error(f"API请求失败: {str(e)}")
-            return {"error": f"API请求失败: {str(e)}"}
\ No newline at end of file
+            result = {"error": f"API请求失败: {str(e)}"}
+
+        result["context_stats"] = context_stats
+        return result
\ No newline at end of file
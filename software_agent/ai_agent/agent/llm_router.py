@@ -0,0 +1,336 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from ..config import BASE_CONFIG, LLM_CONFIG, LLM_ROUTER_CONFIG
+from ..utils.logger import setup_logger
+from .llm_processor import LLMProcessor
+from .context_builder import ContextBuilder
+from .llm_transport import LLMTransport
+from .tool_retriever import ToolRetriever
+
+
+class LatencyWindow:
+    """保存最近若干次成功调用的耗时，用于计算滚动分位数"""
+
+    def __init__(self, size: int = 200):
+        self._samples: "deque[float]" = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回q分位数(0-1)，无样本时返回None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class LLMRouter:
+    """
+    多提供商LLM路由，接口与LLMProcessor一致
+
+    按顺序持有多个提供商/模型配置:
+    - 出错(包括熔断打开、响应无法解析)时依次故障转移到下一个提供商
+    - 异步解析时，若首选提供商超过其滚动p95耗时仍未返回，向下一个提供商发出对冲请求，
+      取先返回的有效意图并取消另一个请求
+    同步调用和流式调用无法中途切换结果，只做故障转移，不做对冲
+    """
+
+    def __init__(
+            self,
+            processors: List[LLMProcessor],
+            hedge_enabled: bool = True,
+            hedge_percentile: float = 0.95,
+            hedge_default_delay: float = 3.0,
+            hedge_min_delay: float = 0.2,
+            hedge_max_ratio: float = 0.1,
+            latency_window: int = 200,
+            min_samples: int = 20
+    ):
+        if not processors:
+            raise ValueError("LLMRouter至少需要一个LLMProcessor")
+        self.processors = processors
+        self.hedge_enabled = hedge_enabled and len(processors) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio  # 对冲请求数占总请求数的上限，避免整体变慢时请求量翻倍
+        self.min_samples = min_samples
+        self.logger = setup_logger("llm_router", log_level=BASE_CONFIG["log_level"])
+
+        self._latencies = [LatencyWindow(latency_window) for _ in processors]
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._wins = [0] * len(processors)
+        self._errors = [0] * len(processors)
+
+    @property
+    def primary(self) -> LLMProcessor:
+        return self.processors[0]
+
+    # 以下属性委托给首选提供商，供IntentParser和服务容器使用
+
+    @property
+    def transport(self) -> LLMTransport:
+        return self.primary.transport
+
+    @property
+    def context_builder(self) -> ContextBuilder:
+        return self.primary.context_builder
+
+    @property
+    def tools(self) -> Optional[Dict[str, Any]]:
+        return self.primary.tools
+
+    @property
+    def tool_retriever(self) -> Optional[ToolRetriever]:
+        return self.primary.tool_retriever
+
+    @property
+    def native_tools(self) -> bool:
+        return self.primary.native_tools
+
+    @property
+    def system_prompt(self) -> str:
+        return self.primary.system_prompt
+
+    def cache_signature(self) -> str:
+        """
+        以首选提供商的签名作为缓存键
+
+        备用提供商产出的是同一套动作和参数，共用缓存可避免故障转移期间缓存被分片
+        """
+        return self.primary.cache_signature()
+
+    @staticmethod
+    def _name(processor: LLMProcessor) -> str:
+        return f"{processor.provider}:{processor.model}"
+
+    @staticmethod
+    def _is_valid(result: Dict[str, Any]) -> bool:
+        """请求失败或响应无法解析时返回的结果带有error字段"""
+        return "error" not in result
+
+    def hedge_delay(self) -> float:
+        """对冲等待时间: 首选提供商的滚动p95耗时，样本不足时使用默认值"""
+        window = self._latencies[0]
+        if len(window) < self.min_samples:
+            return self.hedge_default_delay
+        return max(window.percentile(self.hedge_percentile), self.hedge_min_delay)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.requests * self.hedge_max_ratio:
+                return False
+            self.hedges += 1
+            return True
+
+    def _start_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _record(self, index: int, result: Dict[str, Any], elapsed: float) -> bool:
+        """记录单个提供商的调用结果，返回结果是否有效"""
+        valid = self._is_valid(result)
+        with self._lock:
+            if valid:
+                self._wins[index] += 1
+            else:
+                self._errors[index] += 1
+        if valid:
+            self._latencies[index].add(elapsed)
+        else:
+            self.logger.warning(f"{self._name(self.processors[index])} 调用失败: {result.get('error')}")
+        return valid
+
+    def _record_failover(self, index: int):
+        with self._lock:
+            self.failovers += 1
+        self.logger.warning(f"故障转移到 {self._name(self.processors[index])}")
+
+    def process_input(self, user_input: str, context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """同步处理用户输入，失败时依次故障转移"""
+        self._start_request()
+        result: Dict[str, Any] = {}
+        for index, processor in enumerate(self.processors):
+            if index:
+                self._record_failover(index)
+            start = time.perf_counter()
+            result = processor.process_input(user_input, context)
+            if self._record(index, result, time.perf_counter() - start):
+                return result
+        return result
+
+    def complete_text(self, system_prompt: str, prompt: str, max_tokens: int) -> Dict[str, Any]:
+        """生成纯文本回复，失败时依次故障转移"""
+        result: Dict[str, Any] = {}
+        for index, processor in enumerate(self.processors):
+            if index:
+                self._record_failover(index)
+            result = processor.complete_text(system_prompt, prompt, max_tokens)
+            if "error" not in result:
+                return result
+        return result
+
+    async def _call_async(self, index: int, user_input: str,
+                          context: Optional[List[Dict[str, str]]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = await self.processors[index].process_input_async(user_input, context)
+        self._record(index, result, time.perf_counter() - start)
+        return result
+
+    async def process_input_async(self, user_input: str,
+                                  context: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        异步处理用户输入
+
+        首选提供商超过对冲等待时间未返回时，同时请求下一个提供商，先返回有效结果者胜出；
+        所有在途请求均失败时故障转移到尚未尝试的提供商
+
+        Returns:
+            第一个有效结果；全部失败时返回最后一个错误结果
+        """
+        self._start_request()
+        pending: Dict[asyncio.Task, int] = {}
+        next_index = 0
+        hedged = False
+        result: Dict[str, Any] = {}
+
+        def launch():
+            nonlocal next_index
+            task = asyncio.ensure_future(self._call_async(next_index, user_input, context))
+            pending[task] = next_index
+            next_index += 1
+
+        launch()
+        hedge_at = time.perf_counter() + self.hedge_delay() if self.hedge_enabled else None
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None and not hedged and next_index < len(self.processors):
+                    timeout = max(hedge_at - time.perf_counter(), 0.0)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 仅对冲一次，超出对冲比例上限时继续等待首选提供商
+                    hedged = True
+                    if self._acquire_hedge():
+                        self.logger.debug(f"首选提供商超过{self.hedge_delay():.2f}秒未返回，发出对冲请求")
+                        launch()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    result = task.result()
+                    if self._is_valid(result):
+                        if hedged and index > 0:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return result
+
+                if not pending and next_index < len(self.processors):
+                    self._record_failover(next_index)
+                    launch()
+            return result
+
+        finally:
+            # 取消落败的请求，等待其释放连接和熔断探测名额
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def stream_input_async(self, user_input: str,
+                                 context: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式处理用户输入
+
+        在产出第一段输出之前失败时故障转移到下一个提供商；已开始输出后不再切换
+        """
+        self._start_request()
+        event: Dict[str, Any] = {}
+        for index, processor in enumerate(self.processors):
+            if index:
+                self._record_failover(index)
+            started_output = False
+            start = time.perf_counter()
+            async for event in processor.stream_input_async(user_input, context):
+                if event["type"] in ("token", "tool_call"):
+                    started_output = True
+                    yield event
+                    continue
+
+                valid = self._record(index, event["result"], time.perf_counter() - start)
+                if valid or started_output or index == len(self.processors) - 1:
+                    yield event
+                    return
+
+    def close(self):
+        for processor in self.processors:
+            processor.close()
+
+    async def close_async(self):
+        for processor in self.processors:
+            await processor.close_async()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = []
+            for index, processor in enumerate(self.processors):
+                p95 = self._latencies[index].percentile(self.hedge_percentile)
+                providers.append({
+                    "name": self._name(processor),
+                    "wins": self._wins[index],
+                    "errors": self._errors[index],
+                    "p95_ms": p95 * 1000 if p95 is not None else None,
+                })
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "failovers": self.failovers,
+                "hedge_delay_ms": self.hedge_delay() * 1000 if self.hedge_enabled else None,
+                "providers": providers,
+            }
+
+
+def create_llm_router(
+        primary: LLMProcessor,
+        config: Dict[str, Any] = None
+) -> Optional[LLMRouter]:
+    """根据配置创建多提供商路由，未配置备用提供商时返回None"""
+    config = config or LLM_ROUTER_CONFIG
+    fallbacks = config.get("fallbacks") or []
+    if not fallbacks:
+        return None
+
+    processors = [primary]
+    for fallback in fallbacks:
+        # 备用提供商沿用主配置的连接池、重试等设置，仅替换提供商、模型和凭据
+        processors.append(LLMProcessor(dict(LLM_CONFIG, **fallback), tools=primary.tools,
+                                       tool_retriever=primary.tool_retriever))
+
+    return LLMRouter(
+        processors,
+        hedge_enabled=config["hedge_enabled"],
+        hedge_percentile=config["hedge_percentile"],
+        hedge_default_delay=config["hedge_default_delay"],
+        hedge_min_delay=config["hedge_min_delay"],
+        hedge_max_ratio=config["hedge_max_ratio"],
+        latency_window=config["latency_window"],
+        min_samples=config["min_samples"]
+    )
\ No newline at end of file
@@ -0,0 +1,256 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+import httpx
+
+from ..api.circuit_breaker import get_breaker_registry, is_failure_status
+from ..api.retry import RetryPolicy
+from ..config import BASE_CONFIG, LLM_CONFIG, RETRY_CONFIG
+from ..utils.logger import setup_logger
+
+
+class _ConnectionTrace:
+    """通过httpx的trace扩展记录单个请求是否新建了连接及握手耗时"""
+
+    def __init__(self):
+        self.connect_started: Optional[float] = None
+        self.handshake_finished: Optional[float] = None
+
+    def __call__(self, name: str, info: Dict[str, Any]):
+        if name == "connection.connect_tcp.started":
+            self.connect_started = time.perf_counter()
+        elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            # HTTPS连接以TLS握手完成为准，HTTP连接以TCP连接完成为准
+            self.handshake_finished = time.perf_counter()
+
+    async def async_call(self, name: str, info: Dict[str, Any]):
+        self(name, info)
+
+
+class LLMTransport:
+    """
+    LLM提供商的共享HTTP传输层
+
+    同步和异步客户端各自维护连接池，复用keep-alive连接，避免每次调用重新进行TCP+TLS握手
+    """
+
+    def __init__(self, provider: str, api_base: str, config: Dict[str, Any] = None):
+        config = config or LLM_CONFIG
+        self.provider = provider
+        self.api_base = api_base
+        self.logger = setup_logger("llm_transport", log_level=BASE_CONFIG["log_level"])
+
+        self.pool_size = config.get("pool_size", 10)
+        self.limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=config.get("keepalive_expiry", 60.0)
+        )
+        # 流式响应的读超时作用于相邻两段数据之间
+        self.timeout = httpx.Timeout(config.get("read_timeout", 60.0), connect=config.get("connect_timeout", 5.0))
+        self.http2 = config.get("http2", False) and self._http2_available()
+
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+        # LLM调用没有副作用，POST请求也按幂等处理
+        self.retry_policy = RetryPolicy(
+            f"llm_{provider}",
+            max_attempts=config.get("retry_attempts", 2),
+            base_delay=config.get("retry_delay", 0.5),
+            max_delay=RETRY_CONFIG["max_delay"]
+        )
+
+        # 提供商故障时快速失败，避免请求堆积等待超时
+        self.breaker = get_breaker_registry().get(f"llm:{provider}")
+
+        self.requests = 0
+        self.new_connections = 0
+        self.handshake_seconds = 0.0
+
+    def _http2_available(self) -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            self.logger.warning("未安装h2，LLM连接回退到HTTP/1.1 (pip install httpx[http2])")
+            return False
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """延迟创建异步客户端，保证其绑定到实际使用它的事件循环"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        return self._async_client
+
+    def _record(self, trace: _ConnectionTrace):
+        with self._lock:
+            self.requests += 1
+            if trace.connect_started is not None:
+                self.new_connections += 1
+                if trace.handshake_finished is not None:
+                    self.handshake_seconds += trace.handshake_finished - trace.connect_started
+
+    @contextmanager
+    def _circuit(self):
+        """
+        熔断检查与结果记录，熔断打开时抛出CircuitOpenError
+
+        调用方需将最终响应的状态码写入outcome["status_code"]
+        """
+        outcome: Dict[str, Any] = {}
+        if self.breaker is None:
+            yield outcome
+            return
+
+        self.breaker.check()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except httpx.HTTPError:
+            self.breaker.record_result(False, time.perf_counter() - started)
+            raise
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+        self.breaker.record_result(not is_failure_status(outcome.get("status_code")),
+                                   time.perf_counter() - started)
+
+    def post(self, url: str, headers: Dict[str, str], json: Dict[str, Any]) -> httpx.Response:
+        """同步发送POST请求，瞬时故障按重试策略重试"""
+
+        def send():
+            trace = _ConnectionTrace()
+            try:
+                return self._get_client().post(url, headers=headers, json=json, extensions={"trace": trace})
+            finally:
+                self._record(trace)
+
+        with self._circuit() as outcome:
+            response = self.retry_policy.call(send, "POST", idempotent=True)
+            outcome["status_code"] = response.status_code
+        return response
+
+    async def post_async(self, url: str, headers: Dict[str, str], json: Dict[str, Any]) -> httpx.Response:
+        """异步发送POST请求，瞬时故障按重试策略重试"""
+
+        async def send():
+            trace = _ConnectionTrace()
+            try:
+                return await self._get_async_client().post(url, headers=headers, json=json,
+                                                           extensions={"trace": trace.async_call})
+            finally:
+                self._record(trace)
+
+        with self._circuit() as outcome:
+            response = await self.retry_policy.call_async(send, "POST", idempotent=True)
+            outcome["status_code"] = response.status_code
+        return response
+
+    @asynccontextmanager
+    async def stream_async(
+            self,
+            url: str,
+            headers: Dict[str, str],
+            json: Dict[str, Any]
+    ) -> AsyncIterator[httpx.Response]:
+        """以流式方式发送POST请求，仅在收到响应头之前重试"""
+
+        async def send():
+            client = self._get_async_client()
+            trace = _ConnectionTrace()
+            request = client.build_request("POST", url, headers=headers, json=json,
+                                           extensions={"trace": trace.async_call})
+            try:
+                return await client.send(request, stream=True)
+            finally:
+                self._record(trace)
+
+        with self._circuit() as outcome:
+            response = await self.retry_policy.call_async(send, "POST", idempotent=True)
+            outcome["status_code"] = response.status_code
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def warmup(self):
+        """预先建立同步连接，失败不影响启动"""
+        trace = _ConnectionTrace()
+        try:
+            self._get_client().head(self.api_base, extensions={"trace": trace})
+        except httpx.HTTPError as e:
+            self.logger.warning(f"LLM连接预热失败: {str(e)}")
+        finally:
+            self._record(trace)
+
+    async def warmup_async(self, connections: int = 2):
+        """并发发送HEAD请求，预先建立多个异步连接(完成TCP和TLS握手)"""
+
+        async def open_connection():
+            trace = _ConnectionTrace()
+            try:
+                await self._get_async_client().head(self.api_base, extensions={"trace": trace.async_call})
+            except httpx.HTTPError as e:
+                self.logger.warning(f"LLM连接预热失败: {str(e)}")
+            finally:
+                self._record(trace)
+
+        await asyncio.gather(*(open_connection() for _ in range(min(connections, self.pool_size))))
+        self.logger.info(f"已预热{self.provider}连接: {self.api_base}")
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def close_async(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = self.requests - self.new_connections
+            return {
+                "provider": self.provider,
+                "http2": self.http2,
+                "pool_size": self.pool_size,
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reuse_ratio": reused / self.requests if self.requests else 0.0,
+                "avg_handshake_ms": (self.handshake_seconds / self.new_connections * 1000
+                                     if self.new_connections else 0.0),
+                "retry": self.retry_policy.stats(),
+                "breaker": self.breaker.stats() if self.breaker is not None else None,
+            }
+
+
+_transports: Dict[tuple, LLMTransport] = {}
+_transports_lock = threading.Lock()
+
+# 决定连接池、超时和重试行为的配置项，取值不同的调用方不共用传输层
+TRANSPORT_CONFIG_KEYS = ("pool_size", "keepalive_expiry", "read_timeout", "connect_timeout", "http2",
+                         "retry_attempts", "retry_delay")
+
+
+def get_llm_transport(provider: str, api_base: str, config: Dict[str, Any] = None) -> LLMTransport:
+    """获取(提供商, API地址, 传输配置)对应的共享传输层，同一进程内配置相同的LLMProcessor共用连接池"""
+    config = config or LLM_CONFIG
+    key = (provider, api_base) + tuple(config.get(name) for name in TRANSPORT_CONFIG_KEYS)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = LLMTransport(provider, api_base, config)
+        return transport
\ No newline at end of file
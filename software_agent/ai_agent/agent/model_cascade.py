@@ -0,0 +1,88 @@
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional
+
+from ..config import LLM_CONFIG, CASCADE_CONFIG
+from .llm_processor import LLMProcessor
+from .tool_retriever import ToolRetriever
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+
+class TierStats:
+    """单个模型层级的调用次数、采用次数、耗时和未采用原因(快速层级即升级原因)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.accepted = 0
+        self.total_seconds = 0.0
+        self.misses: Counter = Counter()
+
+    def record(self, elapsed: float, miss_reason: Optional[str] = None):
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += elapsed
+            if miss_reason is None:
+                self.accepted += 1
+            else:
+                self.misses[miss_reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "accepted": self.accepted,
+                "hit_rate": self.accepted / self.calls if self.calls else 0.0,
+                "avg_latency_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+                "misses": dict(self.misses),
+            }
+
+
+def escalation_reason(result: Dict[str, Any]) -> Optional[str]:
+    """
+    判断快速模型的解析结果是否需要升级到主模型
+
+    Args:
+        result: IntentParser校验后的解析结果
+
+    Returns:
+        升级原因(low_confidence/invalid_json/unmapped_action/request_error)，可直接采用时返回None
+    """
+    if result.get("success"):
+        return None
+    if result.get("clarification_needed"):
+        return "low_confidence"
+
+    raw = result.get("raw_response") or {}
+    if "error" in raw:
+        # 响应无法解析时带有原始文本，请求失败时没有
+        return "invalid_json" if "raw_response" in raw else "request_error"
+    if "action" in raw and "parameters" in raw:
+        return "unmapped_action"
+    return "invalid_json"
+
+
+def create_fast_processor(
+        tools: Optional[Dict[str, Any]] = None,
+        config: Dict[str, Any] = None,
+        tool_retriever: Optional[ToolRetriever] = None
+) -> Optional[LLMProcessor]:
+    """根据配置创建快速层级的LLMProcessor，未配置快速模型时返回None"""
+    config = config or CASCADE_CONFIG
+    if not config.get("fast_model"):
+        return None
+
+    # 与主模型同一提供商时沿用其凭据和API地址(共用连接池)
+    provider = config.get("fast_provider") or LLM_CONFIG["provider"]
+    same_provider = provider == LLM_CONFIG["provider"]
+    fast_config = dict(
+        LLM_CONFIG,
+        provider=provider,
+        model=config["fast_model"],
+        api_key=config.get("fast_api_key") or (LLM_CONFIG["api_key"] if same_provider else ""),
+        api_base=config.get("fast_api_base") or (LLM_CONFIG["api_base"] if same_provider else ""),
+        max_tokens=config.get("fast_max_tokens") or LLM_CONFIG["max_tokens"]
+    )
+    return LLMProcessor(fast_config, tools=tools, tool_retriever=tool_retriever)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import json
+import threading
+from typing import Dict, Any, Optional
+
+from ..utils.tokens import count_tokens
+
+# 提供商表示输出因达到max_tokens而被截断的结束原因(OpenAI: length，Anthropic: max_tokens)
+TRUNCATION_REASONS = {"length", "max_tokens"}
+
+# 澄清问题等自由文本的预留token数
+CLARIFICATION_TOKENS = 64
+
+# 参数值的占位长度，用于估算输出规模
+PLACEHOLDER_VALUE = "x" * 16
+
+
+def estimate_intent_tokens(tools: Dict[str, Any], plan_steps: int = 1) -> int:
+    """按工具参数表估算单次意图输出(JSON或工具调用)的最大token数，plan_steps>1时按最大工具重复的多步骤计划估算"""
+    largest = 0
+    largest_step = {}
+    for tool in tools.values():
+        params = {param: PLACEHOLDER_VALUE for param in tool.required_params + tool.optional_params}
+        sample = json.dumps({
+            "action": tool.name,
+            "parameters": params,
+            "confidence": 0.95,
+            "clarification_questions": []
+        }, ensure_ascii=False)
+        tokens = count_tokens(sample)
+        if tokens > largest:
+            largest = tokens
+            largest_step = {"id": "s1", "action": tool.name, "parameters": params, "depends_on": ["s0"]}
+
+    if plan_steps > 1 and largest_step:
+        sample = json.dumps({
+            "steps": [largest_step] * plan_steps,
+            "confidence": 0.95,
+            "clarification_questions": []
+        }, ensure_ascii=False)
+        largest = max(largest, count_tokens(sample))
+    return largest
+
+
+class OutputBudget:
+    """
+    意图提取调用的输出token预算
+
+    默认上限按工具参数表规模推导，远小于LLM_MAX_TOKENS；输出被截断时以较大上限重新请求一次
+    """
+
+    def __init__(
+            self,
+            tools: Optional[Dict[str, Any]] = None,
+            max_tokens: int = 4096,
+            intent_max_tokens: int = 0,
+            min_tokens: int = 128,
+            headroom: float = 1.5,
+            retry_multiplier: int = 4,
+            plan_steps: int = 1
+    ):
+        if intent_max_tokens:
+            cap = intent_max_tokens
+        elif tools:
+            cap = int(estimate_intent_tokens(tools, plan_steps) * headroom) + CLARIFICATION_TOKENS
+        else:
+            cap = 256
+        self.intent_cap = min(max(cap, min_tokens), max_tokens)
+        self.retry_cap = min(self.intent_cap * retry_multiplier, max_tokens)
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.truncated = 0
+        self.reasks = 0
+        self.reask_truncated = 0
+
+    @staticmethod
+    def is_truncated(stop_reason: Optional[str]) -> bool:
+        return stop_reason in TRUNCATION_REASONS
+
+    def should_reask(self, max_tokens: int) -> bool:
+        """截断时是否还能以更大的上限重新请求"""
+        return max_tokens < self.retry_cap
+
+    def record(self, truncated: bool):
+        with self._lock:
+            self.calls += 1
+            self.truncated += truncated
+
+    def record_reask(self, truncated: bool):
+        with self._lock:
+            self.reasks += 1
+            self.reask_truncated += truncated
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "intent_cap": self.intent_cap,
+                "retry_cap": self.retry_cap,
+                "calls": self.calls,
+                "truncated": self.truncated,
+                "truncation_rate": self.truncated / self.calls if self.calls else 0.0,
+                "reasks": self.reasks,
+                "reask_truncated": self.reask_truncated,
+            }
\ No newline at end of file
@@ -0,0 +1,102 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+from .tool_schema import registry_hash
+
+# Anthropic提示缓存断点，标记之前的内容(工具定义+系统提示)作为缓存前缀
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def render_tool_catalog(tools: Dict[str, Any]) -> str:
+    """将工具注册表渲染为文本目录(按名称排序，注册表不变时输出逐字节一致)"""
+    lines = ["可用操作(action取值为以下操作名之一):"]
+    for tool in sorted(tools.values(), key=lambda t: t.name):
+        params = [f"{param}(必填)" for param in tool.required_params] + list(tool.optional_params)
+        line = f"- {tool.name}: {tool.description}"
+        if params:
+            line += f"，参数: {', '.join(params)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class PromptCacheStats:
+    """根据提供商返回的usage统计命中提示缓存的输入token"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+
+    def record(self, provider: str, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+
+        if provider == "anthropic":
+            # input_tokens仅包含缓存断点之后的部分，写入缓存的token单独计数
+            cached = usage.get("cache_read_input_tokens") or 0
+            written = usage.get("cache_creation_input_tokens") or 0
+            total = (usage.get("input_tokens") or 0) + cached + written
+        else:
+            cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            written = 0
+            total = usage.get("prompt_tokens") or 0
+
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += total
+            self.cached_tokens += cached
+            self.cache_write_tokens += written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "uncached_tokens": self.input_tokens - self.cached_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "cached_ratio": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+            }
+
+
+class PromptBuilder:
+    """
+    组装意图提取提示
+
+    静态部分(系统指令和工具目录)放在最前并保持逐字节稳定，作为提供商的缓存前缀；
+    对话摘要、历史和当前输入等动态部分放在其后
+    - OpenAI: 自动缓存相同的消息前缀，静态系统消息固定为第一条
+    - Anthropic: 静态系统提示单独成块并标记cache_control，摘要作为后续的系统块
+    """
+
+    def __init__(self, instructions: str, tools: Optional[Dict[str, Any]] = None, include_catalog: bool = True):
+        self.tools_version = registry_hash(tools) if tools else ""
+        parts = [instructions.strip()]
+        # 原生工具调用模式下工具定义随请求的tools字段发送，不重复写入系统提示
+        if tools and include_catalog:
+            parts.append(render_tool_catalog(tools))
+        self.static_prompt = "\n\n".join(parts)
+        self.cache_stats = PromptCacheStats()
+
+    def openai_messages(
+            self,
+            history: List[Dict[str, str]],
+            user_input: str,
+            catalog: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """静态系统消息 + 历史(以摘要开头) + 按消息检索的工具目录 + 当前输入"""
+        messages = [{"role": "system", "content": self.static_prompt}] + history
+        if catalog:
+            messages.append({"role": "system", "content": catalog})
+        messages.append({"role": "user", "content": user_input})
+        return messages
+
+    def anthropic_system(self, pinned: List[Dict[str, Any]], catalog: Optional[str] = None) -> List[Dict[str, Any]]:
+        """带缓存断点的静态系统块 + 固定消息(对话摘要)块 + 按消息检索的工具目录块"""
+        blocks = [{"type": "text", "text": self.static_prompt, "cache_control": CACHE_CONTROL}]
+        blocks.extend({"type": "text", "text": msg["content"]} for msg in pinned)
+        if catalog:
+            blocks.append({"type": "text", "text": catalog})
+        return blocks
\ No newline at end of file
@@ -0,0 +1,231 @@
+import json
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Any, List, Optional
+
+from ..config import BASE_CONFIG, INTENT_RULES_CONFIG
+from ..utils.logger import setup_logger
+from .slot_extractors import extract_slot
+
+# 内置规则，仅覆盖无副作用或含义明确的模板化指令
+# 字段: name, action, patterns(正则，命名分组即参数), keywords(全部出现才匹配),
+#       slots(必需参数), optional_slots(可选参数)
+DEFAULT_RULES = [
+    {
+        "name": "system_status",
+        "action": "get_system_status",
+        "patterns": [r"^(?:请)?(?:查看|查询|获取|检查)(?:一下)?系统(?:的)?状态$"],
+    },
+    {
+        "name": "list_projects",
+        "action": "list_projects",
+        "patterns": [r"^(?:请)?(?:查看|列出|显示|获取)(?:一下)?(?:所有|全部)?(?:的)?项目(?:列表)?$"],
+    },
+    {
+        "name": "get_project",
+        "action": "get_project",
+        "patterns": [r"^(?:请)?(?:获取|查看|查询|显示)项目\s*(?:id|编号)?\s*(?:为|是)?\s*#?(?P<project_id>\d+)"
+                     r"\s*(?:的)?(?:详细信息|详情|信息)?$"],
+        "slots": ["project_id"],
+    },
+    {
+        "name": "list_files",
+        "action": "list_files",
+        "patterns": [r"^(?:请)?(?:查看|列出|显示|获取)项目\s*(?:id|编号)?\s*(?:为|是)?\s*#?(?P<project_id>\d+)"
+                     r"\s*(?:的|中的|里的)?(?:所有)?文件(?:列表)?$"],
+        "slots": ["project_id"],
+    },
+    {
+        "name": "get_analysis_result",
+        "action": "get_analysis_result",
+        "patterns": [r"^(?:请)?(?:获取|查看|查询)分析\s*(?:id|编号)?\s*(?:为|是)?\s*#?(?P<analysis_id>\d+)"
+                     r"\s*(?:的)?结果$"],
+        "slots": ["analysis_id"],
+    },
+    {
+        "name": "get_user",
+        "action": "get_user",
+        "patterns": [r"^(?:请)?(?:获取|查看|查询)用户\s*(?:id|编号)?\s*(?:为|是)?\s*#?(?P<user_id>\d+)"
+                     r"\s*(?:的)?(?:信息|详情)?$"],
+        "slots": ["user_id"],
+    },
+    {
+        "name": "export_report",
+        "action": "export_report",
+        "patterns": [r"^(?:请)?导出报告\s*(?:id|编号)?\s*(?:为|是)?\s*#?(?P<report_id>\d+)$"],
+        "slots": ["report_id"],
+    },
+    {
+        "name": "usage_statistics",
+        "action": "get_usage_statistics",
+        # 需以查询类动词开头、以"使用统计"结尾，避免"如何关闭使用统计"之类的问句命中
+        "patterns": [r"^(?:请)?(?:帮我)?(?:查看|查询|获取|统计|显示|导出)(?:一下)?[^?？]{0,40}?"
+                     r"使用统计(?:数据|信息|情况|报表)?$"],
+        "optional_slots": ["start_date", "end_date", "project_id", "user_id"],
+    },
+]
+
+
+def normalize_command(text: str) -> str:
+    """规范化指令: 全半角统一、小写、去除首尾空白和结尾标点"""
+    text = unicodedata.normalize("NFKC", text or "").strip().lower()
+    return re.sub(r"[。.!！?？~～]+$", "", text).strip()
+
+
+class IntentRule:
+    """单条意图规则"""
+
+    def __init__(
+            self,
+            name: str,
+            action: str,
+            patterns: List[str] = None,
+            keywords: List[str] = None,
+            slots: List[str] = None,
+            optional_slots: List[str] = None
+    ):
+        if not patterns and not keywords:
+            raise ValueError(f"规则{name}必须至少包含patterns或keywords之一")
+
+        self.name = name
+        self.action = action
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in (patterns or [])]
+        self.keywords = [keyword.lower() for keyword in (keywords or [])]
+        self.slots = slots or []
+        self.optional_slots = optional_slots or []
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        匹配规范化后的指令
+
+        Returns:
+            匹配且必需参数齐全时返回参数字典，否则返回None
+        """
+        if self.keywords and not all(keyword in text for keyword in self.keywords):
+            return None
+
+        params = {}
+        if self.patterns:
+            for pattern in self.patterns:
+                match = pattern.search(text)
+                if match:
+                    params = {key: value for key, value in match.groupdict().items() if value is not None}
+                    break
+            else:
+                return None
+
+        # 正则未捕获的参数使用类型化提取器补全
+        for slot in self.slots + self.optional_slots:
+            if slot not in params:
+                value = extract_slot(slot, text)
+                if value is not None:
+                    params[slot] = value
+
+        if any(slot not in params for slot in self.slots):
+            return None
+        return params
+
+
+class RuleEngine:
+    """基于预编译规则的意图匹配引擎，命中时可跳过LLM调用"""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, rules_path: Optional[str] = None):
+        self.logger = setup_logger("rule_engine", log_level=BASE_CONFIG["log_level"])
+
+        definitions = list(DEFAULT_RULES if rules is None else rules)
+        if rules_path:
+            definitions = self._merge(definitions, self.load_rules(rules_path))
+
+        self.rules = [IntentRule(**definition) for definition in definitions]
+
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.ambiguous = 0
+        self._rule_stats = {rule.name: {"hits": 0, "match_seconds": 0.0, "latency_saved_seconds": 0.0}
+                            for rule in self.rules}
+
+    @staticmethod
+    def load_rules(path: str) -> List[Dict[str, Any]]:
+        """从JSON文件加载规则列表"""
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _merge(base: List[Dict[str, Any]], extra: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """合并规则，同名规则以后者为准"""
+        merged = {rule["name"]: rule for rule in base}
+        for rule in extra:
+            merged[rule["name"]] = rule
+        return list(merged.values())
+
+    def match(self, user_input: str, llm_latency: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        尝试用规则匹配用户输入
+
+        Args:
+            user_input: 用户输入
+            llm_latency: 当前LLM调用的平均耗时(秒)，用于统计节省的延迟
+
+        Returns:
+            唯一命中时返回 {"rule", "action", "parameters"}，未命中或多条规则指向不同操作时返回None
+        """
+        start = time.perf_counter()
+        text = normalize_command(user_input)
+
+        matches = []
+        for rule in self.rules:
+            params = rule.match(text)
+            if params is not None:
+                matches.append((rule, params))
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.lookups += 1
+            if not matches:
+                return None
+
+            # 多条规则指向不同操作时视为有歧义，交给LLM处理
+            if len({rule.action for rule, _ in matches}) > 1:
+                self.ambiguous += 1
+                self.logger.debug(f"规则匹配存在歧义: {[rule.name for rule, _ in matches]}")
+                return None
+
+            rule, params = matches[0]
+            self.hits += 1
+            stats = self._rule_stats[rule.name]
+            stats["hits"] += 1
+            stats["match_seconds"] += elapsed
+            stats["latency_saved_seconds"] += max(llm_latency - elapsed, 0.0)
+
+        self.logger.debug(f"规则 {rule.name} 命中: {rule.action} {params}")
+        return {"rule": rule.name, "action": rule.action, "parameters": params}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rules = {}
+            for name, stats in self._rule_stats.items():
+                hits = stats["hits"]
+                rules[name] = {
+                    "hits": hits,
+                    "hit_rate": hits / self.lookups if self.lookups else 0.0,
+                    "avg_match_ms": stats["match_seconds"] / hits * 1000 if hits else 0.0,
+                    "latency_saved_ms": stats["latency_saved_seconds"] * 1000,
+                }
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "ambiguous": self.ambiguous,
+                "rules": rules,
+            }
+
+
+def create_rule_engine(config: Dict[str, Any] = None) -> Optional[RuleEngine]:
+    """根据配置创建规则引擎，未启用时返回None"""
+    config = config or INTENT_RULES_CONFIG
+    if not config.get("enabled", False):
+        return None
+    return RuleEngine(rules_path=config.get("path") or None)
\ No newline at end of file
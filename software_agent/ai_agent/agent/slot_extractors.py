@@ -0,0 +1,207 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from ..utils.validators import ANALYSIS_TYPES
+
+# 实体名称(中英文)到ID参数的映射
+ENTITY_ALIASES = {
+    "project_id": ["项目", "project"],
+    "file_id": ["文件", "file"],
+    "analysis_id": ["分析", "analysis"],
+    "report_id": ["报告", "report"],
+    "user_id": ["用户", "user"],
+}
+
+# 实体名与数字ID之间允许出现的连接词，如"项目ID为123"、"project #123"
+_ID_CONNECTOR = r"\s*(?:id|编号|号)?\s*(?:为|是|=|:|：)?\s*#?\s*"
+
+_ID_PATTERNS = {
+    slot: re.compile(
+        r"(?:" + "|".join(re.escape(alias) for alias in aliases) + r")" + _ID_CONNECTOR + r"(\d+)",
+        re.IGNORECASE
+    )
+    for slot, aliases in ENTITY_ALIASES.items()
+}
+
+_DATE_PATTERN = re.compile(r"(?<!\d)(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})日?(?!\d)")
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.\w+")
+
+# 相对日期: 单日、自然周期、最近N天/周/月、N天前
+_RELATIVE_DAYS = {"前天": -2, "昨天": -1, "昨日": -1, "今天": 0, "今日": 0, "明天": 1}
+_RELATIVE_DAY_PATTERN = re.compile("|".join(_RELATIVE_DAYS))
+_PERIOD_PATTERN = re.compile(r"(本|这|上)(?:个)?(周|星期|月)|(今|去)年")
+_CN_NUMBER = "零一二两三四五六七八九十"
+_RECENT_PATTERN = re.compile(r"(?:最近|过去|近)\s*(\d+|[" + _CN_NUMBER + r"]+)\s*(?:个)?(天|日|周|星期|月)")
+_DAYS_AGO_PATTERN = re.compile(r"(\d+|[" + _CN_NUMBER + r"]+)\s*天前")
+
+# 文件名: 引号内的任意名称，或由ASCII字符组成的带扩展名的名称(避免把前面的中文动词吞进文件名)
+_FILE_EXTENSIONS = r"(?:csv|tsv|xlsx|xls|json|txt|pdf|docx|doc|pptx|ppt|png|jpe?g|zip|parquet)"
+_QUOTED_FILE_PATTERN = re.compile(r"[\"'“‘「《]([^\"'”’」》]+\." + _FILE_EXTENSIONS + r")[\"'”’」》]",
+                                  re.IGNORECASE)
+_FILE_PATTERN = re.compile(r"(?<![A-Za-z0-9_.-])([A-Za-z0-9_][A-Za-z0-9_.-]*\." + _FILE_EXTENSIONS
+                           + r")(?![A-Za-z0-9_])", re.IGNORECASE)
+
+# 分析类型的其他说法，取值与validate_analysis_params一致(类型名本身也可直接匹配)
+ANALYSIS_TYPE_ALIASES = {
+    "statistical": ["统计", "statistics"],
+    "predictive": ["预测", "forecast"],
+    "descriptive": ["描述"],
+    "diagnostic": ["诊断"],
+    "prescriptive": ["规范", "处方", "指导"],
+}
+_ANALYSIS_ALIAS_TO_TYPE = {analysis_type: analysis_type for analysis_type in ANALYSIS_TYPES}
+_ANALYSIS_ALIAS_TO_TYPE.update({alias: analysis_type
+                                for analysis_type, aliases in ANALYSIS_TYPE_ALIASES.items() for alias in aliases})
+_ANALYSIS_TYPE_PATTERN = re.compile("|".join(re.escape(alias) for alias in _ANALYSIS_ALIAS_TO_TYPE), re.IGNORECASE)
+
+
+def extract_entity_id(slot: str, text: str) -> Optional[str]:
+    """提取指定实体的ID，如从"获取项目ID为123的详情"中提取project_id=123"""
+    pattern = _ID_PATTERNS.get(slot)
+    if pattern is None:
+        return None
+    match = pattern.search(text)
+    return match.group(1) if match else None
+
+
+def extract_dates(text: str) -> list:
+    """按出现顺序提取所有日期，统一为YYYY-MM-DD格式"""
+    dates = []
+    for year, month, day in _DATE_PATTERN.findall(text):
+        dates.append(f"{int(year):04d}-{int(month):02d}-{int(day):02d}")
+    return dates
+
+
+def parse_cn_number(text: str) -> int:
+    """解析阿拉伯数字或一百以内的中文数字，如"3"、"七"、"十五"、"二十" """
+    if text.isdigit():
+        return int(text)
+    digits = {char: index for index, char in enumerate("零一二三四五六七八九")}
+    digits["两"] = 2
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        return (digits.get(tens, 1) if tens else 1) * 10 + (digits.get(ones, 0) if ones else 0)
+    return digits.get(text, 0)
+
+
+def _month_start(day: date, months_back: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def extract_relative_range(text: str, today: Optional[date] = None) -> Optional[Tuple[str, str]]:
+    """
+    提取相对日期表达的日期范围(YYYY-MM-DD)
+
+    如"昨天" -> (昨天, 昨天)，"上个月" -> (上月1日, 上月末)，"最近7天" -> (7天前, 今天)，"3天前" -> (3天前, 3天前)
+    """
+    today = today or date.today()
+
+    match = _RECENT_PATTERN.search(text)
+    if match:
+        count = parse_cn_number(match.group(1))
+        unit = match.group(2)
+        if unit in ("周", "星期"):
+            start = today - timedelta(weeks=count)
+        elif unit == "月":
+            # 目标月份没有当天日期(如3月31日往前一个月)时取该月最后一天
+            first = _month_start(today, count)
+            start = min(first + timedelta(days=today.day - 1), _month_start(first, -1) - timedelta(days=1))
+        else:
+            start = today - timedelta(days=count)
+        return start.isoformat(), today.isoformat()
+
+    match = _DAYS_AGO_PATTERN.search(text)
+    if match:
+        day = today - timedelta(days=parse_cn_number(match.group(1)))
+        return day.isoformat(), day.isoformat()
+
+    match = _PERIOD_PATTERN.search(text)
+    if match:
+        which, unit, year = match.groups()
+        if year:
+            first = date(today.year - (year == "去"), 1, 1)
+            last = date(first.year, 12, 31)
+        elif unit == "月":
+            first = _month_start(today, 1 if which == "上" else 0)
+            last = _month_start(first, -1) - timedelta(days=1)
+        else:
+            first = today - timedelta(days=today.weekday() + (7 if which == "上" else 0))
+            last = first + timedelta(days=6)
+        return first.isoformat(), last.isoformat()
+
+    match = _RELATIVE_DAY_PATTERN.search(text)
+    if match:
+        day = today + timedelta(days=_RELATIVE_DAYS[match.group(0)])
+        return day.isoformat(), day.isoformat()
+
+    return None
+
+
+def extract_start_date(text: str) -> Optional[str]:
+    """开始日期: 优先使用第一个绝对日期，其次使用相对日期范围的起点"""
+    dates = extract_dates(text)
+    if dates:
+        return dates[0]
+    relative = extract_relative_range(text)
+    return relative[0] if relative else None
+
+
+def extract_end_date(text: str) -> Optional[str]:
+    """结束日期: 优先使用第二个绝对日期，无绝对日期时使用相对日期范围的终点"""
+    dates = extract_dates(text)
+    if dates:
+        return dates[1] if len(dates) > 1 else None
+    relative = extract_relative_range(text)
+    return relative[1] if relative else None
+
+
+def extract_email(text: str) -> Optional[str]:
+    match = _EMAIL_PATTERN.search(text)
+    return match.group(0) if match else None
+
+
+def extract_file_name(text: str) -> Optional[str]:
+    """提取带扩展名的文件名，如"上传文件data.csv"中的data.csv、"上传《销售数据.xlsx》"中的销售数据.xlsx"""
+    match = _QUOTED_FILE_PATTERN.search(text) or _FILE_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def extract_file_type(text: str) -> Optional[str]:
+    """文件类型取文件名的扩展名(小写)"""
+    file_name = extract_file_name(text)
+    return file_name.rsplit(".", 1)[1].lower() if file_name else None
+
+
+def extract_analysis_type(text: str) -> Optional[str]:
+    """提取分析类型，如"预测分析" -> predictive，返回值满足validate_analysis_params"""
+    match = _ANALYSIS_TYPE_PATTERN.search(text)
+    return _ANALYSIS_ALIAS_TO_TYPE[match.group(0).lower()] if match else None
+
+
+# 参数名到提取函数的映射
+SLOT_EXTRACTORS: Dict[str, Callable[[str], Optional[Any]]] = {
+    **{slot: (lambda text, _slot=slot: extract_entity_id(_slot, text)) for slot in ENTITY_ALIASES},
+    "email": extract_email,
+    "start_date": extract_start_date,
+    "end_date": extract_end_date,
+    "file_name": extract_file_name,
+    "file_type": extract_file_type,
+    "analysis_type": extract_analysis_type,
+}
+
+
+def extract_slot(slot: str, text: str) -> Optional[Any]:
+    """
+    从文本中提取指定参数
+
+    Args:
+        slot: 参数名
+        text: 用户输入
+
+    Returns:
+        参数值，无法提取时返回None
+    """
+    extractor = SLOT_EXTRACTORS.get(slot)
+    return extractor(text) if extractor else None
\ No newline at end of file
@@ -0,0 +1,117 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from ..config import BASE_CONFIG, SLOT_FILLING_CONFIG
+from ..utils.logger import setup_logger
+from .slot_extractors import SLOT_EXTRACTORS, extract_slot
+
+# 参与补全的历史消息角色(助手回复中常含新建对象的ID)
+CONTEXT_ROLES = ("user", "assistant")
+
+
+class SlotFiller:
+    """
+    在执行工具前补全缺少的必需参数
+
+    依次从当前消息(ID或按名称解析)、对话的实体记忆、最近几轮对话(从新到旧)中提取，避免因缺少参数被拒绝或多一轮澄清；
+    有副作用的工具(删除、更新等)只从当前消息中补全，避免"删除项目"误删之前对话中提到的对象
+    """
+
+    def __init__(self, context_turns: int = 4):
+        self.context_turns = context_turns
+        self.logger = setup_logger("slot_filler", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.completed = 0
+        self._slot_stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"missing": 0, "message": 0, "entity": 0, "memory": 0, "context": 0})
+
+    def fill(
+            self,
+            tool: Any,
+            params: Dict[str, Any],
+            message: Optional[str],
+            context: Optional[List[Dict[str, str]]] = None,
+            memory: Optional[Dict[str, str]] = None,
+            resolve: Optional[Callable[[str, str, Dict[str, Any]], Optional[str]]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        补全工具缺少的必需参数
+
+        Args:
+            tool: 工具定义
+            params: LLM给出的参数(不会被修改)
+            message: 用户当前消息，为None时只从实体记忆和对话历史中补全
+            context: 对话历史
+            memory: 对话的实体记忆 {参数名: 最近使用的ID}
+            resolve: 按名称解析ID的函数 (参数名, 消息, 已知参数) -> ID，如EntityIndex.resolve_slot
+
+        Returns:
+            (补全后的参数, {参数名: 来源})，来源为message、entity、memory或context
+        """
+        missing = [slot for slot in tool.required_params if slot not in params]
+        if not missing:
+            return params, {}
+
+        if not tool.read_only:
+            memory = None
+            context = None
+        recent = [msg["content"] for msg in reversed(context or [])
+                  if msg.get("role") in CONTEXT_ROLES and msg.get("content")][:self.context_turns]
+
+        filled_params = dict(params)
+        sources = {}
+        for slot in missing:
+            if slot not in SLOT_EXTRACTORS:
+                continue
+            value = extract_slot(slot, message) if message else None
+            source = "message"
+            if value is None and resolve is not None and message:
+                value = resolve(slot, message, filled_params)
+                source = "entity"
+            if value is None and memory:
+                value = memory.get(slot)
+                source = "memory"
+            if value is None:
+                source = "context"
+                value = next((found for found in (extract_slot(slot, text) for text in recent) if found is not None),
+                             None)
+            if value is not None:
+                filled_params[slot] = value
+                sources[slot] = source
+
+        with self._lock:
+            self.calls += 1
+            self.completed += len(sources) == len(missing)
+            for slot in missing:
+                stats = self._slot_stats[slot]
+                stats["missing"] += 1
+                if slot in sources:
+                    stats[sources[slot]] += 1
+
+        if sources:
+            self.logger.info(f"补全工具 {tool.name} 的参数: {sources}")
+        return filled_params, sources
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            slots = {}
+            for slot, stats in self._slot_stats.items():
+                hits = stats["message"] + stats["entity"] + stats["memory"] + stats["context"]
+                slots[slot] = dict(stats, hit_rate=hits / stats["missing"] if stats["missing"] else 0.0)
+            return {
+                "calls": self.calls,
+                "completed": self.completed,
+                "completion_rate": self.completed / self.calls if self.calls else 0.0,
+                "slots": slots,
+            }
+
+
+def create_slot_filler(config: Dict[str, Any] = None) -> Optional[SlotFiller]:
+    """根据配置创建参数补全器，未启用时返回None"""
+    config = config or SLOT_FILLING_CONFIG
+    if not config.get("enabled", False):
+        return None
+    return SlotFiller(context_turns=config["context_turns"])
\ No newline at end of file
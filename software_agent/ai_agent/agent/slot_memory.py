@@ -0,0 +1,142 @@
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import BASE_CONFIG, SLOT_MEMORY_CONFIG
+from ..storage.conversation_store import ConversationStore
+from ..utils.logger import setup_logger
+from .slot_extractors import ENTITY_ALIASES
+
+# 记忆的实体参数
+MEMORY_SLOTS = tuple(ENTITY_ALIASES)
+
+# 创建类操作返回的新对象ID对应的参数
+CREATED_SLOTS = {
+    "create_user": "user_id",
+    "create_project": "project_id",
+    "upload_file": "file_id",
+    "run_analysis": "analysis_id",
+    "export_report": "report_id",
+}
+
+# 删除类操作成功后，被删除的对象不再作为指代目标
+DELETED_SLOTS = {
+    "delete_user": "user_id",
+    "delete_project": "project_id",
+    "delete_file": "file_id",
+}
+
+
+def _result_id(result: Any, slot: str) -> Optional[str]:
+    """从API响应中读取新对象的ID(顶层或data字段中的id/参数名)"""
+    for container in (result, result.get("data") if isinstance(result, dict) else None):
+        if isinstance(container, dict):
+            value = container.get(slot, container.get("id"))
+            if value is not None and not isinstance(value, (dict, list)):
+                return str(value)
+    return None
+
+
+class SlotMemory:
+    """
+    跨轮次的实体记忆
+
+    记录每个对话最近一次成功操作涉及的project_id、file_id等，
+    以简短的结构化提示代替长历史发送给LLM，并用于补全缺少的必需参数
+    """
+
+    def __init__(self, store: ConversationStore, history_limit: int = 0):
+        self.store = store
+        self.history_limit = history_limit
+        self.logger = setup_logger("slot_memory", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.hints = 0
+
+    def get(self, conversation_id: str) -> Dict[str, str]:
+        return self.store.get_slots(conversation_id) or {}
+
+    def update(self, conversation_id: str, action: str, params: Dict[str, Any], result: Any = None) -> Dict[str, str]:
+        """
+        根据一次成功的工具调用更新记忆
+
+        Args:
+            conversation_id: 对话ID
+            action: 工具名
+            params: 实际使用的参数
+            result: API响应数据
+
+        Returns:
+            更新后的记忆
+        """
+        slots = self.get(conversation_id)
+        updated = dict(slots)
+        for slot in MEMORY_SLOTS:
+            if params.get(slot) is not None:
+                updated[slot] = str(params[slot])
+
+        created_slot = CREATED_SLOTS.get(action)
+        if created_slot:
+            created_id = _result_id(result, created_slot)
+            if created_id is not None:
+                updated[created_slot] = created_id
+
+        deleted_slot = DELETED_SLOTS.get(action)
+        if deleted_slot and updated.get(deleted_slot) == str(params.get(deleted_slot)):
+            del updated[deleted_slot]
+
+        if updated != slots:
+            self.store.set_slots(conversation_id, updated)
+            with self._lock:
+                self.updates += 1
+            self.logger.debug(f"对话 {conversation_id} 实体记忆: {updated}")
+        return updated
+
+    @staticmethod
+    def hint_message(slots: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """将记忆转换为固定消息，没有记忆时返回None"""
+        if not slots:
+            return None
+        entities = ", ".join(f"{slot}={slots[slot]}" for slot in MEMORY_SLOTS if slot in slots)
+        return {
+            "role": "system",
+            "content": f"最近操作的对象(用户用\"它\"、\"这个\"等指代时使用): {entities}",
+            "pinned": True
+        }
+
+    def with_hint(self, conversation_id: str,
+                  context: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        在上下文末尾附加记忆提示(固定消息由ContextBuilder移到开头；放在末尾使意图缓存键随记忆变化)
+
+        Returns:
+            (附加提示后的上下文, 记忆)
+        """
+        slots = self.get(conversation_id)
+        hint = self.hint_message(slots)
+        if hint is None:
+            return context, slots
+
+        with self._lock:
+            self.hints += 1
+        return context + [hint], slots
+
+    def context_limit(self, default: int) -> int:
+        """启用记忆后读取的历史消息数，未配置时不变"""
+        return min(self.history_limit, default) if self.history_limit else default
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "updates": self.updates,
+                "hints": self.hints,
+                "history_limit": self.history_limit,
+            }
+
+
+def create_slot_memory(store: ConversationStore, config: Dict[str, Any] = None) -> Optional[SlotMemory]:
+    """根据配置创建实体记忆，未启用时返回None"""
+    config = config or SLOT_MEMORY_CONFIG
+    if not config.get("enabled", False):
+        return None
+    return SlotMemory(store, history_limit=config["history_limit"])
\ No newline at end of file
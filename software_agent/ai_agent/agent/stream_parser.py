@@ -0,0 +1,125 @@
+import json
+from typing import Dict, Any, Optional
+
+
+class IncrementalJSONParser:
+    """
+    增量解析流式输出中的顶层JSON对象
+
+    每次feed一段文本，返回本次新完成的顶层字段。字段值在其结束字符到达时
+    立即可用，不必等待整个对象(以及之后的文本)生成完毕。
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.completed = False
+
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expecting = "key"  # key / colon / value / comma
+        self._key: Optional[str] = None
+        self._token_start = -1  # 当前顶层键或值的起始位置
+        self._value_kind: Optional[str] = None  # string / container / primitive
+
+    def feed(self, text: str) -> Dict[str, Any]:
+        """
+        追加一段文本
+
+        Args:
+            text: 模型新输出的文本
+
+        Returns:
+            本次新完成的顶层字段
+        """
+        self.buffer += text
+        new_fields = {}
+
+        while self._pos < len(self.buffer) and not self.completed:
+            i = self._pos
+            char = self.buffer[i]
+            self._pos += 1
+
+            # 跳过对象之前的文本(如说明文字或代码块标记)
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._finish_string(i, new_fields)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expecting in ("key", "value"):
+                    self._token_start = i
+                    if self._expecting == "value":
+                        self._value_kind = "string"
+            elif char in "{[":
+                if self._depth == 1 and self._expecting == "value":
+                    self._token_start = i
+                    self._value_kind = "container"
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_kind == "container":
+                    self._finish_value(i + 1, new_fields)
+                elif self._depth == 0:
+                    if self._value_kind == "primitive":
+                        self._finish_value(i, new_fields)
+                    self.completed = True
+            elif self._depth == 1:
+                if char == ":" and self._expecting == "colon":
+                    self._expecting = "value"
+                elif char == ",":
+                    if self._value_kind == "primitive":
+                        self._finish_value(i, new_fields)
+                    self._expecting = "key"
+                elif not char.isspace() and self._expecting == "value" and self._value_kind is None:
+                    self._token_start = i
+                    self._value_kind = "primitive"
+
+        return new_fields
+
+    def _finish_string(self, end: int, new_fields: Dict[str, Any]):
+        """顶层字符串结束: 可能是键，也可能是值"""
+        if self._expecting == "key":
+            self._key = self._loads(self.buffer[self._token_start:end + 1])
+            self._expecting = "colon"
+        elif self._value_kind == "string":
+            self._finish_value(end + 1, new_fields)
+
+    def _finish_value(self, end: int, new_fields: Dict[str, Any]):
+        """顶层值结束，解析并记录字段"""
+        raw = self.buffer[self._token_start:end].strip()
+        value = self._loads(raw)
+        if self._key is not None and value is not _INVALID:
+            self.fields[self._key] = value
+            new_fields[self._key] = value
+
+        self._key = None
+        self._value_kind = None
+        self._token_start = -1
+        self._expecting = "comma"
+
+    @staticmethod
+    def _loads(raw: str):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return _INVALID
+
+
+_INVALID = object()
@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from ..config import BASE_CONFIG, SUMMARY_CONFIG
+from ..storage.conversation_store import ConversationStore
+from ..utils.logger import setup_logger
+from .llm_processor import LLMProcessor
+
+SUMMARY_SYSTEM_PROMPT = """你负责压缩AI助手与用户的对话记录。
+请输出一段简洁的中文摘要，必须保留对话中出现的所有项目、文件、分析、报告、用户的ID和名称，
+以及用户已确认的操作和尚未完成的请求。不要编造信息，不要输出与摘要无关的内容。"""
+
+
+class ConversationSummarizer:
+    """
+    滚动压缩对话: 将较早的消息合并为一条固定在上下文开头的摘要
+
+    在响应发送后于后台执行，不占用请求路径
+    """
+
+    def __init__(
+            self,
+            llm_processor: LLMProcessor,
+            conversation_store: ConversationStore,
+            trigger_turns: int = 20,
+            keep_turns: int = 6,
+            max_tokens: int = 300,
+            max_page_turns: int = 0
+    ):
+        self.llm_processor = llm_processor
+        self.conversation_store = conversation_store
+        self.trigger_turns = trigger_turns
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        # 每次最多读取的未压缩消息数，积压更多时分多次压缩(从最早的消息开始)
+        self.max_page_turns = max_page_turns or 2 * trigger_turns + keep_turns
+        self.logger = setup_logger("summarizer", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self._running = set()  # 正在压缩的对话ID
+        self.runs = 0
+        self.failures = 0
+        self.compacted_turns = 0
+        self.total_seconds = 0.0
+
+    def _build_prompt(self, previous: Optional[Dict[str, Any]], turns: List[Dict[str, Any]]) -> str:
+        lines = []
+        if previous:
+            lines.append(f"已有摘要:\n{previous['content']}\n")
+        lines.append("新增对话:")
+        for turn in turns:
+            speaker = "用户" if turn["role"] == "user" else "助手"
+            lines.append(f"{speaker}: {turn['content']}")
+        lines.append("\n请输出合并后的摘要。")
+        return "\n".join(lines)
+
+    def maybe_summarize(self, conversation_id: str) -> bool:
+        """
+        未压缩的消息超过trigger_turns时，将除最近keep_turns条以外的消息并入摘要
+
+        Returns:
+            是否生成了新摘要
+        """
+        with self._lock:
+            if conversation_id in self._running:
+                return False
+            self._running.add(conversation_id)
+
+        try:
+            previous = self.conversation_store.get_summary(conversation_id)
+            through_seq = previous["through_seq"] if previous else 0
+            # 只读取摘要之后的一段消息，不加载整个历史
+            turns = self.conversation_store.get_range(conversation_id, after_seq=through_seq,
+                                                      limit=self.max_page_turns)
+            if not turns or len(turns) <= self.trigger_turns:
+                return False
+
+            to_compact = turns[:-self.keep_turns] if self.keep_turns else turns
+            start = time.perf_counter()
+            result = self.llm_processor.complete_text(SUMMARY_SYSTEM_PROMPT,
+                                                      self._build_prompt(previous, to_compact),
+                                                      self.max_tokens)
+            elapsed = time.perf_counter() - start
+
+            if "error" in result or not result["text"]:
+                with self._lock:
+                    self.failures += 1
+                self.logger.warning(f"对话 {conversation_id} 压缩失败: {result.get('error', '摘要为空')}")
+                return False
+
+            self.conversation_store.set_summary(conversation_id, result["text"], to_compact[-1]["seq"])
+            with self._lock:
+                self.runs += 1
+                self.compacted_turns += len(to_compact)
+                self.total_seconds += elapsed
+            self.logger.debug(f"对话 {conversation_id} 已压缩{len(to_compact)}条消息")
+            return True
+
+        except Exception as e:
+            # 后台任务中的异常不影响已发送的响应
+            with self._lock:
+                self.failures += 1
+            self.logger.error(f"对话 {conversation_id} 压缩异常: {str(e)}")
+            return False
+
+        finally:
+            with self._lock:
+                self._running.discard(conversation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "failures": self.failures,
+                "compacted_turns": self.compacted_turns,
+                "avg_summary_ms": self.total_seconds / self.runs * 1000 if self.runs else 0.0,
+            }
+
+
+def create_summarizer(
+        llm_processor: LLMProcessor,
+        conversation_store: ConversationStore,
+        config: Dict[str, Any] = None
+) -> Optional[ConversationSummarizer]:
+    """根据配置创建对话压缩器，未启用时返回None"""
+    config = config or SUMMARY_CONFIG
+    if not config.get("enabled", False):
+        return None
+
+    return ConversationSummarizer(
+        llm_processor,
+        conversation_store,
+        trigger_turns=config["trigger_turns"],
+        keep_turns=config["keep_turns"],
+        max_tokens=config["max_tokens"]
+    )
\ No newline at end of file
@@ -0,0 +1,174 @@
+import re
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# 引用前面步骤结果的参数值，如"$s1.id"、"$s2.data.file_id"
+REFERENCE_PATTERN = re.compile(r"^\$(?P<step>[A-Za-z_]\w*)\.(?P<path>\w+(?:\.\w+)*)$")
+
+# 连接多个操作的词语，命中时消息可能包含多个意图，不走只能给出单个操作的本地快速路径；
+# 单字的"并"、"再"常出现在合并、并发、再次等普通词语中，只有后面紧跟操作动词时才视为连接词
+_ACTION_VERBS = r"(?:查看|查询|获取|列出|显示|创建|新建|上传|下载|删除|更新|修改|运行|导出)"
+COMPOUND_PATTERN = re.compile(r"并且|然后|接着|随后|之后|同时|以及|顺便|;|；"
+                              rf"|[并再](?:把|帮我|给我)?{_ACTION_VERBS}")
+
+
+def looks_compound(text: str) -> bool:
+    """消息是否可能包含多个操作"""
+    return bool(COMPOUND_PATTERN.search(text or ""))
+
+
+def _references(value: Any) -> Set[str]:
+    """参数值(含嵌套列表和字典)中引用的步骤编号"""
+    if isinstance(value, str):
+        match = REFERENCE_PATTERN.match(value)
+        return {match.group("step")} if match else set()
+    if isinstance(value, list):
+        return set().union(*(_references(item) for item in value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*(_references(item) for item in value.values())) if value else set()
+    return set()
+
+
+def build_plan(steps: List[Dict[str, Any]], max_steps: int) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """
+    规范化并校验多步骤计划
+
+    依赖由depends_on和参数中的引用共同确定；检查步骤编号唯一、依赖存在且无循环
+
+    Args:
+        steps: 已映射到API操作的步骤列表 [{"id", "action", "parameters", "depends_on"}]
+        max_steps: 最大步骤数
+
+    Returns:
+        (计划, None)或(None, 错误信息)
+    """
+    if not steps:
+        return None, "计划不包含任何步骤"
+    if len(steps) > max_steps:
+        return None, f"计划步骤过多: {len(steps)} > {max_steps}"
+
+    plan = []
+    for index, step in enumerate(steps, 1):
+        parameters = step.get("parameters") if isinstance(step.get("parameters"), dict) else {}
+        depends_on = step.get("depends_on") or []
+        if not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        plan.append({
+            "id": str(step.get("id") or f"s{index}"),
+            "action": step["action"],
+            "parameters": parameters,
+            "depends_on": {str(dep) for dep in depends_on} | _references(parameters),
+        })
+
+    ids = [step["id"] for step in plan]
+    if len(set(ids)) != len(ids):
+        return None, "计划中存在重复的步骤编号"
+    for step in plan:
+        unknown = step["depends_on"] - set(ids)
+        if unknown:
+            return None, f"步骤{step['id']}依赖未知步骤: {', '.join(sorted(unknown))}"
+
+    # 拓扑排序检查循环依赖
+    remaining = {step["id"]: set(step["depends_on"]) for step in plan}
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            return None, "计划存在循环依赖"
+        for step_id in ready:
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    for step in plan:
+        step["depends_on"] = sorted(step["depends_on"])
+    return plan, None
+
+
+def _lookup(data: Any, path: List[str]) -> Any:
+    """按字段路径读取结果中的值，顶层没有时再查找data字段；id缺失时使用唯一的*_id字段"""
+    for container in (data, data.get("data") if isinstance(data, dict) else None):
+        value = container
+        for key in path:
+            if not isinstance(value, dict):
+                value = None
+                break
+            if key not in value and key == "id":
+                id_keys = [name for name in value if name.endswith("_id")]
+                key = id_keys[0] if len(id_keys) == 1 else key
+            value = value.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def resolve_references(value: Any, results: Dict[str, Dict[str, Any]]) -> Tuple[Any, Optional[str]]:
+    """
+    将参数中的步骤引用替换为对应步骤的结果值
+
+    Args:
+        value: 参数(可嵌套)
+        results: 已完成步骤的工具执行结果 {步骤编号: 结果}
+
+    Returns:
+        (替换后的参数, None)或(None, 错误信息)
+    """
+    if isinstance(value, str):
+        match = REFERENCE_PATTERN.match(value)
+        if not match:
+            return value, None
+        result = results.get(match.group("step")) or {}
+        resolved = _lookup(result.get("result"), match.group("path").split("."))
+        if resolved is None:
+            return None, f"无法解析引用: {value}"
+        return resolved, None
+    if isinstance(value, list):
+        items = []
+        for item in value:
+            item, error = resolve_references(item, results)
+            if error:
+                return None, error
+            items.append(item)
+        return items, None
+    if isinstance(value, dict):
+        resolved_dict = {}
+        for key, item in value.items():
+            item, error = resolve_references(item, results)
+            if error:
+                return None, error
+            resolved_dict[key] = item
+        return resolved_dict, None
+    return value, None
+
+
+class PlanStats:
+    """多步骤计划的执行统计，串行耗时与实际耗时之比即并行带来的加速"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.steps = 0
+        self.failed_steps = 0
+        self.skipped_steps = 0
+        self.elapsed_seconds = 0.0
+        self.serial_seconds = 0.0
+
+    def record(self, steps: int, failed: int, skipped: int, elapsed: float, serial: float):
+        with self._lock:
+            self.plans += 1
+            self.steps += steps
+            self.failed_steps += failed
+            self.skipped_steps += skipped
+            self.elapsed_seconds += elapsed
+            self.serial_seconds += serial
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "plans": self.plans,
+                "steps": self.steps,
+                "avg_steps": self.steps / self.plans if self.plans else 0.0,
+                "failed_steps": self.failed_steps,
+                "skipped_steps": self.skipped_steps,
+                "avg_elapsed_ms": self.elapsed_seconds / self.plans * 1000 if self.plans else 0.0,
+                "speedup": self.serial_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.0,
+            }
\ No newline at end of file
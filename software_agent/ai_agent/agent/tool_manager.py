@@ -1,9 +1,15 @@
-from typing import Dict, Any, List, Optional, Callable, Tuple
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple, AsyncIterator
 
-from ..config import BASE_CONFIG
+from ..config import BASE_CONFIG, PLAN_CONFIG
 from ..utils.logger import setup_logger
 from ..api.api_client import APIClient
+from ..api.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, get_breaker_registry, is_failure_status
 from ..api.endpoints import get_endpoint_url, API_ENDPOINTS
+from .entity_index import EntityIndex, create_entity_index
+from .slot_filler import SlotFiller, create_slot_filler
+from .task_plan import PlanStats, resolve_references
 
 
 class Tool:
@@ -27,6 +33,11 @@ class Tool:
         self.optional_params = optional_params or []
         self.validation_func = validation_func  # 自定义验证函数
 
+    @property
+    def read_only(self) -> bool:
+        """是否为只读工具(无副作用，可提前执行)"""
+        return self.method == "GET"
+
     def validate_params(self, params: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
         """验证参数是否满足工具要求"""
         # 检查必需参数
@@ -46,8 +57,19 @@ class Tool:
 class ToolManager:
     """管理和执行API工具"""
 
-    def __init__(self, api_client: APIClient = None):
+    def __init__(
+            self,
+            api_client: APIClient = None,
+            breakers: Optional[CircuitBreakerRegistry] = None,
+            slot_filler: Optional[SlotFiller] = None,
+            entity_index: Optional[EntityIndex] = None
+    ):
         self.api_client = api_client or APIClient()
+        self.breakers = breakers or get_breaker_registry()
+        self.slot_filler = slot_filler if slot_filler is not None else create_slot_filler()
+        self.entity_index = entity_index if entity_index is not None else create_entity_index()
+        self.plan_concurrency = PLAN_CONFIG["max_concurrency"]
+        self.plan_stats = PlanStats()
         self.logger = setup_logger("tool_manager", log_level=BASE_CONFIG["log_level"])
         self.tools = self._register_tools()
 
@@ -232,82 +254,330 @@ class ToolManager:
         """获取指定名称的工具"""
         return self.tools.get(tool_name)
 
-    def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _fill_params(
+            self,
+            tool_name: str,
+            params: Dict[str, Any],
+            message: Optional[str],
+            context: Optional[List[Dict[str, str]]],
+            memory: Optional[Dict[str, str]] = None,
+            tenant: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """从原始消息、实体名称索引、实体记忆和最近对话中补全缺少的必需参数，返回(参数, {补全的参数名: 来源})"""
+        tool = self.get_tool(tool_name)
+        if self.slot_filler is None or not tool or not (message or memory or context):
+            return params, {}
+        resolve = None
+        if self.entity_index is not None and tenant is not None:
+            resolve = lambda slot, text, known: self.entity_index.resolve_slot(tenant, slot, text, known)
+        return self.slot_filler.fill(tool, params, message, context, memory, resolve)
+
+    def _observe(self, tenant: Optional[str], tool_name: str, params: Dict[str, Any], result: Dict[str, Any]):
+        """用成功的工具结果更新实体名称索引"""
+        if self.entity_index is not None and tenant is not None and result.get("success"):
+            self.entity_index.observe(tenant, tool_name, params, result.get("result"))
+
+    def _prepare_call(self, tool_name: str, params: Dict[str, Any]):
         """
-        执行指定工具
-
-        Args:
-            tool_name: 工具名称
-            params: 工具参数
+        校验工具参数并构建API调用
 
         Returns:
-            工具执行结果
+            (调用信息, 错误结果)二元组，调用信息为(tool, endpoint, api_params, api_data)
         """
         tool = self.get_tool(tool_name)
         if not tool:
             self.logger.error(f"未找到工具: {tool_name}")
-            return {"success": False, "error": f"未找到工具: {tool_name}"}
+            return None, {"success": False, "error": f"未找到工具: {tool_name}"}
 
         # 验证参数
         is_valid, error_msg = tool.validate_params(params)
         if not is_valid:
             self.logger.error(f"工具参数验证失败: {error_msg}")
-            return {"success": False, "error": error_msg}
+            return None, {"success": False, "error": error_msg}
+
+        # 获取API端点
+        endpoint_params = {key: value for key, value in params.items()
+                           if
+                           key in tool.required_params and "{" + key + "}" in API_ENDPOINTS[tool.endpoint_action]}
+
+        endpoint = get_endpoint_url(tool.endpoint_action, **endpoint_params)
+
+        # 准备API参数(排除路径参数)
+        api_params = {}
+        api_data = {}
+
+        # 处理GET、DELETE的查询参数
+        if tool.method in ["GET", "DELETE"]:
+            # 对于GET和DELETE请求，所有参数作为查询参数
+            api_params = {key: value for key, value in params.items()
+                          if key not in endpoint_params}  # 排除已在路径中使用的参数
+        else:
+            # 对于POST、PUT、PATCH请求，参数作为请求体
+            api_data = {key: value for key, value in params.items()
+                        if key not in endpoint_params}  # 排除已在路径中使用的参数
+
+        if tool.method not in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
+            return None, {"success": False, "error": f"不支持的HTTP方法: {tool.method}"}
+
+        return (tool, endpoint, api_params, api_data), None
+
+    def _acquire_breaker(self, tool: Tool) -> Tuple[Optional[CircuitBreaker], Optional[Dict[str, Any]]]:
+        """
+        检查端点熔断器
+
+        Returns:
+            (熔断器, 错误结果)二元组，熔断打开时返回快速失败的错误结果
+        """
+        breaker = self.breakers.get(f"api:{tool.endpoint_action}")
+        if breaker is None or breaker.allow_request():
+            return breaker, None
+
+        retry_after = breaker.retry_after()
+        self.logger.warning(f"端点 {tool.endpoint_action} 已熔断，快速失败")
+        return breaker, {
+            "success": False,
+            "error": f"服务暂时不可用({tool.endpoint_action}已熔断)，约{retry_after:.0f}秒后重试",
+            "circuit_open": True,
+            "retry_after": retry_after
+        }
+
+    @staticmethod
+    def _release_breaker(breaker: Optional[CircuitBreaker], response: Optional[Dict[str, Any]], started: float):
+        """记录调用结果，response为None表示调用未完成(异常或被取消)"""
+        if breaker is None:
+            return
+        if response is None:
+            breaker.record_cancelled()
+            return
+        failed = "error" in response and is_failure_status(response.get("status_code"))
+        breaker.record_result(not failed, time.perf_counter() - started)
+
+    def _build_result(self, tool_name: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """将API响应转换为工具执行结果"""
+        # 检查响应
+        if "error" in response:
+            self.logger.error(f"工具执行失败: {response.get('error')}")
+            return {
+                "success": False,
+                "error": response.get("error"),
+                "details": response.get("details", {})
+            }
+
+        return {
+            "success": True,
+            "tool": tool_name,
+            "result": response
+        }
+
+    def execute_tool(
+            self,
+            tool_name: str,
+            params: Dict[str, Any],
+            message: Optional[str] = None,
+            context: Optional[List[Dict[str, str]]] = None,
+            memory: Optional[Dict[str, str]] = None,
+            tenant: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        执行指定工具
+
+        Args:
+            tool_name: 工具名称
+            params: 工具参数
+            message: 可选的用户原始消息，用于补全缺少的必需参数
+            context: 可选的对话历史，当前消息中没有时从中补全
+            memory: 可选的对话实体记忆，优先于对话历史用于补全
+            tenant: 可选的租户标识，用于按名称解析ID并从结果中学习名称
 
-        # 准备API调用
+        Returns:
+            工具执行结果，补全过参数时包含filled_params(来源)和parameters(实际使用的参数)
+        """
         try:
-            # 获取API端点
-            endpoint_params = {key: value for key, value in params.items()
-                               if
-                               key in tool.required_params and "{" + key + "}" in API_ENDPOINTS[tool.endpoint_action]}
-
-            endpoint = get_endpoint_url(tool.endpoint_action, **endpoint_params)
-
-            # 准备API参数(排除路径参数)
-            api_params = {}
-            api_data = {}
-
-            # 处理GET、DELETE的查询参数
-            if tool.method in ["GET", "DELETE"]:
-                # 对于GET和DELETE请求，所有参数作为查询参数
-                api_params = {key: value for key, value in params.items()
-                              if key not in endpoint_params}  # 排除已在路径中使用的参数
-            else:
-                # 对于POST、PUT、PATCH请求，参数作为请求体
-                api_data = {key: value for key, value in params.items()
-                            if key not in endpoint_params}  # 排除已在路径中使用的参数
+            params, filled = self._fill_params(tool_name, params, message, context, memory, tenant)
+            call, error_result = self._prepare_call(tool_name, params)
+            if error_result:
+                return error_result
+            tool, endpoint, api_params, api_data = call
+
+            breaker, error_result = self._acquire_breaker(tool)
+            if error_result:
+                return error_result
 
             # 执行API调用
             self.logger.info(f"执行工具: {tool_name}, 方法: {tool.method}, 端点: {endpoint}")
 
-            if tool.method == "GET":
-                response = self.api_client.get(endpoint, params=api_params)
-            elif tool.method == "POST":
-                response = self.api_client.post(endpoint, data=api_data, params=api_params)
-            elif tool.method == "PUT":
-                response = self.api_client.put(endpoint, data=api_data, params=api_params)
-            elif tool.method == "DELETE":
-                response = self.api_client.delete(endpoint, params=api_params)
-            elif tool.method == "PATCH":
-                response = self.api_client.patch(endpoint, data=api_data, params=api_params)
-            else:
-                return {"success": False, "error": f"不支持的HTTP方法: {tool.method}"}
-
-            # 检查响应
-            if "error" in response:
-                self.logger.error(f"工具执行失败: {response.get('error')}")
-                return {
-                    "success": False,
-                    "error": response.get("error"),
-                    "details": response.get("details", {})
-                }
+            started = time.perf_counter()
+            response = None
+            try:
+                if tool.method == "GET":
+                    response = self.api_client.get(endpoint, params=api_params)
+                elif tool.method == "POST":
+                    response = self.api_client.post(endpoint, data=api_data, params=api_params)
+                elif tool.method == "PUT":
+                    response = self.api_client.put(endpoint, data=api_data, params=api_params)
+                elif tool.method == "DELETE":
+                    response = self.api_client.delete(endpoint, params=api_params)
+                else:
+                    response = self.api_client.patch(endpoint, data=api_data, params=api_params)
+            finally:
+                self._release_breaker(breaker, response, started)
+
+            result = self._build_result(tool_name, response)
+            self._observe(tenant, tool_name, params, result)
+            if filled:
+                result["filled_params"] = filled
+                result["parameters"] = params
+            return result
 
-            return {
-                "success": True,
-                "tool": tool_name,
-                "result": response
-            }
+        except Exception as e:
+            self.logger.error(f"工具执行异常: {str(e)}")
+            return {"success": False, "error": f"工具执行异常: {str(e)}"}
+
+    async def execute_tool_async(
+            self,
+            tool_name: str,
+            params: Dict[str, Any],
+            message: Optional[str] = None,
+            context: Optional[List[Dict[str, str]]] = None,
+            memory: Optional[Dict[str, str]] = None,
+            tenant: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        异步执行指定工具，等待API响应期间不阻塞事件循环
+
+        Args:
+            tool_name: 工具名称
+            params: 工具参数
+            message: 可选的用户原始消息，用于补全缺少的必需参数
+            context: 可选的对话历史，当前消息中没有时从中补全
+            memory: 可选的对话实体记忆，优先于对话历史用于补全
+            tenant: 可选的租户标识，用于按名称解析ID并从结果中学习名称
+
+        Returns:
+            工具执行结果，补全过参数时包含filled_params(来源)和parameters(实际使用的参数)
+        """
+        try:
+            params, filled = self._fill_params(tool_name, params, message, context, memory, tenant)
+            call, error_result = self._prepare_call(tool_name, params)
+            if error_result:
+                return error_result
+            tool, endpoint, api_params, api_data = call
+
+            breaker, error_result = self._acquire_breaker(tool)
+            if error_result:
+                return error_result
+
+            # 执行API调用
+            self.logger.info(f"异步执行工具: {tool_name}, 方法: {tool.method}, 端点: {endpoint}")
+
+            started = time.perf_counter()
+            response = None
+            try:
+                if tool.method == "GET":
+                    response = await self.api_client.get_async(endpoint, params=api_params)
+                elif tool.method == "POST":
+                    response = await self.api_client.post_async(endpoint, data=api_data, params=api_params)
+                elif tool.method == "PUT":
+                    response = await self.api_client.put_async(endpoint, data=api_data, params=api_params)
+                elif tool.method == "DELETE":
+                    response = await self.api_client.delete_async(endpoint, params=api_params)
+                else:
+                    response = await self.api_client.patch_async(endpoint, data=api_data, params=api_params)
+            finally:
+                # 提前执行的工具被取消时不计入熔断统计
+                self._release_breaker(breaker, response, started)
+
+            result = self._build_result(tool_name, response)
+            self._observe(tenant, tool_name, params, result)
+            if filled:
+                result["filled_params"] = filled
+                result["parameters"] = params
+            return result
 
         except Exception as e:
             self.logger.error(f"工具执行异常: {str(e)}")
-            return {"success": False, "error": f"工具执行异常: {str(e)}"}
\ No newline at end of file
+            return {"success": False, "error": f"工具执行异常: {str(e)}"}
+
+    async def execute_plan_async(
+            self,
+            plan: List[Dict[str, Any]],
+            context: Optional[List[Dict[str, str]]] = None,
+            memory: Optional[Dict[str, str]] = None,
+            tenant: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        执行多步骤计划，依赖满足的步骤立即启动，同时执行的步骤数不超过plan_concurrency
+
+        Args:
+            plan: IntentParser给出的计划 [{"id", "action", "parameters", "depends_on"}]
+            context/memory/tenant: 同execute_tool_async，用于各步骤的参数补全；
+                整条消息中的ID可能属于其他步骤，因此步骤的参数不从用户消息中补全
+
+        Yields:
+            {"type": "step_started", "step", "action", "parameters"}，
+            {"type": "step_finished", "step", "action", "result"}(按完成顺序)，
+            最后产出 {"type": "plan_finished", "results": {步骤编号: 工具执行结果}}
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.plan_concurrency)
+        events: asyncio.Queue = asyncio.Queue()
+        finished = {step["id"]: asyncio.Event() for step in plan}
+        results: Dict[str, Dict[str, Any]] = {}
+        durations: Dict[str, float] = {}
+
+        async def run_step(step: Dict[str, Any]):
+            try:
+                for dep in step["depends_on"]:
+                    await finished[dep].wait()
+
+                failed_deps = [dep for dep in step["depends_on"] if not results[dep]["success"]]
+                if failed_deps:
+                    result = {"success": False, "skipped": True,
+                              "error": f"依赖的步骤未成功执行: {', '.join(failed_deps)}"}
+                else:
+                    # 引用前面步骤结果的参数在依赖完成后替换为实际值
+                    params, error = resolve_references(step["parameters"], results)
+                    if error:
+                        result = {"success": False, "error": error}
+                    else:
+                        async with semaphore:
+                            await events.put({"type": "step_started", "step": step["id"],
+                                              "action": step["action"], "parameters": params})
+                            step_start = time.perf_counter()
+                            result = await self.execute_tool_async(step["action"], params, context=context,
+                                                                   memory=memory, tenant=tenant)
+                            durations[step["id"]] = time.perf_counter() - step_start
+                        result.setdefault("parameters", params)
+                results[step["id"]] = result
+            except Exception as e:
+                self.logger.error(f"计划步骤{step['id']}执行异常: {str(e)}")
+                results[step["id"]] = {"success": False, "error": f"工具执行异常: {str(e)}"}
+            finally:
+                finished[step["id"]].set()
+            await events.put({"type": "step_finished", "step": step["id"], "action": step["action"],
+                              "result": results[step["id"]]})
+
+        tasks = [asyncio.create_task(run_step(step)) for step in plan]
+        try:
+            for _ in plan:
+                # 每个步骤恰好产出一次step_finished，启动事件在其之前
+                while True:
+                    event = await events.get()
+                    yield event
+                    if event["type"] == "step_finished":
+                        break
+        finally:
+            # 调用方提前退出(如客户端断开)时取消未完成的步骤
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        self.plan_stats.record(
+            steps=len(plan),
+            failed=sum(not result["success"] and not result.get("skipped") for result in results.values()),
+            skipped=sum(bool(result.get("skipped")) for result in results.values()),
+            elapsed=time.perf_counter() - started,
+            serial=sum(durations.values())
+        )
+        self.logger.info(f"计划执行完成: {len(plan)}个步骤，耗时{time.perf_counter() - started:.3f}s")
+        yield {"type": "plan_finished", "results": {step["id"]: results[step["id"]] for step in plan}}
\ No newline at end of file
@@ -0,0 +1,167 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from ..config import BASE_CONFIG, TOOL_RETRIEVAL_CONFIG
+from ..utils.logger import setup_logger
+from ..utils.tokens import count_tokens
+from .prompt_builder import render_tool_catalog
+
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    词法切分: 英文/数字按单词(下划线视为分隔符)，中文按相邻二字组
+
+    单个汉字的片段保留为单字，使"删除文件"与"删文件"仍有重叠
+    """
+    text = text.lower()
+    terms = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class ToolRetriever:
+    """
+    基于BM25的工具检索索引
+
+    每个工具的文档由工具名、描述、参数名和意图标签组成，启动时建立一次索引；
+    每条消息只将得分最高的top_k个工具放入提示或工具定义
+    """
+
+    def __init__(
+            self,
+            tools: Dict[str, Any],
+            labels: Optional[Dict[str, str]] = None,
+            top_k: int = 5,
+            k1: float = 1.5,
+            b: float = 0.75
+    ):
+        self.tools = tools
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+        self.logger = setup_logger("tool_retriever", log_level=BASE_CONFIG["log_level"])
+
+        # 意图标签(中文 -> 操作名)按操作名归组
+        tool_labels: Dict[str, List[str]] = defaultdict(list)
+        for label, action in (labels or {}).items():
+            tool_labels[action].append(label)
+
+        # 倒排索引: 词 -> [(工具名, 词频)]
+        self._postings: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        doc_lengths = {}
+        for name, tool in tools.items():
+            document = [name, tool.description, *tool.required_params, *tool.optional_params, *tool_labels[name]]
+            terms = Counter(tokenize(" ".join(document)))
+            doc_lengths[name] = sum(terms.values())
+            for term, tf in terms.items():
+                self._postings[term].append((name, tf))
+
+        # 预先计算IDF和各文档的长度归一化项
+        total = len(tools)
+        avg_length = sum(doc_lengths.values()) / total if total else 0.0
+        self._idf = {term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                     for term, postings in self._postings.items()}
+        self._norms = {name: k1 * (1 - b + b * length / avg_length) for name, length in doc_lengths.items()}
+
+        # 每个工具在目录中占用的token数，用于统计节省量
+        self._tool_tokens = {name: count_tokens(render_tool_catalog({name: tool})) for name, tool in tools.items()}
+        self.catalog_tokens = count_tokens(render_tool_catalog(tools))
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.fallbacks = 0
+        self.tokens_saved = 0
+
+    def score(self, query: str) -> List[Tuple[str, float]]:
+        """返回按得分降序排列的(工具名, 得分)，仅包含得分大于0的工具"""
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for name, tf in self._postings[term]:
+                scores[name] += idf * tf * (self.k1 + 1) / (tf + self._norms[name])
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def retrieve(self, query: str, k: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        检索与消息相关的工具
+
+        Returns:
+            得分最高的k个工具(保持注册表结构)；没有任何词法重叠时返回None，由调用方使用完整工具集
+        """
+        ranked = self.score(query)[:k or self.top_k]
+        with self._lock:
+            self.queries += 1
+            if not ranked:
+                self.fallbacks += 1
+                return None
+            self.tokens_saved += self.catalog_tokens - sum(self._tool_tokens[name] for name, _ in ranked)
+        return {name: self.tools[name] for name, _ in ranked}
+
+    def evaluate(self, labeled: Iterable[Tuple[str, str]], k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        在标注集上评估召回率
+
+        Args:
+            labeled: (用户消息, 正确的操作名) 序列
+
+        Returns:
+            {"samples", "recall", "misses": [未召回的消息], "fallbacks": [回退的消息], "fallback_rate"}；
+            未命中任何工具(回退到完整工具集)的消息单独统计，不计入召回
+        """
+        k = k or self.top_k
+        samples = 0
+        hits = 0
+        misses = []
+        fallbacks = []
+        for query, action in labeled:
+            samples += 1
+            ranked = [name for name, _ in self.score(query)[:k]]
+            if not ranked:
+                fallbacks.append(query)
+            elif action in ranked:
+                hits += 1
+            else:
+                misses.append(query)
+        return {
+            "samples": samples,
+            "recall": hits / samples if samples else 0.0,
+            "misses": misses,
+            "fallbacks": fallbacks,
+            "fallback_rate": len(fallbacks) / samples if samples else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tools": len(self.tools),
+                "top_k": self.top_k,
+                "queries": self.queries,
+                "fallbacks": self.fallbacks,
+                "tokens_saved": self.tokens_saved,
+                "avg_tokens_saved": self.tokens_saved / self.queries if self.queries else 0.0,
+            }
+
+
+def create_tool_retriever(
+        tools: Dict[str, Any],
+        labels: Optional[Dict[str, str]] = None,
+        config: Dict[str, Any] = None
+) -> Optional[ToolRetriever]:
+    """根据配置建立工具检索索引，未启用或工具数不超过top_k时返回None"""
+    config = config or TOOL_RETRIEVAL_CONFIG
+    if not config.get("enabled", False) or len(tools) <= config["top_k"]:
+        return None
+
+    return ToolRetriever(tools, labels, top_k=config["top_k"], k1=config["k1"], b=config["b"])
\ No newline at end of file
@@ -0,0 +1,82 @@
+import hashlib
+import json
+from typing import Dict, Any, List
+
+# 参数名到JSON Schema类型的映射，未列出的参数默认为字符串
+PARAM_SCHEMAS = {
+    "user_id": {"type": ["string", "integer"]},
+    "project_id": {"type": ["string", "integer"]},
+    "file_id": {"type": ["string", "integer"]},
+    "analysis_id": {"type": ["string", "integer"]},
+    "report_id": {"type": ["string", "integer"]},
+    "owner_id": {"type": ["string", "integer"]},
+    "page": {"type": "integer"},
+    "limit": {"type": "integer"},
+    "tags": {"type": "array", "items": {"type": "string"}},
+    "input_file_ids": {"type": "array", "items": {"type": ["string", "integer"]}},
+    "parameters": {"type": "object"},
+    "options": {"type": "object"},
+    "include_charts": {"type": "boolean"},
+    "email": {"type": "string", "format": "email"},
+    "start_date": {"type": "string", "description": "YYYY-MM-DD"},
+    "end_date": {"type": "string", "description": "YYYY-MM-DD"},
+    "analysis_type": {
+        "type": "string",
+        "enum": ["statistical", "predictive", "descriptive", "diagnostic", "prescriptive"]
+    },
+}
+
+def registry_hash(tools: Dict[str, Any]) -> str:
+    """计算工具注册表的哈希，作为编译结果的版本号"""
+    definition = [
+        [tool.name, tool.description, tool.method, tool.required_params, tool.optional_params]
+        for tool in sorted(tools.values(), key=lambda t: t.name)
+    ]
+    payload = json.dumps([definition, PARAM_SCHEMAS], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _param_schema(tool) -> Dict[str, Any]:
+    """生成单个工具的参数JSON Schema"""
+    properties = {}
+    for param in tool.required_params + tool.optional_params:
+        properties[param] = dict(PARAM_SCHEMAS.get(param, {"type": "string"}))
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(tool.required_params),
+    }
+
+
+def compile_tool_schemas(tools: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将工具注册表编译为OpenAI tools和Anthropic tool_use格式
+
+    每次调用都会重新计算哈希和Schema，调用方应在构建时编译一次并保存结果
+
+    Args:
+        tools: ToolManager.tools
+
+    Returns:
+        {"version": 注册表哈希, "openai": [...], "anthropic": [...]}
+    """
+    openai_tools: List[Dict[str, Any]] = []
+    anthropic_tools: List[Dict[str, Any]] = []
+    for tool in sorted(tools.values(), key=lambda t: t.name):
+        schema = _param_schema(tool)
+        openai_tools.append({
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": schema,
+            }
+        })
+        anthropic_tools.append({
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": schema,
+        })
+
+    return {"version": registry_hash(tools), "openai": openai_tools, "anthropic": anthropic_tools}
\ No newline at end of file
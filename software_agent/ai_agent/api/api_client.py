@@ -1,9 +1,11 @@
 import requests
-import time
+from requests.adapters import HTTPAdapter
+import httpx
 import json
 from typing import Dict, Any, Optional, Union
 from ..utils.logger import setup_logger
-from ..config import API_CONFIG, BASE_CONFIG
+from ..config import API_CONFIG, BASE_CONFIG, RETRY_CONFIG
+from .retry import RetryPolicy
 
 
 class APIClient:
@@ -17,14 +19,58 @@ class APIClient:
         self.retry_attempts = self.config["retry_attempts"]
         self.retry_delay = self.config["retry_delay"]
         self.logger = setup_logger("api_client", log_level=BASE_CONFIG["log_level"])
+        self.retry_policy = RetryPolicy(
+            "api_client",
+            max_attempts=self.retry_attempts,
+            base_delay=self.retry_delay,
+            max_delay=RETRY_CONFIG["max_delay"]
+        )
         self.session = requests.Session()
 
+        # 配置连接池，使并发请求可复用长连接
+        pool_size = self.config.get("pool_size", 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
         # 设置默认请求头
         self.session.headers.update({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Accept": "application/json"
         })
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def warmup(self) -> bool:
+        """预先建立到API服务器的连接，避免首个请求承担握手开销"""
+        try:
+            self.session.head(self.base_url, timeout=min(self.timeout, 5))
+            self.logger.info(f"API连接池预热完成: {self.base_url}")
+            return True
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"API连接池预热失败: {str(e)}")
+            return False
+
+    def close(self):
+        """关闭会话并释放连接池"""
+        self.session.close()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取共享的异步HTTP客户端(首次使用时创建)"""
+        if self._async_client is None:
+            pool_size = self.config.get("pool_size", 10)
+            self._async_client = httpx.AsyncClient(
+                headers=dict(self.session.headers),
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
+        return self._async_client
+
+    async def close_async(self):
+        """关闭异步HTTP客户端"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
 
     def _make_url(self, endpoint: str) -> str:
         """构建完整的URL"""
@@ -47,7 +93,7 @@ class APIClient:
             except:
                 error_detail = {"status_code": response.status_code, "text": response.text}
 
-            return {"error": str(e), "details": error_detail}
+            return {"error": str(e), "details": error_detail, "status_code": response.status_code}
         except requests.exceptions.RequestException as e:
             self.logger.error(f"请求错误: {str(e)}")
             return {"error": str(e)}
@@ -55,22 +101,39 @@ class APIClient:
             self.logger.error("JSON解析错误")
             return {"error": "无法解析响应JSON", "text": response.text}
 
+    def _handle_async_response(self, response: httpx.Response) -> Dict[str, Any]:
+        """处理异步API响应，返回格式与_handle_response一致"""
+        if response.is_error:
+            error = f"{response.status_code} Error: {response.reason_phrase} for url: {response.url}"
+            self.logger.error(f"HTTP错误: {error}")
+            try:
+                error_detail = response.json()
+            except ValueError:
+                error_detail = {"status_code": response.status_code, "text": response.text}
+
+            return {"error": error, "details": error_detail, "status_code": response.status_code}
+
+        try:
+            return response.json()
+        except ValueError:
+            self.logger.error("JSON解析错误")
+            return {"error": "无法解析响应JSON", "text": response.text}
+
     def request(
             self,
             method: str,
             endpoint: str,
             params: Optional[Dict[str, Any]] = None,
             data: Optional[Dict[str, Any]] = None,
-            headers: Optional[Dict[str, str]] = None,
-            retry_count: int = 0
+            headers: Optional[Dict[str, str]] = None
     ) -> Dict[str, Any]:
-        """发送API请求并返回结果"""
+        """发送API请求并返回结果，瞬时故障按重试策略重试"""
         url = self._make_url(endpoint)
         request_headers = headers or {}
 
-        try:
+        def send():
             self.logger.debug(f"发送{method}请求到{url}")
-            response = self.session.request(
+            return self.session.request(
                 method=method.upper(),
                 url=url,
                 params=params,
@@ -78,19 +141,49 @@ class APIClient:
                 headers=request_headers,
                 timeout=self.timeout
             )
+
+        try:
+            response = self.retry_policy.call(send, method)
             return self._handle_response(response)
         except requests.exceptions.Timeout:
-            if retry_count < self.retry_attempts:
-                self.logger.warning(f"请求超时，尝试重试({retry_count + 1}/{self.retry_attempts})")
-                time.sleep(self.retry_delay)
-                return self.request(method, endpoint, params, data, headers, retry_count + 1)
-            else:
-                self.logger.error("请求超时，已达到最大重试次数")
-                return {"error": "请求超时"}
+            self.logger.error("请求超时")
+            return {"error": "请求超时"}
         except requests.exceptions.RequestException as e:
             self.logger.error(f"请求异常: {str(e)}")
             return {"error": str(e)}
 
+    async def request_async(
+            self,
+            method: str,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None,
+            data: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """异步发送API请求并返回结果，等待和退避期间不阻塞事件循环"""
+        url = self._make_url(endpoint)
+        request_headers = headers or {}
+
+        async def send():
+            self.logger.debug(f"异步发送{method}请求到{url}")
+            return await self._get_async_client().request(
+                method=method.upper(),
+                url=url,
+                params=params,
+                json=data,
+                headers=request_headers
+            )
+
+        try:
+            response = await self.retry_policy.call_async(send, method)
+            return self._handle_async_response(response)
+        except httpx.TimeoutException:
+            self.logger.error("请求超时")
+            return {"error": "请求超时"}
+        except httpx.HTTPError as e:
+            self.logger.error(f"请求异常: {str(e)}")
+            return {"error": str(e)}
+
     # 便捷方法
     def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> \
     Dict[str, Any]:
@@ -110,4 +203,25 @@ class APIClient:
 
     def patch(self, endpoint: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
-        return self.request("PATCH", endpoint, params=params, data=data, headers=headers)
\ No newline at end of file
+        return self.request("PATCH", endpoint, params=params, data=data, headers=headers)
+
+    # 异步便捷方法
+    async def get_async(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                        headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request_async("GET", endpoint, params=params, headers=headers)
+
+    async def post_async(self, endpoint: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
+                         headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request_async("POST", endpoint, params=params, data=data, headers=headers)
+
+    async def put_async(self, endpoint: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
+                        headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request_async("PUT", endpoint, params=params, data=data, headers=headers)
+
+    async def delete_async(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                           headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request_async("DELETE", endpoint, params=params, headers=headers)
+
+    async def patch_async(self, endpoint: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None,
+                          headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await self.request_async("PATCH", endpoint, params=params, data=data, headers=headers)
\ No newline at end of file
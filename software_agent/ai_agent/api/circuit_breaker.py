@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from ..config import BASE_CONFIG, BREAKER_CONFIG
+from ..utils.logger import setup_logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时拒绝调用"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"服务暂时不可用({name}已熔断)，约{retry_after:.0f}秒后重试")
+
+
+def is_failure_status(status_code: Optional[int]) -> bool:
+    """下游故障(5xx/429或无响应)计入熔断统计，4xx等调用方错误不计入"""
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """
+    基于滚动窗口的熔断器
+
+    closed: 窗口内错误率或慢调用比例超过阈值时打开
+    open: 直接拒绝调用，open_seconds后进入half_open
+    half_open: 仅放行少量探测调用，全部成功则关闭，任一失败则重新打开
+    """
+
+    def __init__(
+            self,
+            name: str,
+            window_seconds: float = 30.0,
+            min_calls: int = 10,
+            error_rate_threshold: float = 0.5,
+            slow_call_seconds: float = 10.0,
+            slow_call_rate_threshold: float = 0.8,
+            open_seconds: float = 30.0,
+            half_open_calls: int = 3
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.logger = setup_logger("circuit_breaker", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._window: "deque[tuple]" = deque()  # (时间, 是否失败, 是否慢调用)
+        self._failures = 0
+        self._slow_calls = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        """移除窗口外的调用记录(需持有锁)"""
+        deadline = now - self.window_seconds
+        while self._window and self._window[0][0] < deadline:
+            _, failed, slow = self._window.popleft()
+            self._failures -= failed
+            self._slow_calls -= slow
+
+    def _transition(self, state: str, now: float):
+        """切换状态(需持有锁)"""
+        self.logger.warning(f"熔断器 {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = now
+            self.times_opened += 1
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        else:
+            self._window.clear()
+            self._failures = 0
+            self._slow_calls = 0
+
+    def retry_after(self) -> float:
+        """距离进入half_open的剩余秒数"""
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def allow_request(self) -> bool:
+        """是否放行本次调用，放行后必须调用record_result或record_cancelled"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, now)
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_calls:
+                self._probes_in_flight += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """放行时返回，否则抛出CircuitOpenError"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_result(self, success: bool, latency: float):
+        """记录调用结果"""
+        now = time.monotonic()
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if not success or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._transition(CLOSED, now)
+                return
+
+            if self.state == OPEN:
+                # 打开前已放行的调用，结果不再计入窗口
+                return
+
+            self._window.append((now, not success, slow))
+            self._failures += not success
+            self._slow_calls += slow
+            self._trim(now)
+
+            calls = len(self._window)
+            if calls >= self.min_calls and (self._failures / calls >= self.error_rate_threshold
+                                            or self._slow_calls / calls >= self.slow_call_rate_threshold):
+                self._transition(OPEN, now)
+
+    def record_cancelled(self):
+        """调用被取消(如提前执行的工具被丢弃)，不计入结果"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._window)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "error_rate": self._failures / calls if calls else 0.0,
+                "slow_call_rate": self._slow_calls / calls if calls else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_after": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            }
+
+
+class CircuitBreakerRegistry:
+    """按名称(后端端点或LLM提供商)管理熔断器"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or BREAKER_CONFIG
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        """获取或创建熔断器，未启用熔断时返回None"""
+        if not self.config.get("enabled", False):
+            return None
+
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(
+                        name,
+                        window_seconds=self.config["window_seconds"],
+                        min_calls=self.config["min_calls"],
+                        error_rate_threshold=self.config["error_rate"],
+                        slow_call_seconds=self.config["slow_call_seconds"],
+                        slow_call_rate_threshold=self.config["slow_call_rate"],
+                        open_seconds=self.config["open_seconds"],
+                        half_open_calls=self.config["half_open_calls"]
+                    )
+        return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
+
+
+_registry = CircuitBreakerRegistry()
+
+
+def get_breaker_registry() -> CircuitBreakerRegistry:
+    """获取进程内共享的熔断器注册表"""
+    return _registry
\ No newline at end of file
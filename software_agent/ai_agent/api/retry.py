@@ -0,0 +1,284 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Callable, Optional, Awaitable
+
+import httpx
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from ..config import BASE_CONFIG, RETRY_CONFIG
+from ..utils.logger import setup_logger
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+# 幂等方法，服务端可能已处理请求时仍可安全重试
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# 请求尚未发出的连接错误，任何方法都可以重试；
+# requests的ConnectionError还包括发送后连接被中断(Connection aborted)，需按其包装的异常区分，见_is_connect_error
+_CONNECT_ERRORS = (requests.exceptions.ConnectTimeout, httpx.ConnectError, httpx.ConnectTimeout)
+
+# 请求可能已到达服务端的瞬时错误(读超时、连接被重置等)，仅重试幂等请求
+_TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    ConnectionResetError,
+)
+
+
+def _is_connect_error(error: BaseException) -> bool:
+    """连接尚未建立、请求未发出的错误"""
+    if isinstance(error, _CONNECT_ERRORS):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # requests将urllib3的异常包装在args[0]中: 建立连接失败时为NewConnectionError或以其为reason的MaxRetryError
+        cause = error.args[0]
+        if isinstance(cause, MaxRetryError):
+            cause = cause.reason
+        return isinstance(cause, NewConnectionError)
+    return False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头(秒数或HTTP日期)，返回需等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """
+    进程级重试预算
+
+    每个请求存入ratio个令牌，每次重试消耗1个令牌，另按min_per_second补充保底令牌；
+    下游故障时重试量被限制在请求量的固定比例内，避免重试放大故障
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """尝试为一次重试消耗令牌"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {"tokens": round(self._tokens, 2), "exhausted": self.exhausted}
+
+
+_default_budget = RetryBudget(
+    ratio=RETRY_CONFIG["budget_ratio"],
+    min_per_second=RETRY_CONFIG["budget_min_per_second"],
+    max_tokens=RETRY_CONFIG["budget_max_tokens"]
+)
+
+
+def get_retry_budget() -> RetryBudget:
+    """获取进程内共享的重试预算"""
+    return _default_budget
+
+
+class RetryPolicy:
+    """
+    非递归的重试策略，同时用于APIClient和LLM调用
+
+    对错误和响应状态分类，仅重试瞬时故障；退避采用decorrelated jitter，并遵循Retry-After
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_attempts: int = 3,
+            base_delay: float = 0.5,
+            max_delay: float = 30.0,
+            budget: Optional[RetryBudget] = None,
+            retry_status_codes=RETRYABLE_STATUS_CODES
+    ):
+        self.name = name
+        self.max_attempts = max_attempts  # 不含首次请求的最大重试次数
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or get_retry_budget()
+        self.retry_status_codes = set(retry_status_codes)
+        self.logger = setup_logger("retry", log_level=BASE_CONFIG["log_level"])
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.gave_up = 0
+
+    def classify_error(self, error: BaseException, idempotent: bool) -> Optional[str]:
+        """返回异常的重试原因，不可重试时返回None"""
+        if _is_connect_error(error):
+            return "connect_error"
+        if idempotent and isinstance(error, _TRANSIENT_ERRORS):
+            if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+                return "timeout"
+            return "transient_error"
+        return None
+
+    def classify_status(self, status_code: int, idempotent: bool) -> Optional[str]:
+        """返回响应状态的重试原因，不可重试时返回None"""
+        if status_code not in self.retry_status_codes:
+            return None
+        # 429表示请求被拒绝而未处理，非幂等请求也可重试
+        if status_code == 429 or idempotent:
+            return f"status_{status_code}"
+        return None
+
+    def next_delay(self, previous: float, retry_after: Optional[float] = None) -> float:
+        """decorrelated jitter: sleep = min(max_delay, random(base, previous * 3))，不短于Retry-After"""
+        delay = min(self.max_delay, random.uniform(self.base_delay, max(previous, self.base_delay) * 3))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _should_retry(self, attempt: int, reason: str, retry_after: Optional[float]) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        if retry_after is not None and retry_after > self.max_delay:
+            self.logger.warning(f"{self.name}: Retry-After({retry_after:.0f}s)超过最大等待时间，不再重试")
+            return False
+        if not self.budget.try_acquire():
+            self.logger.warning(f"{self.name}: 重试预算已耗尽，放弃重试({reason})")
+            return False
+        return True
+
+    def _start_call(self):
+        self.budget.record_request()
+        with self._lock:
+            self.calls += 1
+
+    def _record_retry(self, attempt: int, reason: str, delay: float):
+        with self._lock:
+            self.retries += 1
+        self.logger.warning(f"{self.name}: {reason}，{delay:.2f}秒后重试({attempt + 1}/{self.max_attempts})")
+
+    def _record_give_up(self):
+        with self._lock:
+            self.gave_up += 1
+
+    def call(self, send: Callable[[], Any], method: str = "GET", idempotent: Optional[bool] = None):
+        """
+        同步执行请求并按策略重试
+
+        Args:
+            send: 发送请求的函数，返回带status_code和headers的响应对象
+            method: HTTP方法，用于判断是否幂等
+            idempotent: 显式指定是否幂等(如无副作用的LLM调用)
+
+        Returns:
+            最后一次的响应；重试用尽时抛出最后一次的异常
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        self._start_call()
+        delay = self.base_delay
+
+        for attempt in range(self.max_attempts + 1):
+            try:
+                response = send()
+            except Exception as e:
+                reason = self.classify_error(e, idempotent)
+                if reason is None or not self._should_retry(attempt, reason, None):
+                    if reason is not None:
+                        self._record_give_up()
+                    raise
+                delay = self.next_delay(delay)
+                self._record_retry(attempt, reason, delay)
+                time.sleep(delay)
+                continue
+
+            reason = self.classify_status(response.status_code, idempotent)
+            if reason is None:
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if not self._should_retry(attempt, reason, retry_after):
+                self._record_give_up()
+                return response
+            response.close()
+            delay = self.next_delay(delay, retry_after)
+            self._record_retry(attempt, reason, delay)
+            time.sleep(delay)
+
+    async def call_async(
+            self,
+            send: Callable[[], Awaitable[Any]],
+            method: str = "GET",
+            idempotent: Optional[bool] = None
+    ):
+        """异步执行请求并按策略重试，退避期间不阻塞事件循环"""
+        idempotent = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        self._start_call()
+        delay = self.base_delay
+
+        for attempt in range(self.max_attempts + 1):
+            try:
+                response = await send()
+            except Exception as e:
+                reason = self.classify_error(e, idempotent)
+                if reason is None or not self._should_retry(attempt, reason, None):
+                    if reason is not None:
+                        self._record_give_up()
+                    raise
+                delay = self.next_delay(delay)
+                self._record_retry(attempt, reason, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            reason = self.classify_status(response.status_code, idempotent)
+            if reason is None:
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if not self._should_retry(attempt, reason, retry_after):
+                self._record_give_up()
+                return response
+            await response.aclose()
+            delay = self.next_delay(delay, retry_after)
+            self._record_retry(attempt, reason, delay)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "retry_rate": self.retries / self.calls if self.calls else 0.0,
+                "gave_up": self.gave_up,
+                "budget": self.budget.stats(),
+            }
\ No newline at end of file
@@ -20,7 +20,119 @@ LLM_CONFIG = {
     "api_key": os.getenv("LLM_API_KEY", ""),
     "api_base": os.getenv("LLM_API_BASE", ""),
     "max_tokens": int(os.getenv("LLM_MAX_TOKENS", "4096")),
+    "context_window": int(os.getenv("LLM_CONTEXT_WINDOW", "8192")),  # 模型上下文窗口(tokens)
+    "intent_max_tokens": int(os.getenv("LLM_INTENT_MAX_TOKENS", "0")),  # 意图提取的输出上限，0表示按工具参数表推导
+    "intent_retry_multiplier": int(os.getenv("LLM_INTENT_RETRY_MULTIPLIER", "4")),  # 截断后重试上限的倍数
     "temperature": float(os.getenv("LLM_TEMPERATURE", "0.7")),
+    "tool_mode": os.getenv("LLM_TOOL_MODE", "json"),  # json/native
+    "pool_size": int(os.getenv("LLM_POOL_SIZE", "10")),
+    "keepalive_expiry": float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),  # 空闲连接保留时间(秒)
+    "http2": os.getenv("LLM_HTTP2", "False").lower() == "true",  # 需要安装h2
+    "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+    "read_timeout": float(os.getenv("LLM_READ_TIMEOUT", "60")),
+    "warmup": os.getenv("LLM_WARMUP", "True").lower() == "true",
+    "warmup_connections": int(os.getenv("LLM_WARMUP_CONNECTIONS", "2")),
+    "retry_attempts": int(os.getenv("LLM_RETRY_ATTEMPTS", "2")),
+    "retry_delay": float(os.getenv("LLM_RETRY_DELAY", "0.5")),
+}
+
+# 多提供商路由配置(按顺序故障转移，逗号分隔的列表按位置对应)
+_FALLBACK_PROVIDERS = [p.strip() for p in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",") if p.strip()]
+
+
+def _fallback_values(name: str) -> list:
+    values = [v.strip() for v in os.getenv(name, "").split(",")]
+    return values + [""] * (len(_FALLBACK_PROVIDERS) - len(values))
+
+
+LLM_ROUTER_CONFIG = {
+    "fallbacks": [
+        {"provider": provider, "model": model, "api_key": api_key, "api_base": api_base}
+        for provider, model, api_key, api_base in zip(
+            _FALLBACK_PROVIDERS,
+            _fallback_values("LLM_FALLBACK_MODELS"),
+            _fallback_values("LLM_FALLBACK_API_KEYS"),
+            _fallback_values("LLM_FALLBACK_API_BASES")
+        )
+    ],
+    "hedge_enabled": os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true",
+    "hedge_percentile": float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),  # 首选提供商超过该分位耗时后发出对冲请求
+    "hedge_default_delay": float(os.getenv("LLM_HEDGE_DELAY", "3")),  # 耗时样本不足时的对冲等待时间(秒)
+    "hedge_min_delay": float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2")),
+    "hedge_max_ratio": float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1")),  # 对冲请求占总请求的比例上限
+    "latency_window": int(os.getenv("LLM_HEDGE_LATENCY_WINDOW", "200")),
+    "min_samples": int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+}
+
+# 模型级联配置(设置LLM_FAST_MODEL后启用，快速模型结果不可用时升级到LLM_MODEL)
+CASCADE_CONFIG = {
+    "fast_provider": os.getenv("LLM_FAST_PROVIDER", ""),  # 为空时与LLM_PROVIDER相同
+    "fast_model": os.getenv("LLM_FAST_MODEL", ""),
+    "fast_api_key": os.getenv("LLM_FAST_API_KEY", ""),
+    "fast_api_base": os.getenv("LLM_FAST_API_BASE", ""),
+    "fast_max_tokens": int(os.getenv("LLM_FAST_MAX_TOKENS", "1024")),
+    "confidence_threshold": float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7")),
+}
+
+# 工具检索配置(按消息检索相关工具，只将top-k个工具放入提示或工具定义)
+TOOL_RETRIEVAL_CONFIG = {
+    "enabled": os.getenv("TOOL_RETRIEVAL_ENABLED", "False").lower() == "true",
+    "top_k": int(os.getenv("TOOL_RETRIEVAL_TOP_K", "5")),
+    "k1": float(os.getenv("TOOL_RETRIEVAL_BM25_K1", "1.5")),
+    "b": float(os.getenv("TOOL_RETRIEVAL_BM25_B", "0.75")),
+}
+
+# 意图缓存配置
+INTENT_CACHE_CONFIG = {
+    "enabled": os.getenv("INTENT_CACHE_ENABLED", "True").lower() == "true",
+    "max_entries": int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "1024")),
+    "ttl": int(os.getenv("INTENT_CACHE_TTL", "3600")),
+    "context_turns": int(os.getenv("INTENT_CACHE_CONTEXT_TURNS", "2")),
+    "persist_path": os.getenv("INTENT_CACHE_PATH", ""),
+}
+
+# 规则匹配配置
+INTENT_RULES_CONFIG = {
+    "enabled": os.getenv("INTENT_RULES_ENABLED", "True").lower() == "true",
+    "path": os.getenv("INTENT_RULES_PATH", ""),  # 可选，JSON格式的自定义规则文件
+    "aliases_path": os.getenv("INTENT_ALIASES_PATH", ""),  # 可选，JSON格式的意图别名文件
+}
+
+# 本地意图分类器配置(从LLM决策日志训练，置信度达到阈值时跳过LLM)
+INTENT_CLASSIFIER_CONFIG = {
+    "enabled": os.getenv("INTENT_CLASSIFIER_ENABLED", "False").lower() == "true",
+    "model_dir": os.getenv("INTENT_CLASSIFIER_MODEL_DIR", "models/intent_classifier"),
+    "version": os.getenv("INTENT_CLASSIFIER_VERSION", ""),  # 为空时加载最新版本
+    "cutoff": float(os.getenv("INTENT_CLASSIFIER_CUTOFF", "0")),  # 为0时使用训练时校准的阈值
+    "log_path": os.getenv("INTENT_OUTCOME_LOG_PATH", ""),  # 可选，记录LLM决策作为训练数据
+}
+
+# 参数补全配置(执行工具前从消息和最近对话中提取缺少的必需参数)
+SLOT_FILLING_CONFIG = {
+    "enabled": os.getenv("SLOT_FILLING_ENABLED", "True").lower() == "true",
+    "context_turns": int(os.getenv("SLOT_FILLING_CONTEXT_TURNS", "4")),
+}
+
+# 跨轮次实体记忆配置(记录最近操作的project_id等，以简短提示代替长历史)
+SLOT_MEMORY_CONFIG = {
+    "enabled": os.getenv("SLOT_MEMORY_ENABLED", "True").lower() == "true",
+    "history_limit": int(os.getenv("SLOT_MEMORY_HISTORY_LIMIT", "0")),  # 启用记忆后读取的历史消息数，0表示不变
+}
+
+# 实体名称索引配置(按租户缓存项目/文件名称到ID的映射，按名称本地解析ID)
+ENTITY_INDEX_CONFIG = {
+    "enabled": os.getenv("ENTITY_INDEX_ENABLED", "True").lower() == "true",
+    "ttl": int(os.getenv("ENTITY_INDEX_TTL", "300")),  # 名称条目有效期(秒)
+    "max_tenants": int(os.getenv("ENTITY_INDEX_MAX_TENANTS", "1000")),
+    "max_entities": int(os.getenv("ENTITY_INDEX_MAX_ENTITIES", "5000")),  # 每个租户的实体数上限
+    "min_score": float(os.getenv("ENTITY_INDEX_MIN_SCORE", "0.8")),  # 模糊匹配的最低二字组覆盖率
+}
+
+# 多步骤计划配置(一条消息包含多个操作时解析为带依赖的计划，相互独立的步骤并发执行)
+PLAN_CONFIG = {
+    "enabled": os.getenv("PLAN_ENABLED", "False").lower() == "true",
+    "max_steps": int(os.getenv("PLAN_MAX_STEPS", "5")),
+    "max_concurrency": int(os.getenv("PLAN_MAX_CONCURRENCY", "4")),  # 同时执行的步骤数上限
 }
 
 # API配置
@@ -29,7 +141,50 @@ API_CONFIG = {
     "api_key": os.getenv("API_KEY", ""),
     "timeout": int(os.getenv("API_TIMEOUT", "30")),
     "retry_attempts": int(os.getenv("API_RETRY_ATTEMPTS", "3")),
-    "retry_delay": int(os.getenv("API_RETRY_DELAY", "2")),
+    "retry_delay": float(os.getenv("API_RETRY_DELAY", "2")),  # 退避基础时间(秒)
+    "pool_size": int(os.getenv("API_POOL_SIZE", "20")),
+    "warmup": os.getenv("API_WARMUP", "True").lower() == "true",
+}
+
+# 重试配置(APIClient与LLM调用共用进程级重试预算)
+RETRY_CONFIG = {
+    "max_delay": float(os.getenv("RETRY_MAX_DELAY", "30")),  # 单次退避上限，Retry-After超过该值时不再重试
+    "budget_ratio": float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),  # 每个请求可增加的重试额度
+    "budget_min_per_second": float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1")),
+    "budget_max_tokens": float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "10")),
+}
+
+# 熔断配置(按后端端点和LLM提供商分别统计)
+BREAKER_CONFIG = {
+    "enabled": os.getenv("BREAKER_ENABLED", "True").lower() == "true",
+    "window_seconds": float(os.getenv("BREAKER_WINDOW_SECONDS", "30")),  # 滚动统计窗口
+    "min_calls": int(os.getenv("BREAKER_MIN_CALLS", "10")),  # 窗口内调用数达到该值才判断是否熔断
+    "error_rate": float(os.getenv("BREAKER_ERROR_RATE", "0.5")),
+    "slow_call_seconds": float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "10")),
+    "slow_call_rate": float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8")),
+    "open_seconds": float(os.getenv("BREAKER_OPEN_SECONDS", "30")),  # 熔断后多久进入半开状态
+    "half_open_calls": int(os.getenv("BREAKER_HALF_OPEN_CALLS", "3")),  # 半开状态放行的探测调用数
+}
+
+# 对话存储配置
+CONVERSATION_CONFIG = {
+    "backend": os.getenv("CONVERSATION_STORE", "memory"),  # memory/sqlite
+    "max_conversations": int(os.getenv("CONVERSATION_MAX_COUNT", "1000")),
+    "max_turns": int(os.getenv("CONVERSATION_MAX_TURNS", "100")),
+    "max_bytes": int(os.getenv("CONVERSATION_MAX_BYTES", str(50 * 1024 * 1024))),
+    "idle_ttl": int(os.getenv("CONVERSATION_IDLE_TTL", "86400")),  # 1 day
+    "history_limit": int(os.getenv("CONVERSATION_HISTORY_LIMIT", "100")),  # 每次处理消息时加载的最近消息数
+    "db_path": os.getenv("CONVERSATION_DB_PATH", "data/conversations.db"),
+    "flush_interval": float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "0.05")),
+    "batch_size": int(os.getenv("CONVERSATION_BATCH_SIZE", "100")),
+}
+
+# 对话压缩配置
+SUMMARY_CONFIG = {
+    "enabled": os.getenv("SUMMARY_ENABLED", "False").lower() == "true",
+    "trigger_turns": int(os.getenv("SUMMARY_TRIGGER_TURNS", "20")),  # 未压缩消息超过该数量时触发
+    "keep_turns": int(os.getenv("SUMMARY_KEEP_TURNS", "6")),  # 保留不压缩的最近消息数
+    "max_tokens": int(os.getenv("SUMMARY_MAX_TOKENS", "300")),
 }
 
 # Web服务配置
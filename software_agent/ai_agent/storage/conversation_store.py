@@ -0,0 +1,372 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from ..config import BASE_CONFIG, CONVERSATION_CONFIG
+from ..utils.logger import setup_logger
+from ..utils.tokens import count_tokens
+
+
+def message_size(message: Dict[str, Any]) -> int:
+    """估算单条消息占用的字节数"""
+    return len(message.get("content", "").encode("utf-8")) + len(message.get("role", ""))
+
+
+def summary_message(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """将对话摘要转换为固定在上下文开头的消息"""
+    return {
+        "role": "system",
+        "content": f"此前对话的摘要:\n{summary['content']}",
+        "tokens": summary.get("tokens"),
+        "pinned": True
+    }
+
+
+def public_message(turn: Dict[str, Any]) -> Dict[str, Any]:
+    """去除存储用的内部字段(如seq)，保留消息内容和缓存的token数"""
+    message = {"role": turn["role"], "content": turn["content"]}
+    if turn.get("tokens") is not None:
+        message["tokens"] = turn["tokens"]
+    return message
+
+
+class ConversationStore(ABC):
+    """对话存储接口"""
+
+    @abstractmethod
+    def create(self, conversation_id: str):
+        """创建空对话(已存在时不做处理)"""
+
+    @abstractmethod
+    def exists(self, conversation_id: str) -> bool:
+        """对话是否存在"""
+
+    @abstractmethod
+    def get_history(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            after_seq: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取对话历史
+
+        Args:
+            conversation_id: 对话ID
+            limit: 仅返回最近的limit条消息
+            after_seq: 仅返回序号大于该值的消息
+
+        Returns:
+            按时间顺序排列的消息列表，对话不存在时返回None
+        """
+
+    def get_context(self, conversation_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取发送给LLM的上下文: 已压缩的旧消息以摘要形式固定在开头，随后是摘要之后的消息
+
+        Returns:
+            消息列表，对话不存在时返回None
+        """
+        summary = self.get_summary(conversation_id)
+        history = self.get_history(conversation_id, limit=limit,
+                                   after_seq=summary["through_seq"] if summary else None)
+        if history is None or summary is None:
+            return history
+        return [summary_message(summary)] + history
+
+    @abstractmethod
+    def get_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """获取对话摘要 {"content", "through_seq", "tokens"}，没有摘要时返回None"""
+
+    @abstractmethod
+    def set_summary(self, conversation_id: str, content: str, through_seq: int):
+        """保存对话摘要，覆盖序号不大于through_seq的消息"""
+
+    @abstractmethod
+    def get_slots(self, conversation_id: str) -> Optional[Dict[str, str]]:
+        """获取对话的实体记忆 {参数名: 最近使用的ID}，没有记忆时返回None"""
+
+    @abstractmethod
+    def set_slots(self, conversation_id: str, slots: Dict[str, str]):
+        """保存对话的实体记忆(整体覆盖)"""
+
+    @abstractmethod
+    def get_page(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            before_seq: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        分页获取对话历史(从最新消息向前翻页)
+
+        Args:
+            conversation_id: 对话ID
+            limit: 每页消息数，为None时返回全部
+            before_seq: 仅返回序号小于该值的消息
+
+        Returns:
+            {"history": 带seq的消息列表, "next_before_seq": 下一页游标或None}，对话不存在时返回None
+        """
+
+    @abstractmethod
+    def get_range(self, conversation_id: str, after_seq: int = 0, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """
+        按时间顺序获取序号大于after_seq的最早limit条消息(带seq)，用于后台压缩等只处理一段消息的场景
+
+        Returns:
+            带seq的消息列表，对话不存在时返回None
+        """
+
+    @abstractmethod
+    def append(self, conversation_id: str, message: Dict[str, Any]):
+        """追加一条消息(对话不存在时自动创建)"""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """删除对话，返回对话是否存在"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        """释放存储资源"""
+
+
+class _Conversation:
+    __slots__ = ("turns", "bytes", "last_access", "next_seq", "summary", "slots")
+
+    def __init__(self):
+        self.turns: List[Dict[str, Any]] = []
+        self.bytes = 0
+        self.last_access = time.monotonic()
+        self.next_seq = 1
+        self.summary: Optional[Dict[str, Any]] = None
+        self.slots: Optional[Dict[str, str]] = None
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    有界内存对话存储
+
+    限制对话数、单个对话的消息数、总字节数和空闲时间，超出时按LRU顺序淘汰
+    """
+
+    def __init__(
+            self,
+            max_conversations: int = 1000,
+            max_turns: int = 100,
+            max_bytes: int = 50 * 1024 * 1024,
+            idle_ttl: int = 86400
+    ):
+        self.max_conversations = max_conversations
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.logger = setup_logger("conversation_store", log_level=BASE_CONFIG["log_level"])
+
+        # 按最近访问顺序排列，队首为最久未访问的对话
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.evictions = {"lru": 0, "idle": 0, "bytes": 0}
+        self.trimmed_turns = 0
+
+    def _touch(self, conversation_id: str) -> Optional[_Conversation]:
+        """获取对话并更新访问时间(需持有锁)"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None:
+            conversation.last_access = time.monotonic()
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def _remove(self, conversation_id: str):
+        conversation = self._conversations.pop(conversation_id)
+        self._total_bytes -= conversation.bytes
+
+    def _expire_idle(self):
+        """淘汰空闲超时的对话(需持有锁)；队首最久未访问，遇到未超时的即可停止"""
+        deadline = time.monotonic() - self.idle_ttl
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if conversation.last_access >= deadline:
+                break
+            self._remove(conversation_id)
+            self.evictions["idle"] += 1
+
+    def _enforce_limits(self, current_id: str):
+        """淘汰超出数量或字节上限的对话(需持有锁)，尽量保留当前对话"""
+        while len(self._conversations) > self.max_conversations:
+            self._remove(next(iter(self._conversations)))
+            self.evictions["lru"] += 1
+
+        while self._total_bytes > self.max_bytes and len(self._conversations) > 1:
+            oldest_id = next(iter(self._conversations))
+            if oldest_id == current_id:
+                break
+            self._remove(oldest_id)
+            self.evictions["bytes"] += 1
+
+        # 只剩当前对话仍超限时，丢弃其最早的消息
+        conversation = self._conversations.get(current_id)
+        while conversation and self._total_bytes > self.max_bytes and conversation.turns:
+            self._drop_oldest_turn(conversation)
+
+    def _drop_oldest_turn(self, conversation: _Conversation):
+        size = message_size(conversation.turns.pop(0))
+        conversation.bytes -= size
+        self._total_bytes -= size
+        self.trimmed_turns += 1
+
+    def create(self, conversation_id: str):
+        with self._lock:
+            self._expire_idle()
+            if self._touch(conversation_id) is None:
+                self._conversations[conversation_id] = _Conversation()
+                self._enforce_limits(conversation_id)
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            self._expire_idle()
+            return conversation_id in self._conversations
+
+    def get_history(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            after_seq: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            self._expire_idle()
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                return None
+            turns = conversation.turns
+            if after_seq is not None:
+                turns = [turn for turn in turns if turn["seq"] > after_seq]
+            if limit:
+                turns = turns[-limit:]
+            return [public_message(turn) for turn in turns]
+
+    def get_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or conversation.summary is None:
+                return None
+            return dict(conversation.summary)
+
+    def set_summary(self, conversation_id: str, content: str, through_seq: int):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                conversation.summary = {"content": content, "through_seq": through_seq,
+                                        "tokens": count_tokens(content)}
+
+    def get_slots(self, conversation_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None or conversation.slots is None:
+                return None
+            return dict(conversation.slots)
+
+    def set_slots(self, conversation_id: str, slots: Dict[str, str]):
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None:
+                conversation.slots = dict(slots)
+
+    def get_page(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            before_seq: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire_idle()
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                return None
+
+            turns = conversation.turns
+            if before_seq is not None:
+                turns = [turn for turn in turns if turn["seq"] < before_seq]
+            has_more = bool(limit) and len(turns) > limit
+            if limit:
+                turns = turns[-limit:]
+
+            return {
+                "history": [{"seq": turn["seq"], "role": turn["role"], "content": turn["content"]}
+                        for turn in turns],
+                "next_before_seq": turns[0]["seq"] if has_more else None
+            }
+
+    def get_range(self, conversation_id: str, after_seq: int = 0, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return None
+            turns = [turn for turn in conversation.turns if turn["seq"] > after_seq][:limit]
+            return [{"seq": turn["seq"], "role": turn["role"], "content": turn["content"]} for turn in turns]
+
+    def append(self, conversation_id: str, message: Dict[str, Any]):
+        with self._lock:
+            self._expire_idle()
+            conversation = self._touch(conversation_id)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = _Conversation()
+
+            size = message_size(message)
+            # token数在写入时计算一次，构建上下文时直接复用
+            conversation.turns.append(dict(message, seq=conversation.next_seq,
+                                           tokens=count_tokens(message.get("content", ""))))
+            conversation.next_seq += 1
+            conversation.bytes += size
+            self._total_bytes += size
+
+            while len(conversation.turns) > self.max_turns:
+                self._drop_oldest_turn(conversation)
+
+            self._enforce_limits(conversation_id)
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            if conversation_id not in self._conversations:
+                return False
+            self._remove(conversation_id)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "conversations": len(self._conversations),
+                "turns": sum(len(conversation.turns) for conversation in self._conversations.values()),
+                "bytes": self._total_bytes,
+                "max_conversations": self.max_conversations,
+                "max_turns": self.max_turns,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self.evictions),
+                "trimmed_turns": self.trimmed_turns,
+            }
+
+
+def create_conversation_store(config: Dict[str, Any] = None) -> ConversationStore:
+    """根据配置创建对话存储"""
+    config = config or CONVERSATION_CONFIG
+    if config.get("backend") == "sqlite":
+        from .sqlite_store import SQLiteConversationStore
+        return SQLiteConversationStore(
+            db_path=config["db_path"],
+            history_limit=config["history_limit"],
+            flush_interval=config["flush_interval"],
+            batch_size=config["batch_size"]
+        )
+
+    return InMemoryConversationStore(
+        max_conversations=config["max_conversations"],
+        max_turns=config["max_turns"],
+        max_bytes=config["max_bytes"],
+        idle_ttl=config["idle_ttl"]
+    )
\ No newline at end of file
@@ -0,0 +1,461 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from ..config import BASE_CONFIG
+from ..utils.logger import setup_logger
+from ..utils.tokens import count_tokens
+from .conversation_store import ConversationStore, public_message
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_active REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_turns_conversation_seq ON turns (conversation_id, seq);
+CREATE TABLE IF NOT EXISTS summaries (
+    conversation_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    through_seq INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    conversation_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# 序号在写入事务内计算，多个worker同时写入同一对话时也不会冲突
+_INSERT_TURN = """
+INSERT INTO turns (conversation_id, seq, role, content, tokens, created_at)
+SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ?, ? FROM turns WHERE conversation_id = ?
+"""
+
+_UPSERT_CONVERSATION = """
+INSERT INTO conversations (id, created_at, last_active) VALUES (?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET last_active = excluded.last_active
+"""
+
+
+class _PendingTurn:
+    """待写入的消息；seq在写入事务中确定后、提交前记录，读取方据此判断该消息是否已在其快照中"""
+    __slots__ = ("message", "seq")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.seq: Optional[int] = None
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    基于SQLite(WAL模式)的持久化对话存储
+
+    消息写入只追加，由后台线程批量落盘，请求路径不等待fsync；
+    尚未落盘的消息保存在内存中，读取时与数据库结果合并
+    """
+
+    def __init__(
+            self,
+            db_path: str,
+            history_limit: int = 100,
+            flush_interval: float = 0.05,
+            batch_size: int = 100
+    ):
+        self.db_path = db_path
+        self.history_limit = history_limit
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.logger = setup_logger("sqlite_store", log_level=BASE_CONFIG["log_level"])
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._migrate(conn)
+
+        # 尚未落盘的写入
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[_PendingTurn]] = {}
+        self._pending_created: Dict[str, int] = {}
+        self._pending_slots: Dict[str, Dict[str, str]] = {}
+        self._pending_summaries: Dict[str, Dict[str, Any]] = {}
+
+        self.batches = 0
+        self.rows_written = 0
+        self.write_errors = 0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-store-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """为旧版本数据库补充新增的列"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(turns)")}
+        if "tokens" not in columns:
+            conn.execute("ALTER TABLE turns ADD COLUMN tokens INTEGER")
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # 写入(异步落盘)
+
+    def create(self, conversation_id: str):
+        with self._lock:
+            self._pending_created[conversation_id] = self._pending_created.get(conversation_id, 0) + 1
+            self._queue.put(("create", conversation_id, time.time()))
+
+    def append(self, conversation_id: str, message: Dict[str, Any]):
+        message = public_message(message)
+        message["tokens"] = count_tokens(message["content"])
+        with self._lock:
+            # 在锁内入队，保证落盘顺序与待写入缓冲顺序一致
+            self._pending.setdefault(conversation_id, []).append(_PendingTurn(message))
+            self._queue.put(("append", conversation_id, message, time.time()))
+
+    def delete(self, conversation_id: str) -> bool:
+        if not self.exists(conversation_id):
+            return False
+
+        with self._lock:
+            self._pending.pop(conversation_id, None)
+            self._pending_created.pop(conversation_id, None)
+            self._pending_slots.pop(conversation_id, None)
+            self._pending_summaries.pop(conversation_id, None)
+
+        # 删除操作较少，等待其落盘以保证随后的读取不会再看到该对话
+        done = threading.Event()
+        self._queue.put(("delete", conversation_id, done))
+        done.wait(timeout=5.0)
+        return True
+
+    def flush(self, timeout: float = 5.0):
+        """等待此前的所有写入落盘"""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout=timeout)
+
+    # 读取
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            if conversation_id in self._pending or conversation_id in self._pending_created:
+                return True
+        row = self._connection().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_history(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            after_seq: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """获取最近的消息，未指定limit时最多加载history_limit条"""
+        limit = limit or self.history_limit
+        with self._snapshot(conversation_id) as (conn, pending):
+            pending = [(seq, message) for seq, message in pending if seq > (after_seq or 0)]
+            rows = conn.execute(
+                "SELECT role, content, tokens FROM turns WHERE conversation_id = ? AND seq > ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (conversation_id, after_seq or 0, limit)
+            ).fetchall()
+
+        if not rows and not pending and not self.exists(conversation_id):
+            return None
+
+        history = [{"role": role, "content": content, "tokens": tokens} for role, content, tokens in reversed(rows)]
+        history.extend(dict(message) for _, message in pending)
+        return history[-limit:]
+
+    def get_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending = self._pending_summaries.get(conversation_id)
+            if pending is not None:
+                return dict(pending)
+        row = self._connection().execute(
+            "SELECT content, through_seq, tokens FROM summaries WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"content": row[0], "through_seq": row[1], "tokens": row[2]}
+
+    def set_summary(self, conversation_id: str, content: str, through_seq: int):
+        """摘要由后台线程落盘，落盘前从待写入缓冲读取"""
+        summary = {"content": content, "through_seq": through_seq, "tokens": count_tokens(content)}
+        with self._lock:
+            self._pending_summaries[conversation_id] = summary
+            self._queue.put(("summary", conversation_id, summary, time.time()))
+
+    def get_slots(self, conversation_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            pending = self._pending_slots.get(conversation_id)
+            if pending is not None:
+                return dict(pending)
+        row = self._connection().execute(
+            "SELECT content FROM slots WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_slots(self, conversation_id: str, slots: Dict[str, str]):
+        """实体记忆在每次工具调用成功后更新，与消息一样由后台线程落盘，落盘前从待写入缓冲读取"""
+        slots = dict(slots)
+        with self._lock:
+            self._pending_slots[conversation_id] = slots
+            self._queue.put(("slots", conversation_id, slots, time.time()))
+
+    def get_page(
+            self,
+            conversation_id: str,
+            limit: Optional[int] = None,
+            before_seq: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        通过(conversation_id, seq)索引直接分页
+
+        不等待后台落盘: 合并同一快照中已落盘的消息和待写入缓冲，待写入消息的序号按落盘时的规则(最大序号依次加1)推算
+        """
+        upper = before_seq if before_seq is not None else 2 ** 62
+        with self._snapshot(conversation_id) as (conn, pending):
+            pending = [(seq, message["role"], message["content"]) for seq, message in pending if seq < upper]
+            rows = []
+            if not limit or len(pending) <= limit:
+                rows = conn.execute(
+                    "SELECT seq, role, content FROM turns WHERE conversation_id = ? AND seq < ? "
+                    "ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, upper, (limit + 1 - len(pending)) if limit else -1)
+                ).fetchall()
+
+        if not rows and not pending and not self.exists(conversation_id):
+            return None
+
+        turns = list(reversed(rows)) + pending
+        has_more = bool(limit) and len(turns) > limit
+        if limit:
+            turns = turns[-limit:]
+        return {
+            "history": [{"seq": seq, "role": role, "content": content} for seq, role, content in turns],
+            "next_before_seq": turns[0][0] if has_more else None
+        }
+
+    def get_range(self, conversation_id: str, after_seq: int = 0, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        with self._snapshot(conversation_id) as (conn, pending):
+            rows = conn.execute(
+                "SELECT seq, role, content FROM turns WHERE conversation_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (conversation_id, after_seq, limit)
+            ).fetchall()
+            if len(rows) < limit:
+                rows.extend((seq, message["role"], message["content"])
+                            for seq, message in pending if seq > after_seq)
+                rows = rows[:limit]
+
+        if not rows and not self.exists(conversation_id):
+            return None
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in rows]
+
+    @contextmanager
+    def _snapshot(self, conversation_id: str) -> Iterator[Tuple[sqlite3.Connection, List[Tuple[int, Dict[str, Any]]]]]:
+        """
+        在一个读事务中读取对话，产出(连接, 快照中尚不存在的待写入消息[(seq, 消息)])
+
+        读事务的快照与待写入缓冲在锁内同时获取，之后的查询不持有锁，不会等待后台线程的提交(及其触发的检查点)；
+        后台线程在提交前于锁内记录消息的序号，提交后才移出缓冲，序号不大于快照最大序号的消息已在快照中，予以跳过
+        """
+        conn = self._connection()
+        with self._lock:
+            conn.execute("BEGIN")
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM turns WHERE conversation_id = ?",
+                                   (conversation_id,)).fetchone()[0]
+            pending = list(self._pending.get(conversation_id, []))
+            seqs = [turn.seq for turn in pending]
+        try:
+            turns = []
+            last_seq = max_seq
+            for turn, seq in zip(pending, seqs):
+                if seq is not None and seq <= max_seq:
+                    continue
+                last_seq = seq if seq is not None else last_seq + 1
+                turns.append((last_seq, turn.message))
+            yield conn, turns
+        finally:
+            conn.execute("COMMIT")
+
+    # 后台落盘
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # 在flush_interval内尽量收集更多写入，合并为一个事务
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] not in ("flush", "delete", "stop"):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+            if batch[-1][0] == "stop":
+                return
+
+    def _write_batch(self, batch: List[tuple]):
+        conn = self._connection()
+        committed = False
+        for attempt in range(3):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for op in batch:
+                    if op[0] == "create":
+                        _, conversation_id, timestamp = op
+                        conn.execute("INSERT OR IGNORE INTO conversations (id, created_at, last_active) "
+                                     "VALUES (?, ?, ?)", (conversation_id, timestamp, timestamp))
+                    elif op[0] == "append":
+                        _, conversation_id, message, timestamp = op
+                        conn.execute(_UPSERT_CONVERSATION, (conversation_id, timestamp, timestamp))
+                        conn.execute(_INSERT_TURN, (conversation_id, message["role"], message["content"],
+                                                    message["tokens"], timestamp, conversation_id))
+                    elif op[0] == "slots":
+                        _, conversation_id, slots, timestamp = op
+                        conn.execute("INSERT OR REPLACE INTO slots (conversation_id, content, updated_at) "
+                                     "VALUES (?, ?, ?)",
+                                     (conversation_id, json.dumps(slots, ensure_ascii=False), timestamp))
+                    elif op[0] == "summary":
+                        _, conversation_id, summary, timestamp = op
+                        conn.execute("INSERT OR REPLACE INTO summaries "
+                                     "(conversation_id, content, through_seq, tokens, updated_at) VALUES (?, ?, ?, ?, ?)",
+                                     (conversation_id, summary["content"], summary["through_seq"],
+                                      summary["tokens"], timestamp))
+                    elif op[0] == "delete":
+                        conn.execute("DELETE FROM turns WHERE conversation_id = ?", (op[1],))
+                        conn.execute("DELETE FROM summaries WHERE conversation_id = ?", (op[1],))
+                        conn.execute("DELETE FROM slots WHERE conversation_id = ?", (op[1],))
+                        conn.execute("DELETE FROM conversations WHERE id = ?", (op[1],))
+
+                # 提交可能触发检查点和fsync，不持有锁；提交前记录消息的序号，提交后再移出待写入缓冲，
+                # 读取方据此判断消息是否已在其快照中，不会同时看到两份
+                seqs = self._assigned_seqs(conn, batch)
+                with self._lock:
+                    self._mark_pending(seqs)
+                conn.execute("COMMIT")
+                with self._lock:
+                    self._release_pending(batch, written=True)
+                committed = True
+                break
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                with self._lock:
+                    self._mark_pending({})
+                self.write_errors += 1
+                self.logger.error(f"对话写入失败(第{attempt + 1}次): {str(e)}")
+                time.sleep(0.05 * (attempt + 1))
+
+        if not committed:
+            # 多次失败后丢弃该批写入，避免内存无限增长
+            with self._lock:
+                self._release_pending(batch, written=False)
+
+        for op in batch:
+            if op[0] in ("delete", "flush"):
+                op[-1].set()
+
+    @staticmethod
+    def _assigned_seqs(conn: sqlite3.Connection, batch: List[tuple]) -> Dict[int, int]:
+        """写入事务中各条新消息的序号 {id(消息): seq}；同一对话的消息按顺序占用最大的几个序号"""
+        appended: Dict[str, List[Dict[str, Any]]] = {}
+        for op in batch:
+            if op[0] == "append":
+                appended.setdefault(op[1], []).append(op[2])
+            elif op[0] == "delete":
+                appended.pop(op[1], None)
+        seqs = {}
+        for conversation_id, messages in appended.items():
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM turns WHERE conversation_id = ?",
+                                   (conversation_id,)).fetchone()[0]
+            for index, message in enumerate(messages):
+                seqs[id(message)] = max_seq - len(messages) + 1 + index
+        return seqs
+
+    def _mark_pending(self, seqs: Dict[int, int]):
+        """记录待写入消息在写入事务中的序号，事务回滚时清空(需持有锁)"""
+        for turns in self._pending.values():
+            for turn in turns:
+                if turn.seq is not None or id(turn.message) in seqs:
+                    turn.seq = seqs.get(id(turn.message))
+
+    def _release_pending(self, batch: List[tuple], written: bool):
+        """将已处理的写入移出待写入缓冲(需持有锁)"""
+        for op in batch:
+            if op[0] == "create":
+                count = self._pending_created.get(op[1], 0) - 1
+                if count > 0:
+                    self._pending_created[op[1]] = count
+                else:
+                    self._pending_created.pop(op[1], None)
+            elif op[0] == "slots":
+                # 之后又有新的记忆写入时保留较新的缓冲
+                if self._pending_slots.get(op[1]) is op[2]:
+                    del self._pending_slots[op[1]]
+            elif op[0] == "summary":
+                if self._pending_summaries.get(op[1]) is op[2]:
+                    del self._pending_summaries[op[1]]
+            elif op[0] == "append":
+                pending = self._pending.get(op[1])
+                if pending and pending[0].message is op[2]:
+                    pending.pop(0)
+                    if not pending:
+                        del self._pending[op[1]]
+                if written:
+                    self.rows_written += 1
+        self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_turns = sum(len(messages) for messages in self._pending.values())
+            return {
+                "backend": "sqlite",
+                "db_path": self.db_path,
+                "pending_turns": pending_turns,
+                "queued_writes": self._queue.qsize(),
+                "batches": self.batches,
+                "rows_written": self.rows_written,
+                "avg_batch_rows": self.rows_written / self.batches if self.batches else 0.0,
+                "write_errors": self.write_errors,
+            }
+
+    def close(self):
+        """落盘剩余写入并停止后台线程"""
+        if self._writer.is_alive():
+            self._queue.put(("stop",))
+            self._writer.join(timeout=5.0)
\ No newline at end of file
@@ -5,7 +5,7 @@ import os
 
 
 def setup_logger(name: str, log_level: str = "INFO", log_file: str = None):
-    """设置并返回一个日志记录器"""
+    """设置并返回一个日志记录器(重复调用不会重复添加处理器)"""
     logger = logging.getLogger(name)
 
     # 设置日志级别
@@ -18,6 +18,11 @@ def setup_logger(name: str, log_level: str = "INFO", log_file: str = None):
     }
     logger.setLevel(log_level_map.get(log_level.upper(), logging.INFO))
 
+    # 已配置过的日志记录器直接返回，避免重复添加处理器
+    if getattr(logger, "_agent_configured", False):
+        return logger
+    logger._agent_configured = True
+
     # 格式化器
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -0,0 +1,38 @@
+import re
+from typing import Dict, Any
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken为可选依赖，未安装或无法加载编码时使用估算
+    _ENCODING = None
+
+# 中日韩字符大致每个字符对应一个token
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# 每条消息的格式开销(角色、分隔符等)
+MESSAGE_OVERHEAD = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    计算文本的token数
+
+    安装tiktoken时使用cl100k_base精确计数，否则按中日韩字符1个token、其余字符约4个字符1个token估算
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """计算单条消息的token数，优先使用存储时已缓存的计数"""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(message.get("content", ""))
+    return tokens + MESSAGE_OVERHEAD
\ No newline at end of file
@@ -2,6 +2,9 @@ from typing import Dict, Any, Tuple, Optional
 import re
 import json
 
+# 支持的分析类型
+ANALYSIS_TYPES = ["statistical", "predictive", "descriptive", "diagnostic", "prescriptive"]
+
 
 def validate_email(email: str) -> bool:
     """验证电子邮件格式"""
@@ -32,9 +35,8 @@ def validate_project_params(params: Dict[str, Any]) -> Tuple[bool, Optional[str]
 def validate_analysis_params(params: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """验证分析参数"""
     # 验证分析类型
-    valid_types = ["statistical", "predictive", "descriptive", "diagnostic", "prescriptive"]
-    if "analysis_type" in params and params["analysis_type"] not in valid_types:
-        return False, f"分析类型必须是以下之一: {', '.join(valid_types)}"
+    if "analysis_type" in params and params["analysis_type"] not in ANALYSIS_TYPES:
+        return False, f"分析类型必须是以下之一: {', '.join(ANALYSIS_TYPES)}"
 
     # 验证参数格式
     if "parameters" in params:
@@ -1,20 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Request, BackgroundTasks, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import json
 import jwt
 import datetime
+import uuid
 
-from ..config import WEB_CONFIG, BASE_CONFIG
+from ..config import WEB_CONFIG, BASE_CONFIG, CONVERSATION_CONFIG
 from ..agent.llm_processor import LLMProcessor
 from ..agent.intent_parser import IntentParser
 from ..agent.tool_manager import ToolManager
+from ..agent.summarizer import ConversationSummarizer
+from ..agent.slot_memory import SlotMemory
 from ..api.api_client import APIClient
+from ..api.circuit_breaker import get_breaker_registry
+from ..storage.conversation_store import ConversationStore
 from ..utils.logger import setup_logger
+from .services import AgentServices
+from .handlers import (
+    build_intent_failure_response,
+    build_plan_response,
+    build_tool_response,
+    generate_response_message,
+    remember_plan,
+    stream_process_message,
+)
 
 
 
@@ -37,11 +54,27 @@ class Response(BaseModel):
     error: Optional[str] = None
 
 
+# 应用级共享服务
+services = AgentServices()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时创建并预热服务，关闭时释放连接池"""
+    await asyncio.to_thread(services.startup)
+    await services.startup_async()
+    try:
+        yield
+    finally:
+        await services.shutdown_async()
+
+
 # 创建应用
 app = FastAPI(
     title="AI Agent API",
     description="将自然语言请求转换为软件API调用的AI代理",
-    version=BASE_CONFIG["version"]
+    version=BASE_CONFIG["version"],
+    lifespan=lifespan
 )
 
 # 添加CORS中间件
@@ -60,25 +93,38 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 logger = setup_logger("web_app", log_level=BASE_CONFIG["log_level"])
 
 
-# 创建依赖项
+# 创建依赖项(返回应用级单例，不再每个请求重新构建)
 def get_api_client() -> APIClient:
-    return APIClient()
+    return services.get_api_client()
 
 
 def get_llm_processor() -> LLMProcessor:
-    return LLMProcessor()
+    return services.get_llm_processor()
+
 
+def get_intent_parser() -> IntentParser:
+    return services.get_intent_parser()
 
-def get_intent_parser(llm_processor: LLMProcessor = Depends(get_llm_processor)) -> IntentParser:
-    return IntentParser(llm_processor)
 
+def get_tool_manager() -> ToolManager:
+    return services.get_tool_manager()
 
-def get_tool_manager(api_client: APIClient = Depends(get_api_client)) -> ToolManager:
-    return ToolManager(api_client)
 
+def get_conversation_store() -> ConversationStore:
+    return services.get_conversation_store()
 
-# 会话存储(简易实现，生产环境应使用Redis等)
-conversation_history = {}
+
+def get_summarizer() -> Optional[ConversationSummarizer]:
+    return services.get_summarizer()
+
+
+def get_slot_memory() -> Optional[SlotMemory]:
+    return services.get_slot_memory()
+
+
+def tenant_of(user: Dict) -> str:
+    """用户所属租户(令牌中的tenant，没有时按用户区分)，用于隔离实体名称索引"""
+    return str(user.get("tenant") or user.get("sub"))
 
 
 # 验证令牌
@@ -153,105 +199,87 @@ async def login(auth_data: AuthRequest):
 @app.post("/api/process")
 async def process_message(
         request: UserRequest,
+        background_tasks: BackgroundTasks,
         user: Dict = Depends(verify_token),
         intent_parser: IntentParser = Depends(get_intent_parser),
-        tool_manager: ToolManager = Depends(get_tool_manager)
+        tool_manager: ToolManager = Depends(get_tool_manager),
+        conversation_store: ConversationStore = Depends(get_conversation_store),
+        summarizer: Optional[ConversationSummarizer] = Depends(get_summarizer),
+        slot_memory: Optional[SlotMemory] = Depends(get_slot_memory)
 ):
     """处理用户消息并执行相应操作"""
     try:
         # 获取对话历史
         conversation_id = request.conversation_id
         context = []
+        memory = None
 
-        if conversation_id and conversation_id in conversation_history:
-            context = conversation_history[conversation_id]
-        elif conversation_id:
-            # 新建对话
-            conversation_history[conversation_id] = []
-            context = conversation_history[conversation_id]
+        if conversation_id:
+            history_limit = CONVERSATION_CONFIG["history_limit"]
+            if slot_memory is not None:
+                history_limit = slot_memory.context_limit(history_limit)
+            # 存储调用可能等待磁盘I/O，在线程池中执行以免阻塞事件循环
+            context = await asyncio.to_thread(conversation_store.get_context, conversation_id, limit=history_limit)
+            if context is None:
+                # 新建对话
+                await asyncio.to_thread(conversation_store.create, conversation_id)
+                context = []
+            elif slot_memory is not None:
+                # 最近操作的对象以简短提示发送，"它"等指代无需依赖完整历史
+                context, memory = await asyncio.to_thread(slot_memory.with_hint, conversation_id, context)
 
         # 解析用户意图
-        intent_result = intent_parser.parse_intent(request.message, context)
+        intent_result = await intent_parser.parse_intent_async(request.message, context)
 
         # 添加到对话历史
         if conversation_id:
-            context.append({"role": "user", "content": request.message})
+            await asyncio.to_thread(conversation_store.append, conversation_id,
+                                    {"role": "user", "content": request.message})
 
         # 处理解析结果
         if not intent_result["success"]:
-            # 需要澄清意图
-            if intent_result.get("clarification_needed", False):
-                clarification_msg = "我需要更多信息来帮助你：\n"
-                questions = intent_result.get("clarification_questions", [])
-                for i, question in enumerate(questions, 1):
-                    clarification_msg += f"{i}. {question}\n"
-
-                # 添加到对话历史
-                if conversation_id:
-                    context.append({"role": "assistant", "content": clarification_msg})
-
-                return {
-                    "success": True,
-                    "message": clarification_msg,
-                    "data": {
-                        "requires_clarification": True,
-                        "confidence": intent_result.get("confidence", 0)
-                    }
-                }
-            else:
-                # 解析错误
-                error_msg = f"很抱歉，我无法理解你的请求：{intent_result.get('error', '未知错误')}"
-
-                # 添加到对话历史
-                if conversation_id:
-                    context.append({"role": "assistant", "content": error_msg})
-
-                return {
-                    "success": False,
-                    "message": error_msg,
-                    "error": intent_result.get("error", "未知错误")
-                }
-
-        # 提取操作和参数
-        action = intent_result["action"]
-        parameters = intent_result["parameters"]
-
-        # 执行工具
-        tool_result = tool_manager.execute_tool(action, parameters)
-
-        if not tool_result["success"]:
-            # 工具执行失败
-            error_msg = f"执行操作失败：{tool_result.get('error', '未知错误')}"
-
-            # 添加到对话历史
-            if conversation_id:
-                context.append({"role": "assistant", "content": error_msg})
-
-            return {
-                "success": False,
-                "message": error_msg,
-                "error": tool_result.get("error", "未知错误"),
-                "data": tool_result.get("details", {})
-            }
+            # 需要澄清意图或解析错误
+            response = build_intent_failure_response(intent_result)
+        elif intent_result.get("plan"):
+            # 多步骤计划: 相互独立的步骤并发执行，全部完成后汇总响应
+            plan = intent_result["plan"]
+            results = {}
+            async for event in tool_manager.execute_plan_async(plan, context=context, memory=memory,
+                                                               tenant=tenant_of(user)):
+                if event["type"] == "plan_finished":
+                    results = event["results"]
+            response = build_plan_response(plan, results)
+            await asyncio.to_thread(remember_plan, slot_memory, conversation_id, plan, results)
+        else:
+            # 提取操作和参数
+            action = intent_result["action"]
+            parameters = intent_result["parameters"]
+
+            # 执行工具并生成响应
+            # 缺少的必需参数从原始消息、实体记忆和对话历史中补全，避免多一轮澄清
+            tool_result = await tool_manager.execute_tool_async(action, parameters, message=request.message,
+                                                                context=context, memory=memory,
+                                                                tenant=tenant_of(user))
+            response = build_tool_response(action, tool_result)
 
-        # 执行成功，生成自然语言响应
-        result_data = tool_result["result"]
+            if tool_result["success"] and conversation_id and slot_memory is not None:
+                await asyncio.to_thread(slot_memory.update, conversation_id, action,
+                                        tool_result.get("parameters", parameters), tool_result.get("result"))
 
-        # 根据操作类型生成响应消息
-        response_msg = generate_response_message(action, result_data)
+        # 报告本次请求发送和丢弃的上下文token数
+        if intent_result.get("context_stats"):
+            response["context_stats"] = intent_result["context_stats"]
 
         # 添加到对话历史
         if conversation_id:
-            context.append({"role": "assistant", "content": response_msg})
+            await asyncio.to_thread(conversation_store.append, conversation_id,
+                                    {"role": "assistant", "content": response["message"]})
 
-        return {
-            "success": True,
-            "message": response_msg,
-            "data": {
-                "action": action,
-                "result": result_data
-            }
-        }
+            # 响应发送后在后台压缩较早的消息
+            if summarizer is not None:
+                background_tasks.add_task(summarizer.maybe_summarize, conversation_id)
+
+        return response
 
     except Exception as e:
         logger.error(f"处理消息异常: {str(e)}")
@@ -262,11 +290,38 @@ async def process_message(
         }
 
 
+@app.post("/api/process/stream")
+async def process_message_stream(
+        request: UserRequest,
+        user: Dict = Depends(verify_token),
+        intent_parser: IntentParser = Depends(get_intent_parser),
+        tool_manager: ToolManager = Depends(get_tool_manager),
+        conversation_store: ConversationStore = Depends(get_conversation_store),
+        summarizer: Optional[ConversationSummarizer] = Depends(get_summarizer),
+        slot_memory: Optional[SlotMemory] = Depends(get_slot_memory)
+):
+    """以Server-Sent Events流式处理用户消息"""
+    background = None
+    if summarizer is not None and request.conversation_id:
+        background = BackgroundTask(summarizer.maybe_summarize, request.conversation_id)
+
+    return StreamingResponse(
+        stream_process_message(request.message, request.conversation_id, conversation_store,
+                               intent_parser, tool_manager, slot_memory, tenant_of(user)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background
+    )
+
+
 @app.post("/api/conversations")
-async def create_conversation(user: Dict = Depends(verify_token)):
+async def create_conversation(
+        user: Dict = Depends(verify_token),
+        conversation_store: ConversationStore = Depends(get_conversation_store)
+):
     """创建新对话"""
-    conversation_id = f"conv_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{len(conversation_history) + 1}"
-    conversation_history[conversation_id] = []
+    conversation_id = f"conv_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    await asyncio.to_thread(conversation_store.create, conversation_id)
 
     return {
         "success": True,
@@ -276,9 +331,16 @@ async def create_conversation(user: Dict = Depends(verify_token)):
 
 
 @app.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str, user: Dict = Depends(verify_token)):
-    """获取对话历史"""
-    if conversation_id not in conversation_history:
+async def get_conversation(
+        conversation_id: str,
+        limit: Optional[int] = None,
+        before_seq: Optional[int] = None,
+        user: Dict = Depends(verify_token),
+        conversation_store: ConversationStore = Depends(get_conversation_store)
+):
+    """获取对话历史，可通过limit和before_seq向前分页"""
+    page = await asyncio.to_thread(conversation_store.get_page, conversation_id, limit=limit, before_seq=before_seq)
+    if page is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="对话不存在"
@@ -287,119 +349,56 @@ async def get_conversation(conversation_id: str, user: Dict = Depends(verify_tok
     return {
         "success": True,
         "message": "获取对话历史成功",
-        "data": {"history": conversation_history[conversation_id]}
+        "data": page
     }
 
 
 @app.delete("/api/conversations/{conversation_id}")
-async def delete_conversation(conversation_id: str, user: Dict = Depends(verify_token)):
+async def delete_conversation(
+        conversation_id: str,
+        user: Dict = Depends(verify_token),
+        conversation_store: ConversationStore = Depends(get_conversation_store)
+):
     """删除对话"""
-    if conversation_id not in conversation_history:
+    # SQLite存储的删除会等待后台落盘，放到线程中执行以免阻塞事件循环
+    if not await asyncio.to_thread(conversation_store.delete, conversation_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="对话不存在"
         )
 
-    del conversation_history[conversation_id]
-
     return {
         "success": True,
         "message": "对话删除成功"
     }
 
 
+@app.get("/api/metrics")
+async def get_metrics(user: Dict = Depends(verify_token)):
+    """获取运行指标"""
+    return {
+        "success": True,
+        "message": "获取运行指标成功",
+        "data": services.metrics()
+    }
+
+
+@app.get("/api/diagnostics/breakers")
+async def get_breakers(user: Dict = Depends(verify_token)):
+    """获取各后端端点和LLM提供商的熔断器状态"""
+    return {
+        "success": True,
+        "message": "获取熔断器状态成功",
+        "data": get_breaker_registry().snapshot()
+    }
+
+
 @app.get("/api/health")
 async def health_check():
     """健康检查端点"""
     return {"status": "ok", "version": BASE_CONFIG["version"]}
 
 
-# 辅助函数
-def generate_response_message(action: str, result_data: Dict[str, Any]) -> str:
-    """根据操作类型和结果生成自然语言响应"""
-
-    # 用户相关操作
-    if action == "login":
-        return "登录成功！欢迎回来。"
-    elif action == "logout":
-        return "您已成功退出系统。"
-    elif action == "get_user":
-        user = result_data
-        return f"用户信息: 用户名 {user.get('username', '未知')}, 邮箱 {user.get('email', '未知')}"
-    elif action == "create_user":
-        return f"用户创建成功！用户ID: {result_data.get('id', '未知')}"
-    elif action == "update_user":
-        return "用户信息已成功更新。"
-    elif action == "delete_user":
-        return "用户已成功删除。"
-
-    # 项目相关操作
-    elif action == "list_projects":
-        projects = result_data.get("projects", [])
-        count = len(projects)
-        if count == 0:
-            return "没有找到任何项目。"
-        elif count == 1:
-            return f"找到1个项目: {projects[0].get('name', '未命名项目')}"
-        else:
-            project_names = [p.get('name', '未命名项目') for p in projects[:3]]
-            return f"找到{count}个项目。包括: {', '.join(project_names)}" + ("..." if count > 3 else "")
-    elif action == "get_project":
-        project = result_data
-        return f"项目详情: {project.get('name', '未命名项目')} - {project.get('description', '无描述')}"
-    elif action == "create_project":
-        return f"项目创建成功！项目ID: {result_data.get('id', '未知')}"
-    elif action == "update_project":
-        return "项目信息已成功更新。"
-    elif action == "delete_project":
-        return "项目已成功删除。"
-
-    # 文件相关操作
-    elif action == "list_files":
-        files = result_data.get("files", [])
-        count = len(files)
-        if count == 0:
-            return "该项目中没有找到任何文件。"
-        elif count == 1:
-            return f"找到1个文件: {files[0].get('name', '未命名文件')}"
-        else:
-            file_names = [f.get('name', '未命名文件') for f in files[:3]]
-            return f"找到{count}个文件。包括: {', '.join(file_names)}" + ("..." if count > 3 else "")
-    elif action == "upload_file":
-        return f"文件上传成功！文件ID: {result_data.get('id', '未知')}"
-    elif action == "download_file":
-        return "文件已准备好下载。"
-    elif action == "delete_file":
-        return "文件已成功删除。"
-
-    # 数据分析相关操作
-    elif action == "run_analysis":
-        return f"分析任务已成功启动。分析ID: {result_data.get('analysis_id', '未知')}"
-    elif action == "get_analysis_result":
-        status = result_data.get("status", "未知")
-        if status.lower() == "completed":
-            return "分析已完成，结果已可用。"
-        elif status.lower() == "running":
-            return "分析正在进行中，请稍后查询结果。"
-        elif status.lower() == "failed":
-            return f"分析任务失败: {result_data.get('error', '未知错误')}"
-        else:
-            return f"分析状态: {status}"
-    elif action == "export_report":
-        return "报告已成功导出，可以下载。"
-
-    # 系统相关操作
-    elif action == "get_system_status":
-        status = result_data.get("status", "未知")
-        return f"系统状态: {status}"
-    elif action == "get_usage_statistics":
-        return "已获取使用统计数据。"
-
-    # 默认响应
-    else:
-        return f"操作 '{action}' 已成功执行。"
-
-
 @app.get("/")
 async def root():
     return {"message": "欢迎使用 Software AI Agent", "version": BASE_CONFIG["version"]}
@@ -412,4 +411,4 @@ if __name__ == "__main__":
         host=WEB_CONFIG["host"],
         port=WEB_CONFIG["port"],
         reload=BASE_CONFIG["debug"]
-    )
+    )
\ No newline at end of file
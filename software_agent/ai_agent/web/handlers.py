@@ -0,0 +1,362 @@
+import asyncio
+import json
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from ..config import BASE_CONFIG, CONVERSATION_CONFIG
+from ..agent.intent_parser import IntentParser
+from ..agent.tool_manager import ToolManager
+from ..agent.slot_memory import SlotMemory
+from ..storage.conversation_store import ConversationStore
+from ..utils.logger import setup_logger
+
+logger = setup_logger("web_handlers", log_level=BASE_CONFIG["log_level"])
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """格式化为Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def build_intent_failure_response(intent_result: Dict[str, Any]) -> Dict[str, Any]:
+    """根据失败的意图解析结果生成响应(澄清问题或错误)"""
+    # 需要澄清意图
+    if intent_result.get("clarification_needed", False):
+        clarification_msg = "我需要更多信息来帮助你：\n"
+        questions = intent_result.get("clarification_questions", [])
+        for i, question in enumerate(questions, 1):
+            clarification_msg += f"{i}. {question}\n"
+
+        return {
+            "success": True,
+            "message": clarification_msg,
+            "data": {
+                "requires_clarification": True,
+                "confidence": intent_result.get("confidence", 0)
+            }
+        }
+
+    # 解析错误
+    error_msg = f"很抱歉，我无法理解你的请求：{intent_result.get('error', '未知错误')}"
+    return {
+        "success": False,
+        "message": error_msg,
+        "error": intent_result.get("error", "未知错误")
+    }
+
+
+def build_tool_response(action: str, tool_result: Dict[str, Any]) -> Dict[str, Any]:
+    """根据工具执行结果生成响应"""
+    if not tool_result["success"]:
+        # 工具执行失败
+        error_msg = f"执行操作失败：{tool_result.get('error', '未知错误')}"
+        return {
+            "success": False,
+            "message": error_msg,
+            "error": tool_result.get("error", "未知错误"),
+            "data": tool_result.get("details", {})
+        }
+
+    # 执行成功，生成自然语言响应
+    result_data = tool_result["result"]
+    response = {
+        "success": True,
+        "message": generate_response_message(action, result_data),
+        "data": {
+            "action": action,
+            "result": result_data
+        }
+    }
+    # 告知调用方哪些参数是从消息或对话历史中自动补全的
+    if tool_result.get("filled_params"):
+        response["data"]["filled_params"] = tool_result["filled_params"]
+    return response
+
+
+def build_plan_response(plan: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """所有步骤完成后按计划顺序汇总各步骤的响应"""
+    steps = []
+    lines = []
+    for index, step in enumerate(plan, 1):
+        step_response = build_tool_response(step["action"], results[step["id"]])
+        lines.append(f"{index}. {step_response['message']}")
+        steps.append(dict(step_response, step=step["id"], action=step["action"]))
+
+    success = all(step["success"] for step in steps)
+    response = {
+        "success": success,
+        "message": "\n".join(lines),
+        "data": {"plan": steps}
+    }
+    if not success:
+        response["error"] = "部分步骤执行失败"
+    return response
+
+
+def remember_plan(slot_memory: Optional[SlotMemory], conversation_id: Optional[str],
+                  plan: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]):
+    """按计划顺序用成功步骤的参数和结果更新实体记忆"""
+    if not conversation_id or slot_memory is None:
+        return
+    for step in plan:
+        tool_result = results[step["id"]]
+        if tool_result["success"]:
+            slot_memory.update(conversation_id, step["action"], tool_result.get("parameters", step["parameters"]),
+                               tool_result.get("result"))
+
+
+class SpeculativeToolRunner:
+    """在LLM仍在生成时提前执行只读工具，最终意图确认后复用或丢弃结果"""
+
+    def __init__(self, tool_manager: ToolManager, tenant: Optional[str] = None):
+        self.tool_manager = tool_manager
+        self.tenant = tenant
+        self.action: Optional[str] = None
+        self.parameters: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def maybe_start(self, action: str, parameters: Dict[str, Any]) -> bool:
+        """参数校验通过且工具为只读时启动后台执行"""
+        tool = self.tool_manager.get_tool(action)
+        if not tool or not tool.read_only or self.task is not None:
+            return False
+
+        is_valid, _ = tool.validate_params(parameters)
+        if not is_valid:
+            return False
+
+        self.action = action
+        self.parameters = dict(parameters)
+        self.task = asyncio.create_task(
+            self.tool_manager.execute_tool_async(action, self.parameters, tenant=self.tenant))
+        logger.debug(f"提前执行只读工具: {action}")
+        return True
+
+    def matches(self, action: str, parameters: Dict[str, Any]) -> bool:
+        """最终意图是否与提前执行的调用一致"""
+        return self.task is not None and self.action == action and self.parameters == parameters
+
+    async def result(self) -> Dict[str, Any]:
+        return await self.task
+
+    def cancel(self):
+        """丢弃提前执行的调用"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.task = None
+
+
+async def stream_process_message(
+        message: str,
+        conversation_id: Optional[str],
+        conversation_store: ConversationStore,
+        intent_parser: IntentParser,
+        tool_manager: ToolManager,
+        slot_memory: Optional[SlotMemory] = None,
+        tenant: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    流式处理用户消息，依次产出LLM增量输出和各阶段事件
+
+    事件类型: token, intent_parsed, tool_started, tool_finished, final_message
+    多步骤计划的每个步骤各产出一次带step字段的tool_started和tool_finished，全部完成后产出汇总的final_message
+    """
+    speculative = SpeculativeToolRunner(tool_manager, tenant)
+
+    try:
+        # 获取对话历史
+        context = []
+        memory = None
+        if conversation_id:
+            history_limit = CONVERSATION_CONFIG["history_limit"]
+            if slot_memory is not None:
+                history_limit = slot_memory.context_limit(history_limit)
+            context = await asyncio.to_thread(conversation_store.get_context, conversation_id, limit=history_limit)
+            if context is None:
+                await asyncio.to_thread(conversation_store.create, conversation_id)
+                context = []
+            elif slot_memory is not None:
+                context, memory = await asyncio.to_thread(slot_memory.with_hint, conversation_id, context)
+
+        # 解析用户意图，同时转发LLM输出；只读工具在参数完整后立即提前执行
+        intent_result = None
+        async for event in intent_parser.parse_intent_stream(message, context):
+            if event["type"] == "token":
+                yield format_sse("token", {"text": event["text"]})
+            elif event["type"] == "partial_intent":
+                if speculative.maybe_start(event["action"], event["parameters"]):
+                    yield format_sse("tool_started", {"action": event["action"],
+                                                      "parameters": event["parameters"],
+                                                      "speculative": True})
+            else:
+                intent_result = event["result"]
+
+        # 添加到对话历史
+        if conversation_id:
+            await asyncio.to_thread(conversation_store.append, conversation_id, {"role": "user", "content": message})
+
+        yield format_sse("intent_parsed", {
+            "success": intent_result["success"],
+            "action": intent_result.get("action"),
+            "parameters": intent_result.get("parameters"),
+            "plan": intent_result.get("plan"),
+            "confidence": intent_result.get("confidence"),
+            "error": intent_result.get("error"),
+            "context_stats": intent_result.get("context_stats")
+        })
+
+        if not intent_result["success"]:
+            speculative.cancel()
+            response = build_intent_failure_response(intent_result)
+        elif intent_result.get("plan"):
+            speculative.cancel()
+            plan = intent_result["plan"]
+            results = {}
+            async for event in tool_manager.execute_plan_async(plan, context=context, memory=memory,
+                                                               tenant=tenant):
+                if event["type"] == "step_started":
+                    yield format_sse("tool_started", {"step": event["step"], "action": event["action"],
+                                                      "parameters": event["parameters"]})
+                elif event["type"] == "step_finished":
+                    # 每个步骤完成后立即推送其结果，无需等待整个计划
+                    tool_result = event["result"]
+                    yield format_sse("tool_finished", {
+                        "step": event["step"],
+                        "action": event["action"],
+                        "success": tool_result["success"],
+                        "error": tool_result.get("error"),
+                        "message": build_tool_response(event["action"], tool_result)["message"]
+                    })
+                else:
+                    results = event["results"]
+
+            response = build_plan_response(plan, results)
+            await asyncio.to_thread(remember_plan, slot_memory, conversation_id, plan, results)
+        else:
+            action = intent_result["action"]
+            if speculative.matches(action, intent_result["parameters"]):
+                tool_result = await speculative.result()
+            else:
+                speculative.cancel()
+                yield format_sse("tool_started", {"action": action, "parameters": intent_result["parameters"]})
+                tool_result = await tool_manager.execute_tool_async(action, intent_result["parameters"],
+                                                                    message=message, context=context, memory=memory,
+                                                                    tenant=tenant)
+
+            yield format_sse("tool_finished", {
+                "action": action,
+                "success": tool_result["success"],
+                "error": tool_result.get("error")
+            })
+
+            response = build_tool_response(action, tool_result)
+
+            if tool_result["success"] and conversation_id and slot_memory is not None:
+                await asyncio.to_thread(slot_memory.update, conversation_id, action,
+                                        tool_result.get("parameters", intent_result["parameters"]),
+                                        tool_result.get("result"))
+
+        if intent_result.get("context_stats"):
+            response["context_stats"] = intent_result["context_stats"]
+
+        # 添加到对话历史
+        if conversation_id:
+            await asyncio.to_thread(conversation_store.append, conversation_id,
+                                    {"role": "assistant", "content": response["message"]})
+
+        yield format_sse("final_message", response)
+
+    except Exception as e:
+        logger.error(f"流式处理消息异常: {str(e)}")
+        yield format_sse("final_message", {
+            "success": False,
+            "message": "处理请求时发生错误",
+            "error": str(e)
+        })
+    finally:
+        # 客户端断开或处理失败时不再保留提前执行的调用
+        speculative.cancel()
+
+
+def generate_response_message(action: str, result_data: Dict[str, Any]) -> str:
+    """根据操作类型和结果生成自然语言响应"""
+
+    # 用户相关操作
+    if action == "login":
+        return "登录成功！欢迎回来。"
+    elif action == "logout":
+        return "您已成功退出系统。"
+    elif action == "get_user":
+        user = result_data
+        return f"用户信息: 用户名 {user.get('username', '未知')}, 邮箱 {user.get('email', '未知')}"
+    elif action == "create_user":
+        return f"用户创建成功！用户ID: {result_data.get('id', '未知')}"
+    elif action == "update_user":
+        return "用户信息已成功更新。"
+    elif action == "delete_user":
+        return "用户已成功删除。"
+
+    # 项目相关操作
+    elif action == "list_projects":
+        projects = result_data.get("projects", [])
+        count = len(projects)
+        if count == 0:
+            return "没有找到任何项目。"
+        elif count == 1:
+            return f"找到1个项目: {projects[0].get('name', '未命名项目')}"
+        else:
+            project_names = [p.get('name', '未命名项目') for p in projects[:3]]
+            return f"找到{count}个项目。包括: {', '.join(project_names)}" + ("..." if count > 3 else "")
+    elif action == "get_project":
+        project = result_data
+        return f"项目详情: {project.get('name', '未命名项目')} - {project.get('description', '无描述')}"
+    elif action == "create_project":
+        return f"项目创建成功！项目ID: {result_data.get('id', '未知')}"
+    elif action == "update_project":
+        return "项目信息已成功更新。"
+    elif action == "delete_project":
+        return "项目已成功删除。"
+
+    # 文件相关操作
+    elif action == "list_files":
+        files = result_data.get("files", [])
+        count = len(files)
+        if count == 0:
+            return "该项目中没有找到任何文件。"
+        elif count == 1:
+            return f"找到1个文件: {files[0].get('name', '未命名文件')}"
+        else:
+            file_names = [f.get('name', '未命名文件') for f in files[:3]]
+            return f"找到{count}个文件。包括: {', '.join(file_names)}" + ("..." if count > 3 else "")
+    elif action == "upload_file":
+        return f"文件上传成功！文件ID: {result_data.get('id', '未知')}"
+    elif action == "download_file":
+        return "文件已准备好下载。"
+    elif action == "delete_file":
+        return "文件已成功删除。"
+
+    # 数据分析相关操作
+    elif action == "run_analysis":
+        return f"分析任务已成功启动。分析ID: {result_data.get('analysis_id', '未知')}"
+    elif action == "get_analysis_result":
+        status = result_data.get("status", "未知")
+        if status.lower() == "completed":
+            return "分析已完成，结果已可用。"
+        elif status.lower() == "running":
+            return "分析正在进行中，请稍后查询结果。"
+        elif status.lower() == "failed":
+            return f"分析任务失败: {result_data.get('error', '未知错误')}"
+        else:
+            return f"分析状态: {status}"
+    elif action == "export_report":
+        return "报告已成功导出，可以下载。"
+
+    # 系统相关操作
+    elif action == "get_system_status":
+        status = result_data.get("status", "未知")
+        return f"系统状态: {status}"
+    elif action == "get_usage_statistics":
+        return "已获取使用统计数据。"
+
+    # 默认响应
+    else:
+        return f"操作 '{action}' 已成功执行。"
\ No newline at end of file
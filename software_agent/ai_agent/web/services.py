@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional
+
+from ..config import API_CONFIG, BASE_CONFIG, LLM_CONFIG
+from ..agent.llm_processor import LLMProcessor
+from ..agent.llm_router import LLMRouter, create_llm_router
+from ..agent.intent_parser import IntentParser, INTENT_MAP
+from ..agent.tool_manager import ToolManager
+from ..agent.tool_retriever import create_tool_retriever
+from ..agent.summarizer import ConversationSummarizer, create_summarizer
+from ..agent.slot_memory import SlotMemory, create_slot_memory
+from ..api.api_client import APIClient
+from ..storage.conversation_store import ConversationStore, create_conversation_store
+from ..utils.logger import setup_logger
+
+
+class AgentServices:
+    """应用级服务容器，在整个应用生命周期内复用客户端、处理器和工具注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._api_client: Optional[APIClient] = None
+        self._llm_processor: Optional[LLMProcessor] = None
+        self._llm_router: Optional[LLMRouter] = None
+        self._intent_parser: Optional[IntentParser] = None
+        self._tool_manager: Optional[ToolManager] = None
+        self._conversation_store: Optional[ConversationStore] = None
+        self._summarizer: Optional[ConversationSummarizer] = None
+        self._slot_memory: Optional[SlotMemory] = None
+        self.logger = setup_logger("agent_services", log_level=BASE_CONFIG["log_level"])
+
+    def _ensure_initialized(self):
+        """在锁保护下创建尚未初始化的服务(双重检查，已初始化时无锁开销)"""
+        if self._tool_manager is not None:
+            return
+
+        with self._lock:
+            if self._tool_manager is not None:
+                return
+
+            conversation_store = create_conversation_store()
+            api_client = APIClient()
+            tool_manager = ToolManager(api_client)
+            # 工具检索索引在启动时建立一次
+            tool_retriever = create_tool_retriever(tool_manager.tools, INTENT_MAP)
+            llm_processor = LLMProcessor(tools=tool_manager.tools, tool_retriever=tool_retriever)
+            # 配置了备用提供商时，意图解析和摘要经路由故障转移/对冲
+            llm_router = create_llm_router(llm_processor)
+            llm = llm_router or llm_processor
+            intent_parser = IntentParser(llm)
+            summarizer = create_summarizer(llm, conversation_store)
+            slot_memory = create_slot_memory(conversation_store)
+
+            self._conversation_store = conversation_store
+            self._summarizer = summarizer
+            self._slot_memory = slot_memory
+            self._api_client = api_client
+            self._llm_processor = llm_processor
+            self._llm_router = llm_router
+            self._intent_parser = intent_parser
+            # 最后赋值，作为初始化完成的标志
+            self._tool_manager = tool_manager
+
+    def _llm_processors(self) -> List[LLMProcessor]:
+        """所有提供商的LLMProcessor(未启用路由时只有主提供商)，启用模型级联时包括快速模型"""
+        if self._llm_router is not None:
+            processors = list(self._llm_router.processors)
+        else:
+            processors = [self._llm_processor] if self._llm_processor is not None else []
+        if self._intent_parser is not None and self._intent_parser.fast_processor is not None:
+            processors.append(self._intent_parser.fast_processor)
+        return processors
+
+    def startup(self):
+        """启动钩子：创建服务并预热连接池"""
+        self._ensure_initialized()
+        if API_CONFIG.get("warmup", False):
+            self._api_client.warmup()
+        if LLM_CONFIG.get("warmup", False):
+            for llm_processor in self._llm_processors():
+                llm_processor.transport.warmup()
+        self.logger.info(f"已加载{len(self._tool_manager.tools)}个工具，服务初始化完成")
+
+    async def startup_async(self):
+        """在事件循环中预热LLM异步连接池(异步客户端需绑定到处理请求的事件循环)"""
+        self._ensure_initialized()
+        if LLM_CONFIG.get("warmup", False):
+            await asyncio.gather(*(llm_processor.transport.warmup_async(LLM_CONFIG.get("warmup_connections", 2))
+                                   for llm_processor in self._llm_processors()))
+
+    async def shutdown_async(self):
+        """异步关闭钩子：先关闭异步客户端，再释放同步连接池"""
+        if self._api_client is not None:
+            await self._api_client.close_async()
+        for llm_processor in self._llm_processors():
+            await llm_processor.close_async()
+        self.shutdown()
+
+    def shutdown(self):
+        """关闭钩子：释放连接池并重置服务"""
+        with self._lock:
+            if self._api_client is not None:
+                self._api_client.close()
+            for llm_processor in self._llm_processors():
+                llm_processor.close()
+            if self._intent_parser is not None and self._intent_parser.intent_cache is not None:
+                self._intent_parser.intent_cache.save()
+            if self._intent_parser is not None and self._intent_parser.outcome_log is not None:
+                self._intent_parser.outcome_log.close()
+            if self._conversation_store is not None:
+                self._conversation_store.close()
+
+            # 先清除初始化标志，再释放其余服务
+            self._tool_manager = None
+            self._intent_parser = None
+            self._llm_processor = None
+            self._llm_router = None
+            self._api_client = None
+            self._conversation_store = None
+            self._summarizer = None
+            self._slot_memory = None
+        self.logger.info("服务已关闭")
+
+    def get_api_client(self) -> APIClient:
+        self._ensure_initialized()
+        return self._api_client
+
+    def get_llm_processor(self) -> LLMProcessor:
+        self._ensure_initialized()
+        return self._llm_processor
+
+    def get_llm_router(self) -> Optional[LLMRouter]:
+        """获取多提供商路由，未配置备用提供商时返回None"""
+        self._ensure_initialized()
+        return self._llm_router
+
+    def get_intent_parser(self) -> IntentParser:
+        self._ensure_initialized()
+        return self._intent_parser
+
+    def get_tool_manager(self) -> ToolManager:
+        self._ensure_initialized()
+        return self._tool_manager
+
+    def get_conversation_store(self) -> ConversationStore:
+        self._ensure_initialized()
+        return self._conversation_store
+
+    def get_summarizer(self) -> Optional[ConversationSummarizer]:
+        """获取对话压缩器，未启用时返回None"""
+        self._ensure_initialized()
+        return self._summarizer
+
+    def get_slot_memory(self) -> Optional[SlotMemory]:
+        """获取跨轮次实体记忆，未启用时返回None"""
+        self._ensure_initialized()
+        return self._slot_memory
+
+    def metrics(self) -> Dict[str, Any]:
+        """汇总各服务的运行指标"""
+        self._ensure_initialized()
+        intent_cache = self._intent_parser.intent_cache
+        rule_engine = self._intent_parser.rule_engine
+        intent_classifier = self._intent_parser.intent_classifier
+        return {
+            "conversations": self._conversation_store.stats(),
+            "intent_cache": intent_cache.stats() if intent_cache is not None else None,
+            "intent_rules": rule_engine.stats() if rule_engine is not None else None,
+            "intent_classifier": intent_classifier.stats() if intent_classifier is not None else None,
+            "llm_latency_ms": self._intent_parser.llm_latency * 1000,
+            "context": self._llm_processor.context_builder.stats(),
+            "output_budget": self._llm_processor.output_budget.stats(),
+            "prompt_cache": self._llm_processor.prompt_builder.cache_stats.stats(),
+            "tool_retrieval": (self._llm_processor.tool_retriever.stats()
+                               if self._llm_processor.tool_retriever is not None else None),
+            "slot_filling": (self._tool_manager.slot_filler.stats()
+                             if self._tool_manager.slot_filler is not None else None),
+            "api_retry": self._api_client.retry_policy.stats(),
+            "llm_transport": self._llm_processor.transport.stats(),
+            "llm_router": self._llm_router.stats() if self._llm_router is not None else None,
+            "model_cascade": self._intent_parser.cascade_stats(),
+            "summarizer": self._summarizer.stats() if self._summarizer is not None else None,
+            "slot_memory": self._slot_memory.stats() if self._slot_memory is not None else None,
+            "entity_index": (self._tool_manager.entity_index.stats()
+                             if self._tool_manager.entity_index is not None else None),
+            "plans": self._tool_manager.plan_stats.stats(),
+        }
\ No newline at end of file
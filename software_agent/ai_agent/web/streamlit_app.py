@@ -4,7 +4,7 @@ import json
 import uuid
 import datetime
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, Tuple
 
 # 配置
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000/api")
@@ -61,6 +61,35 @@ class AIAgentClient:
             return {"success": False, "message": f"处理消息失败 ({response.status_code}): {response.text}"}
 
 
+    def stream_message(self, message: str, conversation_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """以流式方式处理用户消息，逐个产出(事件类型, 数据)"""
+        payload = {
+            "message": message
+        }
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+
+        with requests.post(
+                f"{self.base_url}/process/stream",
+                headers=DEFAULT_HEADERS,
+                json=payload,
+                stream=True
+        ) as response:
+            if response.status_code != 200:
+                yield "final_message", {"success": False,
+                                        "message": f"处理消息失败 ({response.status_code}): {response.text}"}
+                return
+
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):].strip())
+
+
 # 初始化会话状态
 def init_session_state():
     """初始化Streamlit会话状态"""
@@ -85,8 +114,29 @@ def handle_send_message(message: str):
     # 添加用户消息到界面
     st.session_state.messages.append({"role": "user", "content": message})
 
-    # 处理消息
-    result = st.session_state.client.process_message(message, st.session_state.conversation_id)
+    # 流式处理消息，实时显示模型输出和执行阶段
+    result = {}
+    with st.chat_message("assistant", avatar="🤖"):
+        placeholder = st.empty()
+        tokens = ""
+        stages = []
+        for event, data in st.session_state.client.stream_message(message, st.session_state.conversation_id):
+            if event == "token":
+                tokens += data.get("text", "")
+            elif event == "intent_parsed":
+                plan = "、".join(step["action"] for step in data.get("plan") or [])
+                stages.append(f"已解析意图: {data.get('action') or plan or '未识别'}")
+            elif event == "tool_started":
+                stages.append(f"正在执行: {data.get('action')}")
+            elif event == "tool_finished":
+                stages.append(f"执行{'完成' if data.get('success') else '失败'}: {data.get('action')}")
+            elif event == "final_message":
+                result = data
+                break
+
+            progress = "\n".join(f"- {stage}" for stage in stages)
+            placeholder.markdown(f"```json\n{tokens}\n```\n{progress}" if tokens else progress)
+        placeholder.empty()
 
     if result.get("success", False):
         # 添加助手回复到界面
@@ -153,7 +203,9 @@ def main():
         # 消息输入框
         user_input = st.chat_input("输入自然语言指令...")
         if user_input:
-            handle_send_message(user_input)
+            with chat_container:
+                st.chat_message("user", avatar="👤").write(user_input)
+                handle_send_message(user_input)
             st.rerun()
 
     with col2:
@@ -178,4 +230,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
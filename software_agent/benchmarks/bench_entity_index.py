@@ -0,0 +1,47 @@
+"""
+实体名称索引的查询基准
+
+为一个租户登记若干项目名称，测量从消息中按名称(含前后缀、空格等变体)解析project_id的耗时和命中率
+
+运行方式(在software_agent目录下):
+    python -m benchmarks.bench_entity_index
+    python -m benchmarks.bench_entity_index --projects 5000 --queries 20000
+"""
+import argparse
+import random
+import time
+
+from ai_agent.agent.entity_index import EntityIndex
+
+TOPICS = ["营销", "销售", "用户", "库存", "财务", "渠道", "广告", "供应链", "客服", "会员"]
+KINDS = ["分析", "预测", "画像", "监控", "报表", "优化"]
+TEMPLATES = ["为{}项目上传文件", "列出{}项目的文件", "查看{}", "删除{}这个项目", "对{}项目做聚类分析"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实体名称索引基准测试")
+    parser.add_argument("--projects", type=int, default=1000, help="登记的项目数")
+    parser.add_argument("--queries", type=int, default=10000, help="查询次数")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = EntityIndex(ttl=3600)
+    names = [f"{rng.choice(TOPICS)}{rng.choice(KINDS)}{i}期" for i in range(args.projects)]
+    index.observe("bench", "list_projects", {}, {"projects": [{"id": i, "name": name} for i, name in enumerate(names)]})
+
+    queries = [(rng.randrange(len(names)), rng.choice(TEMPLATES)) for _ in range(args.queries)]
+    correct = 0
+    start = time.perf_counter()
+    for project_id, template in queries:
+        found = index.find("bench", "project", template.format(names[project_id]))
+        correct += found is not None and found[0] == str(project_id)
+    elapsed = time.perf_counter() - start
+
+    print(f"项目数: {args.projects}  查询: {args.queries}  正确解析: {correct / args.queries:.1%}")
+    print(f"平均耗时: {elapsed / args.queries * 1e6:.1f}us/次")
+    print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+本地意图分类器的训练与推理基准
+
+从决策日志(JSONL，每行 {"text", "action", "confidence"})训练模型，报告留出集准确率、校准阈值下的覆盖率，
+以及单条与批量推理的耗时；未指定日志时由内置样例合成数据
+
+运行方式(在software_agent目录下):
+    python -m benchmarks.bench_intent_classifier
+    python -m benchmarks.bench_intent_classifier --log data/intent_outcomes.jsonl --batch 512
+"""
+import argparse
+import random
+import re
+import tempfile
+import time
+
+from ai_agent.agent.intent_classifier import IntentClassifier, read_outcome_log, save_model, train_classifier
+from benchmarks.bench_tool_retrieval import SAMPLES
+
+PREFIXES = ["", "请", "帮我", "麻烦", "我想", "能不能"]
+SUFFIXES = ["", "吧", "一下", "谢谢", "？"]
+
+
+def synthetic_log(count: int, seed: int):
+    """在内置样例上替换数字、添加前后缀，生成合成决策日志"""
+    rng = random.Random(seed)
+    texts, actions = [], []
+    for _ in range(count):
+        text, action = rng.choice(SAMPLES)
+        text = re.sub(r"\d+", lambda _: str(rng.randint(1, 9999)), text)
+        texts.append(rng.choice(PREFIXES) + text + rng.choice(SUFFIXES))
+        actions.append(action)
+    return texts, actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地意图分类器基准测试")
+    parser.add_argument("--log", default="", help="决策日志(JSONL)路径")
+    parser.add_argument("--samples", type=int, default=5000, help="未指定日志时合成的样本数")
+    parser.add_argument("--dim", type=int, default=1 << 18, help="特征哈希空间大小")
+    parser.add_argument("--precision", type=float, default=0.98, help="校准阈值的目标准确率")
+    parser.add_argument("--batch", type=int, default=256, help="批量推理的批大小")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    args = parser.parse_args()
+
+    texts, actions = read_outcome_log(args.log) if args.log else synthetic_log(args.samples, args.seed)
+
+    start = time.perf_counter()
+    weights, bias, meta = train_classifier(texts, actions, dim=args.dim, target_precision=args.precision)
+    print(f"样本数: {len(texts)}  操作数: {len(meta['labels'])}  训练: {time.perf_counter() - start:.1f}s")
+    print(f"留出集准确率: {meta.get('accuracy', 0.0):.1%}  阈值: {meta['cutoff']:.3f}  "
+          f"覆盖率: {meta.get('coverage', 0.0):.1%}  覆盖部分准确率: {meta.get('precision', 0.0):.1%}")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        classifier = IntentClassifier.load(save_model(model_dir, weights, bias, meta))
+        queries = texts[:args.batch]
+
+        start = time.perf_counter()
+        for query in queries:
+            classifier.predict([query])
+        single_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        classifier.predict(queries)
+        batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        print(f"单条推理: {single_us:.1f}us/条  批量推理(批大小{len(queries)}): {batch_us:.1f}us/条")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
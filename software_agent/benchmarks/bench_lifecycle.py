@@ -0,0 +1,60 @@
+"""
+对比每个请求重新构建依赖与使用应用级单例的开销
+
+运行方式(在software_agent目录下):
+    python -m benchmarks.bench_lifecycle --iterations 2000
+"""
+import argparse
+import time
+
+from ai_agent.agent.llm_processor import LLMProcessor
+from ai_agent.agent.intent_parser import IntentParser
+from ai_agent.agent.tool_manager import ToolManager
+from ai_agent.api.api_client import APIClient
+from ai_agent.web.services import AgentServices
+
+
+def build_per_request():
+    """旧实现：每个请求构建一整套依赖"""
+    api_client = APIClient()
+    intent_parser = IntentParser(LLMProcessor())
+    tool_manager = ToolManager(api_client)
+    return intent_parser, tool_manager, api_client
+
+
+def bench(name: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    per_request_us = elapsed / iterations * 1e6
+    print(f"{name:<24} {per_request_us:>10.1f} us/请求  (共{iterations}次, {elapsed:.3f}s)")
+    return per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="依赖构建开销基准测试")
+    parser.add_argument("--iterations", type=int, default=2000, help="迭代次数")
+    args = parser.parse_args()
+
+    def per_request():
+        _, _, api_client = build_per_request()
+        api_client.close()
+
+    services = AgentServices()
+    # 不调用startup()以避免预热产生网络请求
+    services.get_tool_manager()
+
+    def singleton():
+        services.get_intent_parser()
+        services.get_tool_manager()
+
+    before = bench("每请求构建", per_request, args.iterations)
+    after = bench("应用级单例", singleton, args.iterations)
+    print(f"每请求节省 {before - after:.1f} us ({before / max(after, 1e-9):.0f}x)")
+
+    services.shutdown()
+
+
+if __name__ == "__main__":
+    main()
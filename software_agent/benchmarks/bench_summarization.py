@@ -0,0 +1,79 @@
+"""
+对比开启/关闭滚动摘要时，每轮请求的提示token数随对话长度的变化
+
+摘要由固定长度的文本模拟，不调用真实LLM，仅衡量上下文规模
+
+运行方式(在software_agent目录下):
+    python -m benchmarks.bench_summarization --turns 200
+"""
+import argparse
+
+from ai_agent.agent.context_builder import ContextBuilder
+from ai_agent.agent.summarizer import ConversationSummarizer
+from ai_agent.storage.conversation_store import InMemoryConversationStore
+
+SYSTEM_PROMPT = "你是一个AI助手，负责将用户的自然语言指令转换为软件API调用。"
+USER_MESSAGE = "请帮我查看项目{index}的文件列表，并导出分析报告"
+ASSISTANT_MESSAGE = "项目{index}共有3个文件: data.csv, model.pkl, report.pdf。分析报告已导出。"
+
+
+class FixedSummaryLLM:
+    """返回固定长度摘要的模拟LLM"""
+
+    def __init__(self, summary_chars: int):
+        self.summary = "摘" * summary_chars
+
+    def complete_text(self, system_prompt: str, prompt: str, max_tokens: int):
+        return {"text": self.summary}
+
+
+def simulate(turns: int, summarize: bool, args) -> list:
+    """模拟一段对话，返回每轮请求的提示token数"""
+    store = InMemoryConversationStore(max_turns=turns * 2 + 10)
+    # 足够大的上下文窗口，使token数只受历史长度影响
+    builder = ContextBuilder(context_window=10 ** 7, max_tokens=1)
+    summarizer = None
+    if summarize:
+        summarizer = ConversationSummarizer(FixedSummaryLLM(args.summary_chars), store,
+                                            trigger_turns=args.trigger_turns, keep_turns=args.keep_turns)
+
+    store.create("bench")
+    prompt_tokens = []
+    for index in range(turns):
+        user_message = USER_MESSAGE.format(index=index)
+        context = store.get_context("bench")
+        _, stats = builder.build(SYSTEM_PROMPT, context, user_message)
+        prompt_tokens.append(stats["prompt_tokens"])
+
+        store.append("bench", {"role": "user", "content": user_message})
+        store.append("bench", {"role": "assistant", "content": ASSISTANT_MESSAGE.format(index=index)})
+        if summarizer is not None:
+            summarizer.maybe_summarize("bench")
+    return prompt_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滚动摘要提示token基准测试")
+    parser.add_argument("--turns", type=int, default=200, help="对话轮数")
+    parser.add_argument("--trigger-turns", type=int, default=20, help="触发压缩的未压缩消息数")
+    parser.add_argument("--keep-turns", type=int, default=6, help="保留不压缩的最近消息数")
+    parser.add_argument("--summary-chars", type=int, default=200, help="模拟摘要的字符数")
+    args = parser.parse_args()
+
+    baseline = simulate(args.turns, False, args)
+    compacted = simulate(args.turns, True, args)
+
+    print(f"{'轮次':>6} {'无摘要':>10} {'滚动摘要':>10}")
+    checkpoints = sorted({1, 10, 25, 50, 100, 200, 500, args.turns} & set(range(1, args.turns + 1)))
+    for turn in checkpoints:
+        print(f"{turn:>6} {baseline[turn - 1]:>10} {compacted[turn - 1]:>10}")
+
+    avg_before = sum(baseline) / len(baseline)
+    avg_after = sum(compacted) / len(compacted)
+    print(f"平均每轮提示token: {avg_before:.0f} -> {avg_after:.0f} "
+          f"(减少{(1 - avg_after / avg_before) * 100:.1f}%)")
+    print(f"最大提示token: {max(baseline)} -> {max(compacted)}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+评估工具检索索引在标注集上的召回率和节省的提示token数
+
+标注集为JSONL文件，每行 {"text": 用户消息, "action": 正确的操作名}；未指定时使用内置样例
+
+运行方式(在software_agent目录下):
+    python -m benchmarks.bench_tool_retrieval --top-k 5
+    python -m benchmarks.bench_tool_retrieval --labels data/tool_labels.jsonl
+"""
+import argparse
+import json
+import time
+
+from ai_agent.agent.intent_parser import INTENT_MAP
+from ai_agent.agent.prompt_builder import render_tool_catalog
+from ai_agent.agent.tool_manager import ToolManager
+from ai_agent.agent.tool_retriever import ToolRetriever
+from ai_agent.utils.tokens import count_tokens
+
+SAMPLES = [
+    ("我要登录系统", "login"),
+    ("退出当前账号", "logout"),
+    ("查看用户12的信息", "get_user"),
+    ("新建一个用户，用户名alice", "create_user"),
+    ("把用户5的邮箱改成a@b.com", "update_user"),
+    ("删除用户7", "delete_user"),
+    ("列出我所有的项目", "list_projects"),
+    ("查看所有项目", "list_projects"),
+    ("项目42的详细信息", "get_project"),
+    ("创建一个叫销售预测的项目", "create_project"),
+    ("更新项目3的描述", "update_project"),
+    ("删掉项目9", "delete_project"),
+    ("看看项目42里有哪些文件", "list_files"),
+    ("上传文件data.csv到项目1", "upload_file"),
+    ("下载文件15", "download_file"),
+    ("删除文件8", "delete_file"),
+    ("对项目2运行预测分析", "run_analysis"),
+    ("分析3的结果出来了吗", "get_analysis_result"),
+    ("导出分析报告", "export_report"),
+    ("把分析5导出成报告", "export_report"),
+    ("系统状态怎么样", "get_system_status"),
+    ("查看系统状态", "get_system_status"),
+    ("获取上个月的使用统计", "get_usage_statistics"),
+    ("使用情况统计", "get_usage_statistics"),
+]
+
+
+def load_labels(path: str) -> list:
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record["text"], record["action"]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具检索召回率基准测试")
+    parser.add_argument("--labels", default="", help="标注集JSONL文件路径")
+    parser.add_argument("--top-k", type=int, default=5, help="每条消息检索的工具数")
+    args = parser.parse_args()
+
+    samples = load_labels(args.labels) if args.labels else SAMPLES
+    tools = ToolManager().tools
+
+    start = time.perf_counter()
+    retriever = ToolRetriever(tools, INTENT_MAP, top_k=args.top_k)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"工具数: {len(tools)}  样本数: {len(samples)}  索引构建: {build_ms:.2f}ms")
+
+    print(f"{'k':>4} {'召回率':>8} {'回退率':>8}")
+    for k in sorted({1, 3, args.top_k, len(tools)}):
+        result = retriever.evaluate(samples, k)
+        print(f"{k:>4} {result['recall']:>8.1%} {result['fallback_rate']:>8.1%}")
+
+    result = retriever.evaluate(samples)
+    for query in result["misses"]:
+        print(f"未召回: {query}")
+    for query in result["fallbacks"]:
+        print(f"无匹配回退: {query}")
+
+    start = time.perf_counter()
+    for query, _ in samples:
+        retriever.retrieve(query)
+    query_us = (time.perf_counter() - start) / len(samples) * 1e6
+
+    stats = retriever.stats()
+    full = count_tokens(render_tool_catalog(tools))
+    print(f"完整工具目录: {full} tokens，平均每条消息节省 {stats['avg_tokens_saved']:.0f} tokens "
+          f"({stats['avg_tokens_saved'] / full:.0%})，无匹配回退 {stats['fallbacks']} 次")
+    print(f"平均检索耗时: {query_us:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+from ai_agent.api.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, is_failure_status
+)
+
+
+class FakeClock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("ai_agent.api.circuit_breaker.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("backend:projects", window_seconds=30, min_calls=4, error_rate_threshold=0.5,
+                                      slow_call_seconds=5, slow_call_rate_threshold=0.75, open_seconds=10,
+                                      half_open_calls=2)
+
+    def record(self, *results, latency=0.1):
+        for success in results:
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_result(success, latency)
+
+    def open_breaker(self):
+        self.record(False, False, True, True)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failure_status_classification(self):
+        for status_code in (None, 500, 503, 429):
+            self.assertTrue(is_failure_status(status_code), status_code)
+        for status_code in (200, 400, 404):
+            self.assertFalse(is_failure_status(status_code), status_code)
+
+    def test_stays_closed_below_min_calls(self):
+        self.record(False, False, False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_opens_on_error_rate_and_fails_fast(self):
+        self.open_breaker()
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.check()
+        self.assertEqual(raised.exception.retry_after, 10)
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_opens_on_slow_calls(self):
+        self.record(True, True, True, latency=6)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.record(True, latency=6)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failures_outside_window_are_forgotten(self):
+        self.record(False, False)
+        self.clock.now += 31
+        self.record(True, True, False)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()["window_calls"], 3)
+
+    def test_half_open_limits_probes_then_closes(self):
+        self.open_breaker()
+        self.clock.now += 10
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_result(True, 0.1)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record_result(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()["window_calls"], 0)
+
+    def test_failed_probe_reopens(self):
+        self.open_breaker()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.record_result(False, 0.1)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()["times_opened"], 2)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_cancelled_probe_frees_its_slot(self):
+        self.open_breaker()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.record_cancelled()
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_results_recorded_while_open_are_ignored(self):
+        self.open_breaker()
+        self.breaker.record_result(True, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+class CircuitBreakerRegistryTest(unittest.TestCase):
+
+    config = {"enabled": True, "window_seconds": 30, "min_calls": 10, "error_rate": 0.5, "slow_call_seconds": 10,
+              "slow_call_rate": 0.8, "open_seconds": 30, "half_open_calls": 3}
+
+    def test_disabled_registry_returns_none(self):
+        self.assertIsNone(CircuitBreakerRegistry(dict(self.config, enabled=False)).get("llm:openai"))
+
+    def test_breakers_are_shared_per_name(self):
+        registry = CircuitBreakerRegistry(self.config)
+        breaker = registry.get("llm:openai")
+        self.assertIs(registry.get("llm:openai"), breaker)
+        self.assertIsNot(registry.get("backend:projects"), breaker)
+        self.assertEqual(list(registry.snapshot()), ["backend:projects", "llm:openai"])
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
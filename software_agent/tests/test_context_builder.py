@@ -0,0 +1,74 @@
+import unittest
+
+from ai_agent.agent.context_builder import ContextBuilder
+from ai_agent.utils.tokens import MESSAGE_OVERHEAD, message_tokens
+
+
+def turn(role, content, tokens=20, **extra):
+    """带缓存token数的历史消息，计数与是否安装tiktoken无关"""
+    return dict(role=role, content=content, tokens=tokens, **extra)
+
+
+class ContextBuilderTest(unittest.TestCase):
+
+    def setUp(self):
+        # 系统提示和当前输入为空时固定开销为两条消息的格式开销，历史预算 = 100 - 20 - 8 = 72，即3条20 token的消息
+        self.builder = ContextBuilder(context_window=100, max_tokens=20)
+
+    def test_cached_token_count_is_used(self):
+        self.assertEqual(message_tokens(turn("user", "很长的内容" * 100, tokens=3)), 3 + MESSAGE_OVERHEAD)
+
+    def test_keeps_most_recent_turns_within_budget(self):
+        context = [turn("user", f"m{i}", seq=i) for i in range(5)]
+
+        history, stats = self.builder.build("", context, "")
+
+        self.assertEqual(history, [{"role": "user", "content": "m2"}, {"role": "user", "content": "m3"},
+                                   {"role": "user", "content": "m4"}])
+        self.assertEqual(stats["budget"], 72)
+        self.assertEqual((stats["history_tokens"], stats["prompt_tokens"]), (72, 80))
+        self.assertEqual((stats["sent_turns"], stats["dropped_turns"], stats["dropped_tokens"]), (3, 2, 48))
+
+    def test_nothing_dropped_when_history_fits(self):
+        history, stats = self.builder.build("", [turn("user", "a"), turn("assistant", "b")], "")
+        self.assertEqual(len(history), 2)
+        self.assertEqual((stats["dropped_turns"], stats["dropped_tokens"]), (0, 0))
+        self.assertEqual(self.builder.stats()["truncated_requests"], 0)
+
+    def test_history_stays_contiguous(self):
+        # 放不下的较大消息之前的小消息也不发送，避免历史出现空洞
+        context = [turn("user", "old", tokens=1), turn("assistant", "big", tokens=60), turn("user", "new")]
+        history, stats = self.builder.build("", context, "")
+        self.assertEqual([msg["content"] for msg in history], ["new"])
+        self.assertEqual(stats["dropped_turns"], 2)
+
+    def test_pinned_messages_are_first_and_reduce_budget(self):
+        context = [turn("user", f"m{i}") for i in range(3)] + [turn("system", "摘要", tokens=20, pinned=True)]
+
+        history, stats = self.builder.build("", context, "")
+
+        self.assertEqual([msg["content"] for msg in history], ["摘要", "m1", "m2"])
+        self.assertEqual((stats["budget"], stats["pinned_tokens"], stats["dropped_turns"]), (48, 24, 1))
+
+    def test_start_with_user_drops_leading_assistant_turn(self):
+        context = [turn("user", "q1"), turn("assistant", "a1"), turn("user", "q2"), turn("assistant", "a2")]
+
+        history, stats = self.builder.build("", context, "", start_with_user=True)
+
+        self.assertEqual([msg["content"] for msg in history], ["q2", "a2"])
+        self.assertEqual((stats["history_tokens"], stats["dropped_turns"]), (48, 2))
+
+    def test_budget_never_negative(self):
+        history, stats = self.builder.build("", [turn("user", "a")], "x" * 1000)
+        self.assertEqual((history, stats["budget"]), ([], 0))
+
+    def test_stats_accumulate_across_requests(self):
+        self.builder.build("", [turn("user", f"m{i}") for i in range(4)], "")
+        self.builder.build("", [], "")
+        stats = self.builder.stats()
+        self.assertEqual((stats["requests"], stats["truncated_requests"], stats["tokens_dropped"]), (2, 1, 24))
+        self.assertEqual(stats["tokens_sent"], 80 + 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from ai_agent.agent.entity_index import EntityIndex
+
+
+class FakeClock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class EntityIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("ai_agent.agent.entity_index.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = EntityIndex(ttl=60, max_entities=3)
+        self.index.observe("t1", "list_projects", {}, {"projects": [{"id": 1, "name": "营销分析"},
+                                                                     {"id": 2, "name": "财务报表"}]})
+
+    def test_full_and_fuzzy_name_lookup(self):
+        self.assertEqual(self.index.resolve_slot("t1", "project_id", "为营销分析项目上传文件", {}), "1")
+        self.assertEqual(self.index.resolve_slot("t1", "project_id", "列出财务报表的文件", {}), "2")
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "列出所有项目", {}))
+
+    def test_tenants_are_isolated(self):
+        self.assertIsNone(self.index.resolve_slot("t2", "project_id", "营销分析", {}))
+
+    def test_expired_entries_are_not_returned(self):
+        self.clock.now += 61
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "营销分析", {}))
+        self.assertEqual(self.index.stats()["expired"], 1)
+
+    def test_insert_sweeps_expired_entries(self):
+        self.clock.now += 61
+        self.index.add("t1", "project", 3, "客户画像")
+        self.assertEqual(self.index.stats()["entities"], 1)
+        self.assertEqual(self.index.stats()["expired"], 2)
+
+    def test_delete_project_invalidates_its_files(self):
+        self.index.observe("t1", "list_files", {"project_id": "1"}, [{"id": 10, "name": "销售数据.csv"}])
+        self.assertEqual(self.index.resolve_slot("t1", "file_id", "删除销售数据.csv", {"project_id": "1"}), "10")
+
+        self.index.observe("t1", "delete_project", {"project_id": "1"}, {"ok": True})
+
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "营销分析", {}))
+        self.assertIsNone(self.index.resolve_slot("t1", "file_id", "删除销售数据.csv", {}))
+        self.assertEqual(self.index.stats()["invalidations"], 2)
+
+    def test_update_project_replaces_old_name(self):
+        self.index.observe("t1", "update_project", {"project_id": "1", "name": "品牌分析"}, {"ok": True})
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "营销分析", {}))
+        self.assertEqual(self.index.resolve_slot("t1", "project_id", "品牌分析", {}), "1")
+
+    def test_cap_evicts_least_recently_used(self):
+        self.index.resolve_slot("t1", "project_id", "营销分析", {})
+        self.index.add("t1", "project", 3, "客户画像")
+        self.index.add("t1", "project", 4, "库存预测")
+
+        self.assertEqual(self.index.stats()["entities"], 3)
+        self.assertEqual(self.index.stats()["evicted"], 1)
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "财务报表", {}))
+        self.assertEqual(self.index.resolve_slot("t1", "project_id", "营销分析", {}), "1")
+
+    def test_ambiguous_names_are_not_resolved(self):
+        self.index.add("t1", "project", 5, "营销分析")
+        self.assertIsNone(self.index.resolve_slot("t1", "project_id", "营销分析", {}))
+        self.assertEqual(self.index.stats()["ambiguous"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
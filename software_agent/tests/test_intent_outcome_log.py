@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from ai_agent.agent.intent_classifier import IntentOutcomeLog, read_outcome_log
+
+
+class IntentOutcomeLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "logs", "outcomes.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_are_written_in_order_by_background_writer(self):
+        log = IntentOutcomeLog(self.path, flush_interval=10.0)
+        for index in range(3):
+            log.record(f"查看项目{index}", "get_project", 0.9, "strong")
+        log.flush()
+
+        self.assertEqual(read_outcome_log(self.path), (["查看项目0", "查看项目1", "查看项目2"], ["get_project"] * 3))
+        self.assertEqual(log.batches, 1)
+        log.close()
+
+    def test_close_drains_queue_and_ignores_later_records(self):
+        log = IntentOutcomeLog(self.path, flush_interval=10.0)
+        log.record("列出所有项目", "list_projects", 0.95)
+        log.close()
+        log.record("查看系统状态", "get_system_status", 0.95)
+
+        self.assertEqual(read_outcome_log(self.path), (["列出所有项目"], ["list_projects"]))
+        self.assertEqual(log.records, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
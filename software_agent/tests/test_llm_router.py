@@ -0,0 +1,128 @@
+import asyncio
+import unittest
+
+from ai_agent.agent.llm_router import LatencyWindow, LLMRouter
+
+
+class FakeProcessor:
+    """按预设返回结果的LLMProcessor替身；block=True时异步调用一直等待，直到被取消"""
+
+    def __init__(self, model, result=None, block=False, stream=None):
+        self.provider = "fake"
+        self.model = model
+        self.result = result or {"action": model, "parameters": {}}
+        self.block = block
+        self.stream = stream
+        self.calls = 0
+        self.cancelled = False
+
+    def process_input(self, user_input, context=None):
+        self.calls += 1
+        return self.result
+
+    async def process_input_async(self, user_input, context=None):
+        self.calls += 1
+        if self.block:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return self.result
+
+    async def stream_input_async(self, user_input, context=None):
+        self.calls += 1
+        for event in self.stream or [{"type": "intent", "result": self.result}]:
+            yield event
+
+
+def make_router(*processors, **kwargs):
+    options = dict(hedge_default_delay=0.01, hedge_max_ratio=1.0)
+    options.update(kwargs)
+    return LLMRouter(list(processors), **options)
+
+
+class LLMRouterTest(unittest.TestCase):
+
+    def test_sync_call_fails_over_on_error(self):
+        primary = FakeProcessor("a", result={"error": "超时"})
+        secondary = FakeProcessor("b")
+        router = make_router(primary, secondary)
+
+        self.assertEqual(router.process_input("列出项目")["action"], "b")
+        stats = router.stats()
+        self.assertEqual(stats["failovers"], 1)
+        self.assertEqual([p["errors"] for p in stats["providers"]], [1, 0])
+        self.assertEqual(stats["hedges"], 0)
+
+    def test_fast_primary_is_not_hedged(self):
+        primary = FakeProcessor("a")
+        secondary = FakeProcessor("b")
+        router = make_router(primary, secondary, hedge_default_delay=60)
+
+        self.assertEqual(asyncio.run(router.process_input_async("列出项目"))["action"], "a")
+        self.assertEqual(secondary.calls, 0)
+        self.assertEqual(router.stats()["hedges"], 0)
+
+    def test_slow_primary_is_hedged_and_loser_cancelled(self):
+        primary = FakeProcessor("a", block=True)
+        secondary = FakeProcessor("b")
+        router = make_router(primary, secondary)
+
+        self.assertEqual(asyncio.run(router.process_input_async("列出项目"))["action"], "b")
+        self.assertTrue(primary.cancelled)
+        stats = router.stats()
+        self.assertEqual((stats["hedges"], stats["hedge_wins"], stats["failovers"]), (1, 1, 0))
+
+    def test_hedge_ratio_cap_waits_for_primary(self):
+        primary = FakeProcessor("a")
+        secondary = FakeProcessor("b")
+        router = make_router(primary, secondary, hedge_default_delay=0.0, hedge_max_ratio=0.0)
+
+        self.assertEqual(asyncio.run(router.process_input_async("列出项目"))["action"], "a")
+        self.assertEqual(secondary.calls, 0)
+
+    def test_async_error_fails_over_to_next_provider(self):
+        primary = FakeProcessor("a", result={"error": "连接失败"})
+        secondary = FakeProcessor("b")
+        router = make_router(primary, secondary, hedge_default_delay=60)
+
+        self.assertEqual(asyncio.run(router.process_input_async("列出项目"))["action"], "b")
+        self.assertEqual(router.stats()["failovers"], 1)
+
+    def test_all_providers_failing_returns_last_error(self):
+        router = make_router(FakeProcessor("a", result={"error": "e1"}), FakeProcessor("b", result={"error": "e2"}))
+        self.assertEqual(asyncio.run(router.process_input_async("列出项目"))["error"], "e2")
+        self.assertEqual(router.process_input("列出项目")["error"], "e2")
+
+    def test_stream_fails_over_only_before_output(self):
+        error_event = {"type": "intent", "result": {"error": "e1"}}
+        secondary = FakeProcessor("b")
+
+        async def collect(router):
+            return [event async for event in router.stream_input_async("列出项目")]
+
+        events = asyncio.run(collect(make_router(FakeProcessor("a", stream=[error_event]), secondary)))
+        self.assertEqual(events[-1]["result"]["action"], "b")
+
+        started = FakeProcessor("a", stream=[{"type": "token", "text": "{"}, error_event])
+        events = asyncio.run(collect(make_router(started, secondary)))
+        self.assertEqual(events[-1]["result"]["error"], "e1")
+        self.assertEqual(secondary.calls, 1)
+
+    def test_hedge_delay_uses_rolling_percentile(self):
+        router = make_router(FakeProcessor("a"), FakeProcessor("b"), hedge_default_delay=3.0, hedge_min_delay=0.2,
+                             min_samples=10)
+        self.assertEqual(router.hedge_delay(), 3.0)
+        for index in range(20):
+            router._latencies[0].add(0.05 * (index + 1))
+        self.assertAlmostEqual(router.hedge_delay(), 1.0)
+
+        router._latencies[0] = LatencyWindow()
+        for _ in range(10):
+            router._latencies[0].add(0.01)
+        self.assertEqual(router.hedge_delay(), 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
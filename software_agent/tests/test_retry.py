@@ -0,0 +1,161 @@
+import asyncio
+import http.client
+import unittest
+
+import httpx
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from ai_agent.api.retry import RetryBudget, RetryPolicy, parse_retry_after
+
+
+class FakeResponse:
+
+    def __init__(self, status_code: int, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+def refused() -> requests.exceptions.ConnectionError:
+    """建立连接失败(请求未发出)时requests抛出的异常"""
+    reason = NewConnectionError(None, "Failed to establish a new connection: [Errno 111] Connection refused")
+    return requests.exceptions.ConnectionError(MaxRetryError(None, "/projects", reason))
+
+
+def aborted() -> requests.exceptions.ConnectionError:
+    """请求发出后连接被中断时requests抛出的异常"""
+    cause = ProtocolError("Connection aborted.", http.client.RemoteDisconnected("closed"))
+    return requests.exceptions.ConnectionError(cause)
+
+
+class Sequence:
+    """依次返回响应或抛出异常的send函数"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def send_async(self):
+        return self()
+
+
+def make_policy(max_attempts: int = 3, budget: RetryBudget = None) -> RetryPolicy:
+    return RetryPolicy("test", max_attempts=max_attempts, base_delay=0.0, max_delay=1.0,
+                       budget=budget or RetryBudget(max_tokens=100))
+
+
+class ClassifyErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = make_policy()
+
+    def test_failed_connection_is_retryable_for_any_method(self):
+        for error in (refused(), requests.exceptions.ConnectTimeout(), httpx.ConnectError("refused")):
+            self.assertEqual(self.policy.classify_error(error, idempotent=False), "connect_error", error)
+
+    def test_aborted_connection_is_retried_only_for_idempotent_calls(self):
+        self.assertIsNone(self.policy.classify_error(aborted(), idempotent=False))
+        self.assertEqual(self.policy.classify_error(aborted(), idempotent=True), "transient_error")
+        self.assertIsNone(self.policy.classify_error(requests.exceptions.ConnectionError(), idempotent=False))
+
+    def test_read_timeout_is_retried_only_for_idempotent_calls(self):
+        self.assertIsNone(self.policy.classify_error(requests.exceptions.ReadTimeout(), idempotent=False))
+        self.assertEqual(self.policy.classify_error(httpx.ReadTimeout("slow"), idempotent=True), "timeout")
+
+    def test_programming_errors_are_not_retried(self):
+        self.assertIsNone(self.policy.classify_error(ValueError("bad"), idempotent=True))
+
+    def test_status_codes(self):
+        self.assertEqual(self.policy.classify_status(429, idempotent=False), "status_429")
+        self.assertIsNone(self.policy.classify_status(503, idempotent=False))
+        self.assertEqual(self.policy.classify_status(503, idempotent=True), "status_503")
+        self.assertIsNone(self.policy.classify_status(500, idempotent=True))
+
+
+class RetryCallTest(unittest.TestCase):
+
+    def test_post_is_not_resent_after_connection_aborted(self):
+        policy = make_policy()
+        send = Sequence(aborted(), FakeResponse(201))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            policy.call(send, "POST")
+        self.assertEqual(send.calls, 1)
+        self.assertEqual(policy.stats()["retries"], 0)
+
+    def test_post_is_retried_when_connection_was_refused(self):
+        policy = make_policy()
+        send = Sequence(refused(), FakeResponse(201))
+        self.assertEqual(policy.call(send, "POST").status_code, 201)
+        self.assertEqual(send.calls, 2)
+
+    def test_get_is_retried_until_success(self):
+        policy = make_policy()
+        send = Sequence(aborted(), FakeResponse(503), FakeResponse(200))
+        self.assertEqual(policy.call(send, "GET").status_code, 200)
+        self.assertEqual(policy.stats()["retries"], 2)
+
+    def test_gives_up_after_max_attempts(self):
+        policy = make_policy(max_attempts=2)
+        send = Sequence(FakeResponse(503), FakeResponse(503), FakeResponse(503))
+        self.assertEqual(policy.call(send, "GET").status_code, 503)
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(policy.stats()["gave_up"], 1)
+
+    def test_retry_after_beyond_max_delay_is_not_waited_for(self):
+        policy = make_policy()
+        send = Sequence(FakeResponse(429, {"Retry-After": "120"}), FakeResponse(200))
+        self.assertEqual(policy.call(send, "POST").status_code, 429)
+        self.assertEqual(send.calls, 1)
+
+    def test_async_call_follows_the_same_rules(self):
+        policy = make_policy()
+        send = Sequence(httpx.RemoteProtocolError("closed"), FakeResponse(200))
+        with self.assertRaises(httpx.RemoteProtocolError):
+            asyncio.run(policy.call_async(send.send_async, "POST"))
+        send = Sequence(httpx.RemoteProtocolError("closed"), FakeResponse(200))
+        self.assertEqual(asyncio.run(policy.call_async(send.send_async, "PUT")).status_code, 200)
+
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_exhausted_budget_stops_retries(self):
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=1.0)
+        policy = make_policy(budget=budget)
+        send = Sequence(FakeResponse(503), FakeResponse(503), FakeResponse(200))
+        self.assertEqual(policy.call(send, "GET").status_code, 503)
+        self.assertEqual(send.calls, 2)
+        self.assertEqual(budget.stats()["exhausted"], 1)
+
+    def test_requests_refill_the_budget(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=1.0)
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        budget.record_request()
+        budget.record_request()
+        self.assertTrue(budget.try_acquire())
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+
+    def test_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
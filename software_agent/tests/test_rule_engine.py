@@ -0,0 +1,23 @@
+import unittest
+
+from ai_agent.agent.rule_engine import RuleEngine
+
+
+class UsageStatisticsRuleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = RuleEngine()
+
+    def test_query_with_action_verb_matches(self):
+        result = self.engine.match("获取2024-01-01到2024-01-31的使用统计")
+        self.assertEqual(result["action"], "get_usage_statistics")
+        self.assertEqual(result["parameters"], {"start_date": "2024-01-01", "end_date": "2024-01-31"})
+        self.assertEqual(self.engine.match("查看项目12的使用统计数据")["parameters"], {"project_id": "12"})
+
+    def test_mentions_without_query_do_not_match(self):
+        for message in ["使用统计是什么", "如何关闭使用统计", "我想了解使用统计的口径", "查看使用统计为什么不准?"]:
+            self.assertIsNone(self.engine.match(message), message)
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
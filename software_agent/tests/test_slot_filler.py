@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from datetime import date
+
+from ai_agent.agent.slot_extractors import extract_relative_range, extract_slot, parse_cn_number
+from ai_agent.agent.slot_filler import SlotFiller
+from ai_agent.agent.tool_manager import ToolManager
+
+
+class RecordingClient:
+    """记录调用的异步API客户端"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def _call(self, method, endpoint):
+        self.calls.append((method, endpoint))
+        return {"ok": True}
+
+    async def get_async(self, endpoint, params=None, headers=None):
+        return await self._call("GET", endpoint)
+
+    async def delete_async(self, endpoint, params=None, headers=None):
+        return await self._call("DELETE", endpoint)
+
+    async def put_async(self, endpoint, data, params=None, headers=None):
+        return await self._call("PUT", endpoint)
+
+
+class SlotFillerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = ToolManager(api_client=RecordingClient()).tools
+        self.filler = SlotFiller(context_turns=4)
+        self.context = [{"role": "user", "content": "查看项目7的详情"},
+                        {"role": "assistant", "content": "项目7: 营销分析"}]
+
+    def test_read_only_tool_uses_memory_then_context(self):
+        params, sources = self.filler.fill(self.tools["list_files"], {}, "列出文件", self.context, {"project_id": "5"})
+        self.assertEqual((params, sources), ({"project_id": "5"}, {"project_id": "memory"}))
+
+        params, sources = self.filler.fill(self.tools["list_files"], {}, "列出文件", self.context)
+        self.assertEqual((params, sources), ({"project_id": "7"}, {"project_id": "context"}))
+
+    def test_current_message_wins_over_memory(self):
+        params, sources = self.filler.fill(self.tools["get_project"], {}, "查看项目12", self.context,
+                                           {"project_id": "5"})
+        self.assertEqual((params, sources), ({"project_id": "12"}, {"project_id": "message"}))
+
+    def test_side_effecting_tool_fills_only_from_current_message(self):
+        for action in ("delete_project", "update_project"):
+            params, sources = self.filler.fill(self.tools[action], {}, "删除项目", self.context, {"project_id": "5"})
+            self.assertEqual((params, sources), ({}, {}), action)
+
+        params, sources = self.filler.fill(self.tools["delete_project"], {}, "删除项目9", self.context,
+                                           {"project_id": "5"})
+        self.assertEqual((params, sources), ({"project_id": "9"}, {"project_id": "message"}))
+
+    def test_delete_without_id_asks_instead_of_using_earlier_turns(self):
+        client = RecordingClient()
+        tool_manager = ToolManager(api_client=client)
+
+        result = asyncio.run(tool_manager.execute_tool_async(
+            "delete_project", {}, message="删除项目", context=self.context, memory={"project_id": "5"}))
+
+        self.assertFalse(result["success"])
+        self.assertIn("缺少必需参数", result["error"])
+        self.assertEqual(client.calls, [])
+
+
+class SlotExtractorTest(unittest.TestCase):
+
+    def test_entity_ids(self):
+        self.assertEqual(extract_slot("project_id", "获取项目ID为123的详情"), "123")
+        self.assertEqual(extract_slot("file_id", "删除 file #45"), "45")
+        self.assertIsNone(extract_slot("project_id", "列出所有项目"))
+
+    def test_dates_and_relative_ranges(self):
+        self.assertEqual(extract_slot("start_date", "从2024年1月5日到2024/02/01"), "2024-01-05")
+        self.assertEqual(extract_slot("end_date", "从2024年1月5日到2024/02/01"), "2024-02-01")
+        today = date(2024, 3, 31)
+        self.assertEqual(extract_relative_range("上个月", today), ("2024-02-01", "2024-02-29"))
+        self.assertEqual(extract_relative_range("最近一个月", today), ("2024-02-29", "2024-03-31"))
+        self.assertEqual(extract_relative_range("最近七天", today), ("2024-03-24", "2024-03-31"))
+        self.assertEqual(extract_relative_range("3天前", today), ("2024-03-28", "2024-03-28"))
+        self.assertEqual(extract_relative_range("上周", today), ("2024-03-18", "2024-03-24"))
+        self.assertIsNone(extract_relative_range("随便看看", today))
+
+    def test_chinese_numbers(self):
+        self.assertEqual([parse_cn_number(text) for text in ("3", "七", "十", "十五", "二十", "两")], [3, 7, 10, 15, 20, 2])
+
+    def test_files_email_and_analysis_type(self):
+        self.assertEqual(extract_slot("file_name", "上传《销售数据.xlsx》"), "销售数据.xlsx")
+        self.assertEqual(extract_slot("file_name", "上传文件data.csv到项目1"), "data.csv")
+        self.assertEqual(extract_slot("file_type", "上传Report.PDF"), "pdf")
+        self.assertEqual(extract_slot("email", "发送到 a.b@example.com 吧"), "a.b@example.com")
+        self.assertEqual(extract_slot("analysis_type", "做一个预测分析"), "predictive")
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
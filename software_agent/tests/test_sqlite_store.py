@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from ai_agent.storage.sqlite_store import SQLiteConversationStore
+
+
+class SQLiteConversationStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, "conversations.db")
+        # 较长的合并间隔使写入停留在待写入缓冲中，直到显式flush
+        self.store = self.open_store()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def open_store(self) -> SQLiteConversationStore:
+        return SQLiteConversationStore(self.db_path, flush_interval=10.0, batch_size=1000)
+
+    def append_turns(self, conversation_id: str, *contents: str):
+        for content in contents:
+            self.store.append(conversation_id, {"role": "user", "content": content})
+
+    def seqs(self, page):
+        return [turn["seq"] for turn in page["history"]]
+
+    def test_flush_preserves_append_order_across_conversations(self):
+        self.append_turns("a", "a1")
+        self.append_turns("b", "b1")
+        self.append_turns("a", "a2", "a3")
+        self.store.flush()
+        self.append_turns("a", "a4")
+        self.append_turns("b", "b2")
+        self.store.close()
+
+        self.store = self.open_store()
+        page = self.store.get_page("a")
+        self.assertEqual([turn["content"] for turn in page["history"]], ["a1", "a2", "a3", "a4"])
+        self.assertEqual(self.seqs(page), [1, 2, 3, 4])
+        self.assertEqual(self.seqs(self.store.get_page("b")), [1, 2])
+
+    def test_page_merges_pending_turns_without_waiting_for_writer(self):
+        self.append_turns("c", "m1", "m2", "m3")
+        self.store.flush()
+        self.append_turns("c", "m4", "m5")
+        self.assertEqual(self.store.stats()["pending_turns"], 2)
+
+        first = self.store.get_page("c", limit=3)
+        self.assertEqual(self.seqs(first), [3, 4, 5])
+        self.assertEqual(first["next_before_seq"], 3)
+        second = self.store.get_page("c", limit=3, before_seq=first["next_before_seq"])
+        self.assertEqual(self.seqs(second), [1, 2])
+        self.assertIsNone(second["next_before_seq"])
+        self.assertEqual(self.store.stats()["pending_turns"], 2)
+
+        # 落盘后序号与推算的一致
+        self.store.flush()
+        self.assertEqual(self.store.get_page("c", limit=3), first)
+
+    def test_page_with_only_pending_turns(self):
+        self.append_turns("d", "x1", "x2", "x3")
+        page = self.store.get_page("d", limit=2)
+        self.assertEqual(self.seqs(page), [2, 3])
+        self.assertEqual(page["next_before_seq"], 2)
+
+    def test_turns_committed_but_not_yet_released_are_not_duplicated(self):
+        self.append_turns("w", "c1", "c2")
+        pending = self.store._pending["w"]
+
+        # 模拟后台线程已在写入事务中确定序号、但尚未提交
+        with self.store._lock:
+            self.store._mark_pending({id(turn.message): seq for seq, turn in enumerate(pending, 1)})
+        self.assertEqual(self.seqs(self.store.get_page("w")), [1, 2])
+
+        # 模拟已提交、尚未移出待写入缓冲
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.executemany("INSERT INTO turns (conversation_id, seq, role, content, tokens, created_at) "
+                         "VALUES ('w', ?, 'user', ?, 1, ?)", [(1, "c1", time.time()), (2, "c2", time.time())])
+        conn.close()
+        self.assertEqual([turn["content"] for turn in self.store.get_page("w")["history"]], ["c1", "c2"])
+        self.assertEqual([turn["content"] for turn in self.store.get_history("w")], ["c1", "c2"])
+        self.assertEqual([turn["seq"] for turn in self.store.get_range("w")], [1, 2])
+
+    def test_range_spans_persisted_and_pending_turns(self):
+        self.append_turns("e", "r1", "r2", "r3")
+        self.store.flush()
+        self.append_turns("e", "r4", "r5")
+
+        turns = self.store.get_range("e", after_seq=2, limit=2)
+        self.assertEqual([(turn["seq"], turn["content"]) for turn in turns], [(3, "r3"), (4, "r4")])
+        self.assertEqual([turn["seq"] for turn in self.store.get_range("e", after_seq=3)], [4, 5])
+        self.assertIsNone(self.store.get_range("missing"))
+
+    def test_history_includes_pending_turns_after_summary(self):
+        self.append_turns("f", "h1", "h2")
+        self.store.flush()
+        self.append_turns("f", "h3", "h4")
+
+        history = self.store.get_history("f", after_seq=1)
+        self.assertEqual([turn["content"] for turn in history], ["h2", "h3", "h4"])
+        # 摘要覆盖到尚未落盘的消息时，after_seq同样作用于待写入消息
+        self.assertEqual([turn["content"] for turn in self.store.get_history("f", after_seq=3)], ["h4"])
+
+    def test_delete_removes_pending_and_persisted_turns(self):
+        self.append_turns("g", "d1")
+        self.store.flush()
+        self.append_turns("g", "d2")
+
+        self.assertTrue(self.store.delete("g"))
+        self.assertFalse(self.store.exists("g"))
+        self.assertIsNone(self.store.get_page("g"))
+        self.assertFalse(self.store.delete("g"))
+
+        self.store.close()
+        self.store = self.open_store()
+        self.assertFalse(self.store.exists("g"))
+
+    def test_slots_are_written_behind_and_readable_before_flush(self):
+        self.store.set_slots("s", {"project_id": "1"})
+        self.store.set_slots("s", {"project_id": "2", "file_id": "9"})
+        self.assertEqual(self.store.get_slots("s"), {"project_id": "2", "file_id": "9"})
+
+        self.store.flush()
+        self.store.set_slots("s", {"project_id": "3"})
+        self.assertEqual(self.store.get_slots("s"), {"project_id": "3"})
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.get_slots("s"), {"project_id": "3"})
+
+    def test_summary_is_written_behind_and_used_by_context(self):
+        self.append_turns("t", "s1", "s2", "s3")
+        self.store.flush()
+        self.store.set_summary("t", "前两轮的摘要", through_seq=2)
+
+        self.assertEqual(self.store.get_summary("t")["through_seq"], 2)
+        context = self.store.get_context("t")
+        self.assertIn("前两轮的摘要", context[0]["content"])
+        self.assertEqual([message["content"] for message in context[1:]], ["s3"])
+        self.store.close()
+
+        self.store = self.open_store()
+        self.assertEqual(self.store.get_summary("t")["content"], "前两轮的摘要")
+
+    def test_created_conversation_is_visible_before_flush(self):
+        self.store.create("h")
+        self.assertTrue(self.store.exists("h"))
+        self.assertEqual(self.store.get_page("h"), {"history": [], "next_before_seq": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
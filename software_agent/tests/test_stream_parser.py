@@ -0,0 +1,65 @@
+import json
+import unittest
+
+from ai_agent.agent.stream_parser import IncrementalJSONParser
+
+
+def feed_chars(text):
+    """逐字符喂入，返回解析器和每个字段完成时已读入的字符数"""
+    parser = IncrementalJSONParser()
+    completed_at = {}
+    for index, char in enumerate(text):
+        for key in parser.feed(char):
+            completed_at[key] = index + 1
+    return parser, completed_at
+
+
+class IncrementalJSONParserTest(unittest.TestCase):
+
+    def test_fields_available_before_object_finishes(self):
+        parser = IncrementalJSONParser()
+        new_fields = parser.feed('```json\n{"action": "list_files", "parameters": {"project_id": "12"}, "clar')
+        self.assertEqual(new_fields, {"action": "list_files", "parameters": {"project_id": "12"}})
+        self.assertFalse(parser.completed)
+
+        self.assertEqual(parser.feed('ification_questions": []}\n```'), {"clarification_questions": []})
+        self.assertTrue(parser.completed)
+
+    def test_escaped_quotes_and_backslashes(self):
+        text = r'{"a\"b": "say \"hi\" {not a brace}", "path": "C:\\dir\\", "n": 1}'
+        parser, _ = feed_chars(text)
+        self.assertEqual(parser.fields, json.loads(text))
+
+    def test_nested_containers(self):
+        text = '{"parameters": {"filters": [{"k": "}"}, [1, [2]]], "x": {"y": {}}}, "steps": [[], {}]}'
+        parser, completed_at = feed_chars(text)
+        self.assertEqual(parser.fields, json.loads(text))
+        # parameters在其右括号到达时即完成，不等待之后的steps
+        self.assertEqual(completed_at["parameters"], text.index(', "steps"'))
+
+    def test_primitive_as_last_field(self):
+        for raw, expected in (("0.85", 0.85), ("-1e3", -1000.0), ("true", True), ("null", None)):
+            text = '{"action": "x", "confidence":  ' + raw + ' \n}'
+            parser, completed_at = feed_chars(text)
+            self.assertEqual(parser.fields["confidence"], expected, raw)
+            self.assertEqual(completed_at["confidence"], len(text), raw)
+            self.assertTrue(parser.completed)
+
+    def test_primitive_completes_at_following_comma(self):
+        text = '{"confidence": 0.9, "action": "x"}'
+        _, completed_at = feed_chars(text)
+        self.assertEqual(completed_at["confidence"], text.index(",") + 1)
+
+    def test_text_after_object_is_ignored(self):
+        parser = IncrementalJSONParser()
+        parser.feed('{"action": "a"} {"action": "b"}')
+        self.assertEqual(parser.fields, {"action": "a"})
+        self.assertTrue(parser.completed)
+
+    def test_invalid_value_is_skipped(self):
+        parser, _ = feed_chars('{"confidence": high, "action": "x"}')
+        self.assertEqual(parser.fields, {"action": "x"})
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import asyncio
+import unittest
+
+from ai_agent.agent.rule_engine import RuleEngine
+from ai_agent.agent.task_plan import build_plan, looks_compound, resolve_references
+from ai_agent.agent.tool_manager import ToolManager
+
+
+class RecordingClient:
+    """记录调用并按固定延迟返回的API客户端"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.events = []
+
+    async def _call(self, method, endpoint, data=None, params=None):
+        self.calls.append((method, endpoint, data or params or {}))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.events.append("start")
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+            self.events.append("end")
+        if method == "POST" and endpoint.endswith("/projects"):
+            return {"id": 99, "name": (data or {}).get("name")}
+        if endpoint.endswith("/projects/404"):
+            return {"error": "项目不存在", "status_code": 404}
+        return {"ok": True, "endpoint": endpoint}
+
+    async def get_async(self, endpoint, params=None, headers=None):
+        return await self._call("GET", endpoint, params=params)
+
+    async def post_async(self, endpoint, data, params=None, headers=None):
+        return await self._call("POST", endpoint, data=data, params=params)
+
+    async def delete_async(self, endpoint, params=None, headers=None):
+        return await self._call("DELETE", endpoint, params=params)
+
+
+def run_plan(tool_manager, plan, **kwargs):
+    async def collect():
+        return [event async for event in tool_manager.execute_plan_async(plan, **kwargs)]
+    return asyncio.run(collect())
+
+
+class BuildPlanTest(unittest.TestCase):
+
+    def test_references_add_dependencies(self):
+        plan, error = build_plan([
+            {"id": "s1", "action": "create_project", "parameters": {"name": "a"}},
+            {"id": "s2", "action": "upload_file", "parameters": {"project_id": "$s1.id", "file_data": "x"}},
+        ], max_steps=5)
+        self.assertIsNone(error)
+        self.assertEqual(plan[1]["depends_on"], ["s1"])
+
+    def test_missing_ids_are_numbered(self):
+        plan, error = build_plan([{"action": "get_system_status"}, {"action": "list_projects"}], max_steps=5)
+        self.assertIsNone(error)
+        self.assertEqual([step["id"] for step in plan], ["s1", "s2"])
+
+    def test_rejects_cycle(self):
+        plan, error = build_plan([
+            {"id": "a", "action": "get_project", "parameters": {"project_id": "$b.id"}},
+            {"id": "b", "action": "get_project", "parameters": {"project_id": "$a.id"}},
+        ], max_steps=5)
+        self.assertIsNone(plan)
+        self.assertIn("循环依赖", error)
+
+    def test_rejects_missing_dependency(self):
+        plan, error = build_plan([{"id": "s1", "action": "list_projects", "depends_on": ["s9"]}], max_steps=5)
+        self.assertIsNone(plan)
+        self.assertIn("s9", error)
+
+    def test_rejects_duplicate_ids_and_too_many_steps(self):
+        self.assertIsNone(build_plan([{"id": "s1", "action": "a"}, {"id": "s1", "action": "b"}], 5)[0])
+        self.assertIsNone(build_plan([{"action": "a"}] * 6, 5)[0])
+
+
+class ResolveReferencesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.results = {
+            "s1": {"success": True, "result": {"id": 7, "owner": {"name": "li"}}},
+            "s2": {"success": True, "result": {"data": {"file_id": 12}}},
+            "s3": {"success": True, "result": {"analysis_id": "a-1", "status": "running"}},
+        }
+
+    def test_resolves_nested_paths(self):
+        params, error = resolve_references(
+            {"project_id": "$s1.id", "owner": "$s1.owner.name", "input_file_ids": ["$s2.file_id", 3]},
+            self.results)
+        self.assertIsNone(error)
+        self.assertEqual(params, {"project_id": 7, "owner": "li", "input_file_ids": [12, 3]})
+
+    def test_id_falls_back_to_single_id_field(self):
+        self.assertEqual(resolve_references("$s3.id", self.results), ("a-1", None))
+
+    def test_unresolved_reference_is_an_error(self):
+        value, error = resolve_references({"project_id": "$s1.missing"}, self.results)
+        self.assertIsNone(value)
+        self.assertIn("$s1.missing", error)
+
+    def test_plain_values_are_kept(self):
+        self.assertEqual(resolve_references({"name": "$ 5", "n": 1}, self.results), ({"name": "$ 5", "n": 1}, None))
+
+
+class CompoundDetectionTest(unittest.TestCase):
+
+    def test_single_intent_messages_still_hit_rules(self):
+        engine = RuleEngine()
+        for message in ["查看系统状态", "列出所有项目", "查看项目123的详细信息"]:
+            self.assertFalse(looks_compound(message), message)
+            self.assertIsNotNone(engine.match(message), message)
+
+    def test_ordinary_words_are_not_connectors(self):
+        for message in ["并发测试项目", "再生成报告", "合并两个文件", "再次查看系统状态"]:
+            self.assertFalse(looks_compound(message), message)
+
+    def test_compound_messages(self):
+        for message in ["查看系统状态并列出所有项目", "创建项目A再上传文件", "查看项目1然后删除项目2", "列出项目3的文件；导出报告5"]:
+            self.assertTrue(looks_compound(message), message)
+
+
+class ExecutePlanTest(unittest.TestCase):
+
+    def test_independent_steps_run_concurrently_within_limit(self):
+        client = RecordingClient(delay=0.01)
+        tool_manager = ToolManager(api_client=client)
+        tool_manager.plan_concurrency = 2
+        plan, _ = build_plan([{"action": "get_system_status"}] * 4, max_steps=5)
+
+        events = run_plan(tool_manager, plan)
+
+        # 通过调用的开始/结束顺序判断并发，不依赖耗时: 前两个调用在任何调用结束前开始，同时进行的调用不超过上限
+        self.assertEqual(client.events[:2], ["start", "start"])
+        self.assertEqual(client.max_active, 2)
+        self.assertEqual(len(client.calls), 4)
+        self.assertEqual(events[-1]["type"], "plan_finished")
+        self.assertTrue(all(result["success"] for result in events[-1]["results"].values()))
+
+    def test_dependent_step_uses_resolved_reference(self):
+        client = RecordingClient()
+        tool_manager = ToolManager(api_client=client)
+        plan, _ = build_plan([
+            {"id": "s1", "action": "create_project", "parameters": {"name": "新品"}},
+            {"id": "s2", "action": "list_files", "parameters": {"project_id": "$s1.id"}},
+        ], max_steps=5)
+
+        events = run_plan(tool_manager, plan)
+
+        self.assertTrue(client.calls[1][1].endswith("/projects/99/files"))
+        finished = [event["step"] for event in events if event["type"] == "step_finished"]
+        self.assertEqual(finished, ["s1", "s2"])
+        self.assertEqual(events[-1]["results"]["s2"]["parameters"], {"project_id": 99})
+
+    def test_failed_dependency_skips_dependents(self):
+        client = RecordingClient()
+        tool_manager = ToolManager(api_client=client)
+        plan, _ = build_plan([
+            {"id": "s1", "action": "get_project", "parameters": {"project_id": "404"}},
+            {"id": "s2", "action": "list_files", "parameters": {"project_id": "$s1.id"}},
+            {"id": "s3", "action": "get_system_status"},
+        ], max_steps=5)
+
+        results = run_plan(tool_manager, plan)[-1]["results"]
+
+        self.assertFalse(results["s1"]["success"])
+        self.assertTrue(results["s2"]["skipped"])
+        self.assertTrue(results["s3"]["success"])
+        self.assertEqual(len(client.calls), 2)
+
+    def test_steps_do_not_fill_slots_from_the_compound_message(self):
+        client = RecordingClient()
+        tool_manager = ToolManager(api_client=client)
+        plan, _ = build_plan([{"id": "s1", "action": "list_files", "parameters": {}}], max_steps=5)
+
+        result = run_plan(tool_manager, plan, memory={"project_id": "5"})[-1]["results"]["s1"]
+
+        self.assertEqual(result["filled_params"], {"project_id": "memory"})
+        self.assertTrue(client.calls[0][1].endswith("/projects/5/files"))
+
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file